@@ -0,0 +1,194 @@
+"""
+Offline throughput benchmark for the pipeline.
+
+Starts local stand-ins for the Places API and the LLM endpoint (benchmarks/stub_servers.py),
+points the pipeline at them through environment settings, and reports places/sec, p50/p95
+latency and upstream call counts for enrich_places_from_list, categorize_places and
+run_full_pipeline across dataset sizes. Step files and caches go to a temporary directory.
+
+    python -m benchmarks.run --sizes 50 200 1000 --places-workers 8 --llm-workers 4
+"""
+import argparse
+import csv
+import functools
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+from benchmarks.stub_servers import StubBehavior, start_llm_stub, start_places_stub
+
+
+def _percentile(samples: list[float], pct: float) -> float | None:
+    if not samples:
+        return None
+    if len(samples) == 1:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method="inclusive")[int(pct) - 1]
+
+
+class _Timer:
+    """Wraps a function on an object/module and records the duration of every call."""
+
+    def __init__(self, owner: Any, attr: str) -> None:
+        self.samples: list[float] = []
+        self._lock = threading.Lock()
+        original: Callable = getattr(owner, attr)
+
+        @functools.wraps(original)
+        def timed(*args: Any, **kwargs: Any) -> Any:
+            started = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.samples.append(time.perf_counter() - started)
+
+        setattr(owner, attr, timed)
+
+    def take(self) -> list[float]:
+        with self._lock:
+            samples, self.samples = self.samples, []
+        return samples
+
+
+def _configure_env(args: argparse.Namespace, places_url: str, llm_url: str, workdir: Path) -> None:
+    """Point settings at the stubs and the temp dir. Must run before config.settings is imported."""
+    os.environ.update(
+        {
+            "GOOGLE_MAPS_API_KEY": "stub",
+            "GEMINI_API_KEY": "stub",
+            "PLACES_BASE_URL": places_url,
+            "LLM_BASE_URL": f"{llm_url}/v1/",
+            "STEPS_DIR": str(workdir / "steps"),
+            "OUTPUT_DIR": str(workdir / "output"),
+            "PLACES_CACHE_PATH": str(workdir / "cache" / "places.sqlite"),
+            "CATEGORY_CACHE_PATH": str(workdir / "cache" / "categories.sqlite"),
+            "PLACES_CACHE_ENABLED": "true" if args.with_cache else "false",
+            "CATEGORY_CACHE_ENABLED": "true" if args.with_cache else "false",
+            "PLACES_WORKERS": str(args.places_workers),
+            "LLM_WORKERS": str(args.llm_workers),
+            "PLACES_REQUESTS_PER_SECOND": str(args.places_rps),
+            "LLM_REQUESTS_PER_MINUTE": str(args.llm_rpm),
+            "PLACES_BACKOFF_BASE": "0.1",
+            "RESUME": "false",
+        }
+    )
+
+
+def _write_dataset(path: Path, size: int) -> None:
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["name", "address"])
+        for i in range(size):
+            writer.writerow([f"Bench place {i}", f"{i} Bench Avenue"])
+
+
+def _result(stage: str, size: int, elapsed: float, samples: list[float], calls: dict[str, int]) -> dict[str, Any]:
+    p50 = _percentile(samples, 50)
+    p95 = _percentile(samples, 95)
+    return {
+        "stage": stage,
+        "places": size,
+        "seconds": round(elapsed, 3),
+        "places_per_sec": round(size / elapsed, 2) if elapsed > 0 else None,
+        "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+        "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+        "calls": calls,
+    }
+
+
+def _print_table(results: list[dict[str, Any]]) -> None:
+    header = f"{'stage':<22}{'places':>8}{'seconds':>10}{'places/s':>10}{'p50 ms':>10}{'p95 ms':>10}  calls"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        fmt = lambda v: "-" if v is None else str(v)  # noqa: E731
+        calls = ", ".join(f"{k}={v}" for k, v in sorted(r["calls"].items()))
+        print(
+            f"{r['stage']:<22}{r['places']:>8}{r['seconds']:>10}{fmt(r['places_per_sec']):>10}"
+            f"{fmt(r['p50_ms']):>10}{fmt(r['p95_ms']):>10}  {calls}"
+        )
+
+
+def main(argv: list[str] | None = None) -> list[dict[str, Any]]:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 200])
+    parser.add_argument("--stages", nargs="+", default=["enrich", "categorize", "pipeline"], choices=["enrich", "categorize", "pipeline"])
+    parser.add_argument("--places-workers", type=int, default=8)
+    parser.add_argument("--llm-workers", type=int, default=4)
+    parser.add_argument("--places-rps", type=float, default=0, help="Places rate limit (0 = unlimited)")
+    parser.add_argument("--llm-rpm", type=float, default=0, help="LLM rate limit (0 = unlimited)")
+    parser.add_argument("--places-latency", type=float, nargs=2, default=[0.05, 0.15], metavar=("MIN", "MAX"))
+    parser.add_argument("--llm-latency", type=float, nargs=2, default=[0.5, 1.5], metavar=("MIN", "MAX"))
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of stub responses that are 500s")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of stub responses that are 429s")
+    parser.add_argument("--retry-after", type=float, default=1.0, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--with-cache", action="store_true", help="Keep the Places/category caches on (fresh, per run)")
+    parser.add_argument("--json", type=Path, help="Also write results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    places_stub = start_places_stub(
+        StubBehavior(*args.places_latency, args.error_rate, args.throttle_rate, args.retry_after)
+    )
+    llm_stub = start_llm_stub(StubBehavior(*args.llm_latency, args.error_rate, args.throttle_rate, args.retry_after))
+    workdir = Path(tempfile.mkdtemp(prefix="map_bench_"))
+    _configure_env(args, places_stub.url, llm_stub.url, workdir)
+
+    from src import categorize, enrich, main as pipeline
+
+    enrich_timer = _Timer(enrich.PlaceResolver, "enrich")
+    batch_timer = _Timer(categorize, "_ask_batch")
+
+    def calls() -> dict[str, int]:
+        places_calls = places_stub.stats.take()
+        llm_calls = llm_stub.stats.take()
+        merged = {**places_calls, **llm_calls}
+        merged["429"] = places_calls["429"] + llm_calls["429"]
+        merged["5xx"] = places_calls["5xx"] + llm_calls["5xx"]
+        return merged
+
+    results = []
+    for size in args.sizes:
+        dataset = workdir / f"bench_{size}.csv"
+        _write_dataset(dataset, size)
+        places = pipeline.load_places(dataset)
+        enriched: list[dict[str, Any]] = []
+        if "enrich" in args.stages or "categorize" in args.stages:
+            calls()
+            started = time.perf_counter()
+            enriched, _ = pipeline.enrich_places_from_list(places)
+            elapsed = time.perf_counter() - started
+            if "enrich" in args.stages:
+                results.append(_result("enrich_places_from_list", size, elapsed, enrich_timer.take(), calls()))
+        if "categorize" in args.stages:
+            calls()
+            batch_timer.take()
+            started = time.perf_counter()
+            categorize.categorize_places(enriched)
+            elapsed = time.perf_counter() - started
+            results.append(_result("categorize_places", len(enriched), elapsed, batch_timer.take(), calls()))
+        if "pipeline" in args.stages:
+            calls()
+            enrich_timer.take()
+            started = time.perf_counter()
+            pipeline.run_full_pipeline(dataset)
+            elapsed = time.perf_counter() - started
+            results.append(_result("run_full_pipeline", size, elapsed, enrich_timer.take(), calls()))
+
+    _print_table(results)
+    print(f"\nLatency columns: per place for enrich / pipeline, per LLM call for categorize. Work dir: {workdir}")
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2), encoding="utf-8")
+    places_stub.shutdown()
+    llm_stub.shutdown()
+    return results
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
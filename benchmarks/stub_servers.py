@@ -0,0 +1,211 @@
+"""
+Local HTTP stand-ins for the Places API (places:searchText, GET /places/{id}) and an
+OpenAI-compatible chat completions endpoint, with configurable latency, error rate and
+429 throttling. Used by benchmarks/run.py to measure throughput without spending quota.
+"""
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+# Types handed out to fake places: some resolve by rules, others need the LLM.
+_TYPES = [
+    ["lodging", "point_of_interest"],
+    ["ramen_restaurant", "restaurant", "food"],
+    ["museum", "tourist_attraction"],
+    ["store", "point_of_interest"],
+    ["cafe", "food"],
+    ["bakery", "cafe", "restaurant"],
+    ["market", "establishment"],
+    ["shopping_mall"],
+]
+_CATEGORIES = ["Restaurants", "Street food", "Shopping", "Attractions", "Sweets", "Cable", "Hotel"]
+
+
+@dataclass
+class StubBehavior:
+    """How a stub responds: added latency (seconds, uniform in [min, max]) and failure rates."""
+
+    latency_min: float = 0.05
+    latency_max: float = 0.15
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+    retry_after: float = 1.0
+
+
+@dataclass
+class StubStats:
+    calls: dict[str, int] = field(default_factory=dict)
+    errors: int = 0
+    throttled: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def count(self, endpoint: str) -> None:
+        with self._lock:
+            self.calls[endpoint] = self.calls.get(endpoint, 0) + 1
+
+    def fail(self, throttled: bool) -> None:
+        with self._lock:
+            if throttled:
+                self.throttled += 1
+            else:
+                self.errors += 1
+
+    def take(self) -> dict[str, int]:
+        """Copy the counters and reset them in one step (429s and 5xx under their own keys)."""
+        with self._lock:
+            snapshot = {**self.calls, "429": self.throttled, "5xx": self.errors}
+            self.calls.clear()
+            self.errors = 0
+            self.throttled = 0
+        return snapshot
+
+
+def _place_id(query: str) -> str:
+    return "stub" + hashlib.sha1(query.strip().lower().encode("utf-8")).hexdigest()[:16]
+
+
+def _fake_place(place_id: str, name: str | None = None) -> dict[str, Any]:
+    seed = int(place_id[4:12], 16)
+    rng = random.Random(seed)
+    return {
+        "id": place_id,
+        "displayName": {"text": name or f"Place {place_id[4:10]}"},
+        "location": {"latitude": 35.0 + rng.random(), "longitude": 139.0 + rng.random()},
+        "formattedAddress": f"{seed % 999} Stub Street",
+        "rating": round(rng.uniform(2.5, 5.0), 1),
+        "userRatingCount": rng.randint(0, 3000),
+        "types": _TYPES[seed % len(_TYPES)],
+        "reviews": [{"text": {"text": "Great place. " * rng.randint(1, 40)}}],
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_StubServer"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+    def _send(self, status: int, body: dict[str, Any] | None = None, headers: dict[str, str] | None = None) -> None:
+        data = json.dumps(body or {}).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _misbehave(self) -> bool:
+        """Apply latency, then maybe answer 429 or 500. Returns True if a failure was sent."""
+        behavior = self.server.behavior
+        time.sleep(random.uniform(behavior.latency_min, behavior.latency_max))
+        roll = random.random()
+        if roll < behavior.throttle_rate:
+            self.server.stats.fail(throttled=True)
+            self._send(429, {"error": "throttled"}, {"Retry-After": str(behavior.retry_after)})
+            return True
+        if roll < behavior.throttle_rate + behavior.error_rate:
+            self.server.stats.fail(throttled=False)
+            self._send(500, {"error": "stub failure"})
+            return True
+        return False
+
+    def _body(self) -> dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+
+class _PlacesHandler(_Handler):
+    def do_POST(self) -> None:
+        body = self._body()
+        self.server.stats.count("search")
+        if self._misbehave():
+            return
+        query = body.get("textQuery") or ""
+        place = _fake_place(_place_id(query), name=query)
+        mask = self.headers.get("X-Goog-FieldMask") or ""
+        if "places.location" not in mask:
+            place = {"id": place["id"], "displayName": place["displayName"]}
+        self._send(200, {"places": [place]})
+
+    def do_GET(self) -> None:
+        self.server.stats.count("details")
+        if self._misbehave():
+            return
+        place_id = self.path.rsplit("/", 1)[-1]
+        place = _fake_place(place_id)
+        mask = self.headers.get("X-Goog-FieldMask") or ""
+        if mask and "reviews" not in mask.split(","):
+            del place["reviews"]
+        self._send(200, place)
+
+
+class _LLMHandler(_Handler):
+    def do_POST(self) -> None:
+        body = self._body()
+        self.server.stats.count("chat")
+        if self._misbehave():
+            return
+        prompt = body["messages"][-1]["content"]
+        blocks = re.findall(r"--- Place (\d+) ---\n([\s\S]*?)(?=--- Place|\nCategories)", prompt)
+        answer: dict[str, Any] = {}
+        for n, block in blocks:
+            digest = int(hashlib.md5(block.encode()).hexdigest(), 16)
+            category = _CATEGORIES[digest % len(_CATEGORIES)]
+            if '"confidence"' in prompt:
+                # Sure once a review snippet is shown; otherwise anywhere from 0.4 to 0.99.
+                confidence = 0.95 if "Review snippet:" in block else 0.4 + (digest % 60) / 100
+                answer[n] = {"category": category, "confidence": confidence}
+            else:
+                answer[n] = category
+        content = json.dumps(answer)
+        self._send(
+            200,
+            {
+                "id": "stub",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model") or "stub",
+                "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": content}}],
+                "usage": {
+                    "prompt_tokens": len(prompt) // 4,
+                    "completion_tokens": len(content) // 4,
+                    "total_tokens": (len(prompt) + len(content)) // 4,
+                },
+            },
+        )
+
+
+class _StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, handler: type, behavior: StubBehavior) -> None:
+        super().__init__(("127.0.0.1", 0), handler)
+        self.behavior = behavior
+        self.stats = StubStats()
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+
+    def start(self) -> "_StubServer":
+        self._thread.start()
+        return self
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_port}"
+
+
+def start_places_stub(behavior: StubBehavior | None = None) -> _StubServer:
+    """Start the Places stand-in; use `<url>` as PLACES_BASE_URL."""
+    return _StubServer(_PlacesHandler, behavior or StubBehavior()).start()
+
+
+def start_llm_stub(behavior: StubBehavior | None = None) -> _StubServer:
+    """Start the chat completions stand-in; use `<url>/v1/` as LLM_BASE_URL."""
+    return _StubServer(_LLMHandler, behavior or StubBehavior(latency_min=0.5, latency_max=1.5)).start()
@@ -15,7 +15,7 @@ PROJECT_ROOT = Path(__file__).resolve().parent.parent
 DATA_DIR = PROJECT_ROOT / "data"
 
 # Steps hierarchy: input and output for pipeline steps
-STEPS_DIR = DATA_DIR / "steps"
+STEPS_DIR = Path(os.getenv("STEPS_DIR", str(DATA_DIR / "steps")))
 STEPS_INPUT_DIR = STEPS_DIR / "input"
 STEPS_OUTPUT_DIR = STEPS_DIR / "output"
 STEPS_INPUT_DIR.mkdir(parents=True, exist_ok=True)
@@ -23,19 +23,65 @@ STEPS_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
 # Pipeline uses steps/input for CSV/txt and steps/output for step JSONs
 INPUT_DIR = STEPS_INPUT_DIR 
-OUTPUT_DIR = DATA_DIR / "output"
+OUTPUT_DIR = Path(os.getenv("OUTPUT_DIR", str(DATA_DIR / "output")))
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
+# Persistent caches (SQLite) live under data/cache/
+CACHE_DIR = DATA_DIR / "cache"
+
 INPUT_FILE: str = os.getenv("INPUT_FILE", "").strip()
 STEP_PLACES_LOADED = "places_loaded.json"
 STEP_ENRICHED = "enriched.json"
 STEP_CATEGORIZED = "categorized.json"
 STEP_CATEGORIZED_WITH_ICONS = "categorized_with_icons.json"
+# Step file format: json (default), or arrow / parquet (columnar, needs pyarrow; the file suffix
+# changes to .arrow / .parquet). Columnar files are faster to load and smaller for large runs.
+STEP_FORMAT: str = os.getenv("STEP_FORMAT", "json").strip().lower()
+
+# Resume enrich/categorize from their journals (data/steps/output/<step>.journal.jsonl)
+# instead of starting over.
+RESUME: bool = os.getenv("RESUME", "false").strip().lower() in ("1", "true", "yes")
+
+# Delta full pipeline: enrich/categorize only input rows added or changed since the last run and
+# merge them into the previous categorized_with_icons.json (row hashes kept in delta_manifest.json).
+PIPELINE_DELTA: bool = os.getenv("PIPELINE_DELTA", "false").strip().lower() in ("1", "true", "yes")
+STEP_DELTA_MANIFEST = "delta_manifest.json"
+
+# Batch job (RUN_STEP=batch): INPUT_GLOB is a directory or glob of input files (relative to
+# data/steps/input/, empty = every input file there). Each file's step files go to
+# data/steps/output/jobs/<name>/ and its exports to data/output/<name>/; JOB_FILE_WORKERS files
+# are enriched at a time, all through the same rate limiters and caches.
+INPUT_GLOB: str = os.getenv("INPUT_GLOB", "").strip()
+JOB_FILE_WORKERS: int = int(os.getenv("JOB_FILE_WORKERS", "4"))
+
+# Service mode (RUN_STEP=serve): local HTTP endpoint for on-demand lookups with warm clients and caches.
+# Places reaching the LLM from concurrent requests are gathered for up to SERVICE_BATCH_WINDOW_MS
+# (or until CATEGORIZE_BATCH_SIZE places) and categorized in one batch.
+SERVICE_HOST: str = os.getenv("SERVICE_HOST", "127.0.0.1").strip()
+SERVICE_PORT: int = int(os.getenv("SERVICE_PORT", "8765"))
+SERVICE_BATCH_WINDOW_MS: float = float(os.getenv("SERVICE_BATCH_WINDOW_MS", "50"))
+SERVICE_MAX_PLACES_PER_REQUEST: int = int(os.getenv("SERVICE_MAX_PLACES_PER_REQUEST", "1000"))
+# Places lookups in flight across all service requests (the Places rate limit still applies).
+SERVICE_WORKERS: int = int(os.getenv("SERVICE_WORKERS", "16"))
+
+# Streaming full pipeline: overlap enrichment and categorization (RUN_STEP=all or stream).
+PIPELINE_STREAMING: bool = os.getenv("PIPELINE_STREAMING", "false").strip().lower() in ("1", "true", "yes")
+# Max enriched places waiting between the enrichment workers and the categorizer.
+PIPELINE_QUEUE_SIZE: int = int(os.getenv("PIPELINE_QUEUE_SIZE", "100"))
+
+# Write My Maps files at the end of the full/streaming pipeline (RUN_STEP=export runs it alone).
+EXPORT_ENABLED: bool = os.getenv("EXPORT_ENABLED", "true").strip().lower() in ("1", "true", "yes")
+# My Maps export: formats (csv, kml), shard column (category, icon, or empty for one layer)
+# and max rows per layer file (My Maps imports at most 2,000 rows per layer).
+EXPORT_FORMATS: list[str] = [f for f in os.getenv("EXPORT_FORMATS", "csv,kml").split(",") if f.strip()]
+EXPORT_SHARD_BY: str = os.getenv("EXPORT_SHARD_BY", "category").strip().lower()
+MYMAPS_MAX_ROWS_PER_LAYER: int = int(os.getenv("MYMAPS_MAX_ROWS_PER_LAYER", "2000"))
 
 # ---------------------------------------------------------------------------
 # Google Maps
 # ---------------------------------------------------------------------------
 GOOGLE_MAPS_API_KEY: str = os.getenv("GOOGLE_MAPS_API_KEY", "").strip()
+PLACES_BASE_URL: str = os.getenv("PLACES_BASE_URL", "https://places.googleapis.com/v1").strip().rstrip("/")
 
 # ---------------------------------------------------------------------------
 # LLM (use one or both)
@@ -43,14 +89,155 @@ GOOGLE_MAPS_API_KEY: str = os.getenv("GOOGLE_MAPS_API_KEY", "").strip()
 OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "").strip()
 GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY", "").strip()
 
+
+def _key_list(env: str, single: str) -> list[str]:
+    """Comma-separated keys from `env`, plus the single-key setting if it is not listed."""
+    keys = [k.strip() for k in os.getenv(env, "").split(",") if k.strip()]
+    if single and single not in keys:
+        keys.insert(0, single)
+    return keys
+
+
+# Extra keys for the provider pool: every key gets its own rate limits (LLM_REQUESTS_PER_MINUTE etc. are per key).
+GEMINI_API_KEYS: list[str] = _key_list("GEMINI_API_KEYS", GEMINI_API_KEY)
+OPENAI_API_KEYS: list[str] = _key_list("OPENAI_API_KEYS", OPENAI_API_KEY)
+# Providers categorization may use, in order: gemini, openai (e.g. "gemini,openai").
+LLM_PROVIDERS: list[str] = [p.strip().lower() for p in os.getenv("LLM_PROVIDERS", "gemini").split(",") if p.strip()]
+# OpenAI endpoint, model and per-key limits (used when "openai" is in LLM_PROVIDERS).
+OPENAI_BASE_URL: str = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1/").strip()
+OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-4o-mini").strip()
+# reasoning_effort for OpenAI keys (empty = not sent; gpt-4o-mini does not accept it).
+OPENAI_REASONING_EFFORT: str = os.getenv("OPENAI_REASONING_EFFORT", "").strip().lower()
+OPENAI_REQUESTS_PER_MINUTE: float = float(os.getenv("OPENAI_REQUESTS_PER_MINUTE", "500"))
+OPENAI_TOKENS_PER_MINUTE: float = float(os.getenv("OPENAI_TOKENS_PER_MINUTE", "0"))
+
 # ---------------------------------------------------------------------------
 # Optional: rate limiting and behavior
 # ---------------------------------------------------------------------------
 PLACES_REQUEST_DELAY: float = float(os.getenv("PLACES_REQUEST_DELAY", "0.5"))
+# Places API requests per second shared by all enrichment workers (token bucket).
+# Defaults to 1 / PLACES_REQUEST_DELAY; 0 disables limiting.
+PLACES_REQUESTS_PER_SECOND: float = float(
+    os.getenv("PLACES_REQUESTS_PER_SECOND", str(1.0 / PLACES_REQUEST_DELAY if PLACES_REQUEST_DELAY > 0 else 0))
+)
+# Number of concurrent enrichment workers. 1 = enrich one place at a time.
+PLACES_WORKERS: int = int(os.getenv("PLACES_WORKERS", "1"))
+# Request details fields in the searchText call itself (one request per place instead of two).
+# Falls back to search + details when the search result is incomplete.
+PLACES_SINGLE_REQUEST: bool = os.getenv("PLACES_SINGLE_REQUEST", "false").strip().lower() in ("1", "true", "yes")
+# Tiered details: fetch details without reviews (lean field mask, cheaper SKU, smaller responses) and
+# fetch reviews only for places the LLM categorizes with confidence below PLACES_REVIEWS_MIN_CONFIDENCE;
+# those places are then categorized again with their reviews.
+PLACES_DETAILS_TIERED: bool = os.getenv("PLACES_DETAILS_TIERED", "false").strip().lower() in ("1", "true", "yes")
+PLACES_REVIEWS_MIN_CONFIDENCE: float = float(os.getenv("PLACES_REVIEWS_MIN_CONFIDENCE", "0.7"))
+# Places HTTP transport: retries with jittered exponential backoff (honors Retry-After),
+# and a circuit breaker that pauses all workers after repeated 429/5xx responses.
+PLACES_MAX_RETRIES: int = int(os.getenv("PLACES_MAX_RETRIES", "4"))
+PLACES_BACKOFF_BASE: float = float(os.getenv("PLACES_BACKOFF_BASE", "0.5"))
+PLACES_BACKOFF_MAX: float = float(os.getenv("PLACES_BACKOFF_MAX", "30"))
+PLACES_BREAKER_THRESHOLD: int = int(os.getenv("PLACES_BREAKER_THRESHOLD", "5"))
+PLACES_BREAKER_COOLDOWN: float = float(os.getenv("PLACES_BREAKER_COOLDOWN", "30"))
+# Keep-alive connections kept open to the Places API.
+PLACES_POOL_SIZE: int = int(os.getenv("PLACES_POOL_SIZE", str(max(10, PLACES_WORKERS))))
+# Search region sent as locationBias: "lat,lng,radius_m" or "south,west,north,east".
+# A <input file>.region.json sidecar ({"center": [lat, lng], "radius_m": n} or {"bbox": [s, w, n, e]}) wins.
+PLACES_REGION: str = os.getenv("PLACES_REGION", "").strip()
+# Without a configured region, bias searches toward the places resolved so far once there are enough of them.
+PLACES_DERIVE_REGION: bool = os.getenv("PLACES_DERIVE_REGION", "false").strip().lower() in ("1", "true", "yes")
+PLACES_DERIVE_REGION_MIN_PLACES: int = int(os.getenv("PLACES_DERIVE_REGION_MIN_PLACES", "20"))
+PLACES_DERIVED_RADIUS_MIN_M: float = float(os.getenv("PLACES_DERIVED_RADIUS_MIN_M", "5000"))
+# Search results outside a configured region (plus PLACES_REGION_MARGIN_M): skip (no details call) or flag.
+# Results outside a derived region are only flagged.
+PLACES_OUT_OF_REGION: str = os.getenv("PLACES_OUT_OF_REGION", "skip").strip().lower()
+PLACES_REGION_MARGIN_M: float = float(os.getenv("PLACES_REGION_MARGIN_M", "2000"))
+# Flag results within this many meters of a different, already resolved place (0 disables).
+PLACES_DUPLICATE_RADIUS_M: float = float(os.getenv("PLACES_DUPLICATE_RADIUS_M", "25"))
+# On-disk cache for Places search (query -> place_id) and details (place_id -> place).
+PLACES_CACHE_ENABLED: bool = os.getenv("PLACES_CACHE_ENABLED", "true").strip().lower() in ("1", "true", "yes")
+PLACES_CACHE_PATH: Path = Path(os.getenv("PLACES_CACHE_PATH", str(CACHE_DIR / "places.sqlite")))
+PLACES_CACHE_TTL_DAYS: float = float(os.getenv("PLACES_CACHE_TTL_DAYS", "30"))
+PLACES_CACHE_MAX_ENTRIES: int = int(os.getenv("PLACES_CACHE_MAX_ENTRIES", "200000"))
 # Delay between LLM requests (seconds). 6.0 = 10 RPM (Gemini free tier).
 LLM_REQUEST_DELAY: float = float(os.getenv("LLM_REQUEST_DELAY", "6.0"))
 # Number of places per batch when categorizing (one API call per batch).
+# With adaptive batching this is the starting and maximum batch size.
 CATEGORIZE_BATCH_SIZE: int = int(os.getenv("CATEGORIZE_BATCH_SIZE", "30"))
+CATEGORIZE_MIN_BATCH_SIZE: int = int(os.getenv("CATEGORIZE_MIN_BATCH_SIZE", "1"))
+# Estimated prompt tokens allowed per batch; places are packed up to this budget.
+CATEGORIZE_INPUT_TOKEN_BUDGET: int = int(os.getenv("CATEGORIZE_INPUT_TOKEN_BUDGET", "8000"))
+# Batches slower than this (seconds) shrink; batches under half of it grow.
+CATEGORIZE_TARGET_LATENCY: float = float(os.getenv("CATEGORIZE_TARGET_LATENCY", "20"))
+# Output token cap per batch = LLM_OUTPUT_TOKENS_BASE + LLM_OUTPUT_TOKENS_PER_PLACE * places.
+# The base is headroom for the reply itself; raise it if LLM_REASONING_EFFORT lets the model think.
+LLM_OUTPUT_TOKENS_BASE: int = int(os.getenv("LLM_OUTPUT_TOKENS_BASE", "2048"))
+LLM_OUTPUT_TOKENS_PER_PLACE: int = int(os.getenv("LLM_OUTPUT_TOKENS_PER_PLACE", "16"))
+# reasoning_effort sent with requests on Gemini keys. gemini-2.5-flash counts thinking tokens against
+# the output cap, so large batches could be cut off mid-JSON; "none" turns thinking off. Use
+# low/medium/high to allow it, or empty to send nothing (models that cannot disable thinking, e.g. 2.5 Pro).
+LLM_REASONING_EFFORT: str = os.getenv("LLM_REASONING_EFFORT", "none").strip().lower()
+# LLM endpoint (OpenAI-compatible) and model.
+LLM_BASE_URL: str = os.getenv("LLM_BASE_URL", "https://generativelanguage.googleapis.com/v1beta/openai/").strip()
+LLM_MODEL: str = os.getenv("LLM_MODEL", "gemini-2.5-flash").strip()
+# Model cascade: batches go first to a cheaper/faster model (LLM_CASCADE_MODEL for Gemini keys,
+# OPENAI_CASCADE_MODEL for OpenAI keys; same keys and limits), which also reports a confidence per
+# place. Places below LLM_CASCADE_MIN_CONFIDENCE (or without a confidence) are re-batched to
+# LLM_MODEL / OPENAI_MODEL. Off while both cascade models are empty.
+LLM_CASCADE_MODEL: str = os.getenv("LLM_CASCADE_MODEL", "").strip()
+OPENAI_CASCADE_MODEL: str = os.getenv("OPENAI_CASCADE_MODEL", "").strip()
+LLM_CASCADE_MIN_CONFIDENCE: float = float(os.getenv("LLM_CASCADE_MIN_CONFIDENCE", "0.8"))
+# Number of batch requests kept in flight at once. 1 = one batch at a time.
+LLM_WORKERS: int = int(os.getenv("LLM_WORKERS", "1"))
+# Requests per minute per Gemini key, shared by all LLM workers. Defaults to 60 / LLM_REQUEST_DELAY; 0 disables limiting.
+LLM_REQUESTS_PER_MINUTE: float = float(
+    os.getenv("LLM_REQUESTS_PER_MINUTE", str(60.0 / LLM_REQUEST_DELAY if LLM_REQUEST_DELAY > 0 else 0))
+)
+# Structured output for batch replies: json_schema (categories as an enum), json_object, or none.
+LLM_RESPONSE_FORMAT: str = os.getenv("LLM_RESPONSE_FORMAT", "json_schema").strip().lower()
+# Extra calls allowed per batch to re-ask places missing from (or unparseable in) the reply.
+CATEGORIZE_RECOVERY_MAX_CALLS: int = int(os.getenv("CATEGORIZE_RECOVERY_MAX_CALLS", "6"))
+# Estimated prompt tokens per minute per Gemini key. 0 disables limiting.
+LLM_TOKENS_PER_MINUTE: float = float(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))
+# Provider pool health: a throttled key cools down for Retry-After (or LLM_PROVIDER_COOLDOWN seconds);
+# after LLM_PROVIDER_MAX_FAILURES consecutive errors it is skipped for LLM_PROVIDER_OUTAGE_COOLDOWN seconds.
+LLM_PROVIDER_COOLDOWN: float = float(os.getenv("LLM_PROVIDER_COOLDOWN", "30"))
+LLM_PROVIDER_MAX_FAILURES: int = int(os.getenv("LLM_PROVIDER_MAX_FAILURES", "3"))
+LLM_PROVIDER_OUTAGE_COOLDOWN: float = float(os.getenv("LLM_PROVIDER_OUTAGE_COOLDOWN", "120"))
+# Attempts per LLM call across providers before the batch counts as failed (0 = max(3, 2 × providers)).
+LLM_FAILOVER_MAX_ATTEMPTS: int = int(os.getenv("LLM_FAILOVER_MAX_ATTEMPTS", "0"))
+# Full-jitter exponential backoff (seconds) before retrying once every LLM provider has failed a call.
+LLM_BACKOFF_BASE: float = float(os.getenv("LLM_BACKOFF_BASE", "1"))
+LLM_BACKOFF_MAX: float = float(os.getenv("LLM_BACKOFF_MAX", "30"))
+# Resolve places with unambiguous Google types locally instead of asking the LLM.
+FAST_PATH_ENABLED: bool = os.getenv("FAST_PATH_ENABLED", "true").strip().lower() in ("1", "true", "yes")
+FAST_PATH_MIN_CONFIDENCE: float = float(os.getenv("FAST_PATH_MIN_CONFIDENCE", "0.85"))
+# On-disk cache of LLM categories, keyed by place, configured provider models and prompt/categories fingerprint.
+CATEGORY_CACHE_ENABLED: bool = os.getenv("CATEGORY_CACHE_ENABLED", "true").strip().lower() in ("1", "true", "yes")
+CATEGORY_CACHE_PATH: Path = Path(os.getenv("CATEGORY_CACHE_PATH", str(CACHE_DIR / "categories.sqlite")))
+CATEGORY_CACHE_TTL_DAYS: float = float(os.getenv("CATEGORY_CACHE_TTL_DAYS", "90"))
+CATEGORY_CACHE_MAX_ENTRIES: int = int(os.getenv("CATEGORY_CACHE_MAX_ENTRIES", "200000"))
+
+# ---------------------------------------------------------------------------
+# Metrics and cost report (data/steps/output/run_report.json)
+# ---------------------------------------------------------------------------
+# Also write counters in Prometheus textfile format (e.g. for node_exporter's textfile collector).
+METRICS_PROMETHEUS_FILE: str = os.getenv("METRICS_PROMETHEUS_FILE", "").strip()
+# USD per 1,000 Places requests, per SKU (search = IDs + displayName, search_details = searchText
+# with the details field mask, details = Place Details with reviews; *_lean = the same without reviews).
+PLACES_PRICE_SEARCH_PER_1000: float = float(os.getenv("PLACES_PRICE_SEARCH_PER_1000", "32"))
+PLACES_PRICE_SEARCH_DETAILS_PER_1000: float = float(os.getenv("PLACES_PRICE_SEARCH_DETAILS_PER_1000", "40"))
+PLACES_PRICE_SEARCH_DETAILS_LEAN_PER_1000: float = float(os.getenv("PLACES_PRICE_SEARCH_DETAILS_LEAN_PER_1000", "35"))
+PLACES_PRICE_DETAILS_PER_1000: float = float(os.getenv("PLACES_PRICE_DETAILS_PER_1000", "25"))
+PLACES_PRICE_DETAILS_LEAN_PER_1000: float = float(os.getenv("PLACES_PRICE_DETAILS_LEAN_PER_1000", "20"))
+# USD per million LLM prompt / completion tokens (as reported in response.usage).
+LLM_PRICE_INPUT_PER_MTOK: float = float(os.getenv("LLM_PRICE_INPUT_PER_MTOK", "0.30"))
+LLM_PRICE_OUTPUT_PER_MTOK: float = float(os.getenv("LLM_PRICE_OUTPUT_PER_MTOK", "2.50"))
+# The same for the cascade's fast tier (LLM_CASCADE_MODEL).
+LLM_CASCADE_PRICE_INPUT_PER_MTOK: float = float(os.getenv("LLM_CASCADE_PRICE_INPUT_PER_MTOK", "0.10"))
+LLM_CASCADE_PRICE_OUTPUT_PER_MTOK: float = float(os.getenv("LLM_CASCADE_PRICE_OUTPUT_PER_MTOK", "0.40"))
+# Typical latency assumed by the dry-run planner (RUN_STEP=plan): seconds per Places request
+# and per LLM batch.
+PLAN_PLACES_LATENCY: float = float(os.getenv("PLAN_PLACES_LATENCY", "0.3"))
+PLAN_LLM_BATCH_LATENCY: float = float(os.getenv("PLAN_LLM_BATCH_LATENCY", "8"))
 
 
 def get_llm_key() -> str:
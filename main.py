@@ -3,35 +3,77 @@ import os
 from pathlib import Path
 
 from config import settings
+from src.metrics import write_run_report
+from src.planner import format_plan, plan_run
+from src.service import serve
 from src.main import (
     run_step_load,
     run_step_enrich,
     run_step_categorize,
     run_step_assign_icons,
+    run_step_export,
+    run_batch_job,
     run_full_pipeline,
+    run_streaming_pipeline,
 )
 
 logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
 
 INPUT_DIR = settings.INPUT_DIR
 
-# Run only one step: RUN_STEP=load | enrich | categorize | assign_icons | all
-# - load: load CSV/txt from data/steps/input/ → save to data/steps/output/places_loaded.json
+# Run only one step: RUN_STEP=load | enrich | categorize | assign_icons | export | stream | plan | batch | serve | all
+# - load: load CSV/txt/Parquet (or .csv.gz/.txt.gz) from data/steps/input/ → save to data/steps/output/places_loaded.json
 # - enrich: read places_loaded.json → Google Places → save to data/steps/output/enriched.json
 # - categorize: read enriched.json → LLM → save to data/steps/output/categorized.json
 # - assign_icons: read categorized.json → add icon per category → save to categorized_with_icons.json
-# - all (default): run load → enrich → categorize → assign_icons, saving each step
+# - export: read categorized_with_icons.json → My Maps CSV/KML in data/output/ (sharded per category / layer limit)
+# - stream: same as all, but enrichment and categorization overlap (files written at the end)
+# - plan: dry run; count Places calls and LLM batches still needed (after caches) and print projected
+#   tokens, wall time and cost → data/steps/output/run_plan.json (no API calls)
+# - batch: run every input file matching INPUT_GLOB (directory or glob under data/steps/input/) in one
+#   process with shared rate limits and caches; step files → data/steps/output/jobs/<name>/,
+#   exports → data/output/<name>/
+# - serve: local HTTP service (SERVICE_HOST:SERVICE_PORT) for on-demand lookups; POST /categorize with a
+#   place {"name", "address"} / {"place_id"} or a list → enriched + categorized records (see src/service.py)
+# - all (default): run load → enrich → categorize → assign_icons → export, saving each step
+#   (streams like "stream" when PIPELINE_STREAMING=true)
 RUN_STEP = os.getenv("RUN_STEP", "all").strip().lower()
 
 
 def main() -> None:
+    if RUN_STEP == "serve":
+        try:
+            serve()
+        finally:
+            write_run_report()
+        return
+    if RUN_STEP == "batch":
+        try:
+            results = run_batch_job()
+            for name, (categorized, failed) in results.items():
+                print(f"Batch job {name}: {len(categorized)} categorized, {len(failed)} failed at enrich.")
+        finally:
+            write_run_report()
+        return
+
     input_path = INPUT_DIR / settings.INPUT_FILE
     if not input_path.exists():
         raise FileNotFoundError(f"Input file not found: {input_path} (set INPUT_FILE in .env)")
 
+    if RUN_STEP == "plan":
+        print(format_plan(plan_run(input_path)))
+        return
+    try:
+        _run_step(input_path)
+    finally:
+        # Stages, request/token counts, cache hit rates and estimated cost → data/steps/output/run_report.json
+        write_run_report()
+
+
+def _run_step(input_path: Path) -> None:
     if RUN_STEP == "load":
-        places = run_step_load(input_path)
-        print(f"Step 1 (load): saved {len(places)} places to {settings.STEPS_OUTPUT_DIR / settings.STEP_PLACES_LOADED}")
+        count = run_step_load(input_path)
+        print(f"Step 1 (load): saved {count} places to {settings.STEPS_OUTPUT_DIR / settings.STEP_PLACES_LOADED}")
     elif RUN_STEP == "enrich":
         # Pass input_path so you can run enrich alone (loads from CSV). Or use None to read from steps/places_loaded.json.
         enriched, failed = run_step_enrich(input_path=input_path)
@@ -42,6 +84,12 @@ def main() -> None:
     elif RUN_STEP == "assign_icons":
         with_icons = run_step_assign_icons()
         print(f"Step 4 (assign_icons): {len(with_icons)} with icons → {settings.STEPS_OUTPUT_DIR / settings.STEP_CATEGORIZED_WITH_ICONS}")
+    elif RUN_STEP == "export":
+        paths = run_step_export()
+        print(f"Step 5 (export): wrote {len(paths)} files to {settings.OUTPUT_DIR}")
+    elif RUN_STEP == "stream":
+        categorized, failed = run_streaming_pipeline(input_path)
+        print(f"Streaming pipeline: {len(categorized)} categorized, {len(failed)} failed at enrich.")
     else:
         categorized, failed = run_full_pipeline(input_path)
         print(f"Full pipeline: {len(categorized)} categorized, {len(failed)} failed at enrich.")
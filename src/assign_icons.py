@@ -36,3 +36,18 @@ def assign_icons(places: list[dict[str, Any]]) -> None:
     """Set place['icon'] for each place from place['category'] (mutates in place)."""
     for place in places:
         place["icon"] = get_icon_for_category(place.get("category"))
+
+
+def icon_column(categories: Any) -> Any:
+    """
+    get_icon_for_category as a vectorized pyarrow operation: each distinct category is mapped
+    once, then icons are gathered by dictionary index.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    if isinstance(categories, pa.ChunkedArray):
+        categories = categories.combine_chunks()
+    encoded = categories.cast(pa.string()).dictionary_encode()
+    icons = pa.array([get_icon_for_category(c) for c in encoded.dictionary.to_pylist()], type=pa.string())
+    return pc.fill_null(icons.take(encoded.indices), DEFAULT_ICON)
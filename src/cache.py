@@ -0,0 +1,119 @@
+"""
+Persistent key/value cache backed by SQLite (one file under data/cache/).
+Values are stored as JSON with a per-entry expiry; the least recently used
+entries are evicted once the cache grows past max_entries.
+"""
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from src.metrics import metrics
+
+log = logging.getLogger(__name__)
+
+# Check the size bound every N writes instead of on every insert.
+_EVICT_EVERY = 100
+
+
+class SqliteCache:
+    """Namespaced JSON cache with TTL, LRU size bound and hit/miss counters. Safe to share across threads."""
+
+    def __init__(self, path: str | Path, ttl_seconds: float, max_entries: int) -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits: dict[str, int] = {}
+        self.misses: dict[str, int] = {}
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS entries (
+                ns TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                PRIMARY KEY (ns, key)
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+
+    def get(self, ns: str, key: str) -> Any | None:
+        """Return the cached value, or None when missing or expired."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM entries WHERE ns = ? AND key = ?", (ns, key)
+            ).fetchone()
+            if row is None or row[1] < now:
+                if row is not None:
+                    self._conn.execute("DELETE FROM entries WHERE ns = ? AND key = ?", (ns, key))
+                self.misses[ns] = self.misses.get(ns, 0) + 1
+                metrics.inc("cache_lookups_total", cache=self.path.stem, namespace=ns, result="miss")
+                return None
+            self._conn.execute(
+                "UPDATE entries SET accessed_at = ? WHERE ns = ? AND key = ?", (now, ns, key)
+            )
+            self.hits[ns] = self.hits.get(ns, 0) + 1
+            metrics.inc("cache_lookups_total", cache=self.path.stem, namespace=ns, result="hit")
+        return json.loads(row[0])
+
+    def peek(self, ns: str, key: str) -> Any | None:
+        """Like get(), but leaves hit/miss counters and LRU order untouched (for dry runs)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM entries WHERE ns = ? AND key = ? AND expires_at >= ?", (ns, key, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def set(self, ns: str, key: str, value: Any, ttl_seconds: float | None = None) -> None:
+        """Store value (JSON-serializable) under (ns, key) for ttl_seconds (default: cache TTL)."""
+        now = time.time()
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        data = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (ns, key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (ns, key, data, now + ttl, now),
+            )
+            self._writes += 1
+            if self._writes % _EVICT_EVERY == 0:
+                self._evict(now)
+
+    def clear(self, ns: str | None = None) -> None:
+        """Drop every entry (or every entry in one namespace)."""
+        with self._lock:
+            if ns is None:
+                self._conn.execute("DELETE FROM entries")
+            else:
+                self._conn.execute("DELETE FROM entries WHERE ns = ?", (ns,))
+
+    def _evict(self, now: float) -> None:
+        self._conn.execute("DELETE FROM entries WHERE expires_at < ?", (now,))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM entries WHERE rowid IN "
+                "(SELECT rowid FROM entries ORDER BY accessed_at LIMIT ?)",
+                (excess,),
+            )
+            log.info("Cache %s: evicted %d least recently used entries", self.path.name, excess)
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """Return {namespace: {"hits": n, "misses": n}}."""
+        with self._lock:
+            names = set(self.hits) | set(self.misses)
+            return {ns: {"hits": self.hits.get(ns, 0), "misses": self.misses.get(ns, 0)} for ns in sorted(names)}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
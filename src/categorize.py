@@ -1,14 +1,22 @@
 """
 LLM-based categorization of places into one of four categories for My Maps.
-Sends places in batches; returns a dict mapping place name -> category.
+Sends places in batches; returns a dict mapping place key (place_id, else name + address) -> category.
 """
+import hashlib
 import json
 import logging
 import re
+import threading
 import time
-from typing import Any
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
 
 from config import settings
+from src.cache import SqliteCache
+from src.http_transport import jittered_backoff, parse_retry_after
+from src.metrics import metrics
+from src.rate_limit import TokenBucket
 
 log = logging.getLogger(__name__)
 
@@ -72,13 +80,25 @@ def assign_quality_colors(places: list[dict[str, Any]]) -> None:
         )
 
 
-def normalize_category(raw: str) -> str:
-    """Map LLM output to exactly one of the five categories."""
+def quality_color_column(ratings: Any, counts: Any) -> Any:
+    """get_quality_color as a vectorized pyarrow operation over rating and user_ratings_count arrays."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    s = pc.fill_null(pc.cast(ratings, pa.float64()), 0.0)
+    many = pc.greater_equal(pc.fill_null(pc.cast(counts, pa.int64()), 0), 100)
+    high = pc.if_else(many, "green", "yellow")
+    medium = pc.if_else(many, "yellow", "red")
+    return pc.if_else(pc.greater_equal(s, 4.0), high, pc.if_else(pc.less(s, 3.0), "red", medium))
+
+
+def _match_category(raw: Any) -> str | None:
+    """Map LLM output to one of CATEGORIES, or None if it is not recognizable."""
     if not raw or not isinstance(raw, str):
-        return DEFAULT_CATEGORY
+        return None
     s = raw.strip()
     if not s:
-        return DEFAULT_CATEGORY
+        return None
     if s in CATEGORIES:
         return s
     key = s.lower()
@@ -87,8 +107,113 @@ def normalize_category(raw: str) -> str:
     for cat in CATEGORIES:
         if cat.lower() in key:
             return cat
-    log.warning("Unrecognized category %r, defaulting to %s", s, DEFAULT_CATEGORY)
-    return DEFAULT_CATEGORY
+    return None
+
+
+def normalize_category(raw: str) -> str:
+    """Map LLM output to exactly one of the five categories."""
+    cat = _match_category(raw)
+    if cat is None:
+        if raw and isinstance(raw, str) and raw.strip():
+            log.warning("Unrecognized category %r, defaulting to %s", raw.strip(), DEFAULT_CATEGORY)
+        return DEFAULT_CATEGORY
+    return cat
+
+
+# ---------------------------------------------------------------------------
+# Rule-based fast path: Google place types → category (skips the LLM)
+# ---------------------------------------------------------------------------
+# Google type → (category, confidence). Only types that pin down one category are listed;
+# generic types (establishment, food, store, point_of_interest) carry no signal.
+_TYPE_RULES: dict[str, tuple[str, float]] = {
+    # Hotel
+    "lodging": ("Hotel", 0.95),
+    "hotel": ("Hotel", 0.95),
+    "motel": ("Hotel", 0.95),
+    "resort_hotel": ("Hotel", 0.95),
+    "hostel": ("Hotel", 0.95),
+    "inn": ("Hotel", 0.95),
+    "japanese_inn": ("Hotel", 0.95),
+    "budget_japanese_inn": ("Hotel", 0.95),
+    "bed_and_breakfast": ("Hotel", 0.95),
+    "guest_house": ("Hotel", 0.95),
+    "extended_stay_hotel": ("Hotel", 0.95),
+    # Shopping
+    "shopping_mall": ("Shopping", 0.95),
+    "department_store": ("Shopping", 0.95),
+    "clothing_store": ("Shopping", 0.9),
+    "shoe_store": ("Shopping", 0.9),
+    "electronics_store": ("Shopping", 0.9),
+    "book_store": ("Shopping", 0.9),
+    "jewelry_store": ("Shopping", 0.9),
+    "gift_shop": ("Shopping", 0.9),
+    "discount_store": ("Shopping", 0.9),
+    "home_goods_store": ("Shopping", 0.9),
+    "furniture_store": ("Shopping", 0.9),
+    "sporting_goods_store": ("Shopping", 0.9),
+    "supermarket": ("Shopping", 0.85),
+    "convenience_store": ("Shopping", 0.85),
+    # Sweets
+    "bakery": ("Sweets", 0.9),
+    "dessert_shop": ("Sweets", 0.95),
+    "dessert_restaurant": ("Sweets", 0.9),
+    "ice_cream_shop": ("Sweets", 0.95),
+    "confectionery": ("Sweets", 0.95),
+    "candy_store": ("Sweets", 0.95),
+    "chocolate_shop": ("Sweets", 0.95),
+    "donut_shop": ("Sweets", 0.95),
+    # Attractions
+    "museum": ("Attractions", 0.95),
+    "art_gallery": ("Attractions", 0.9),
+    "tourist_attraction": ("Attractions", 0.85),
+    "park": ("Attractions", 0.9),
+    "national_park": ("Attractions", 0.95),
+    "amusement_park": ("Attractions", 0.95),
+    "aquarium": ("Attractions", 0.95),
+    "zoo": ("Attractions", 0.95),
+    "botanical_garden": ("Attractions", 0.95),
+    "historical_landmark": ("Attractions", 0.95),
+    "cultural_landmark": ("Attractions", 0.95),
+    "monument": ("Attractions", 0.95),
+    "observation_deck": ("Attractions", 0.95),
+    "place_of_worship": ("Attractions", 0.9),
+    "church": ("Attractions", 0.9),
+    "hindu_temple": ("Attractions", 0.9),
+    "buddhist_temple": ("Attractions", 0.9),
+    "shinto_shrine": ("Attractions", 0.9),
+    # Street food
+    "food_court": ("Street food", 0.85),
+    # Restaurants
+    "restaurant": ("Restaurants", 0.85),
+    "fine_dining_restaurant": ("Restaurants", 0.95),
+}
+# Any other "<cuisine>_restaurant" type counts as a restaurant.
+_RESTAURANT_SUFFIX = ("_restaurant", ("Restaurants", 0.85))
+# Confidence lost when a second category also matches (e.g. a hotel with a restaurant).
+_CONFLICT_PENALTY = 0.3
+
+
+def classify_by_types(place: dict[str, Any]) -> tuple[str, float] | None:
+    """
+    Classify a place from its Google `types` alone. Returns (category, confidence) or None
+    when no type carries a signal. Conflicting categories lower the confidence.
+    """
+    best: dict[str, float] = {}
+    for t in place.get("types") or []:
+        rule = _TYPE_RULES.get(t)
+        if rule is None and t.endswith(_RESTAURANT_SUFFIX[0]):
+            rule = _RESTAURANT_SUFFIX[1]
+        if rule is None:
+            continue
+        category, confidence = rule
+        best[category] = max(best.get(category, 0.0), confidence)
+    if not best:
+        return None
+    ranked = sorted(best.items(), key=lambda kv: kv[1], reverse=True)
+    category, confidence = ranked[0]
+    if len(ranked) > 1:
+        confidence -= _CONFLICT_PENALTY
+    return category, round(confidence, 2)
 
 
 def _format_place_block(place: dict[str, Any], number: int) -> str:
@@ -117,10 +242,32 @@ Types: {types_str}
 {rating_line}{snippet}"""
 
 
+def _cascade_enabled() -> bool:
+    """Whether batches go to the fast model first (LLM_CASCADE_MODEL / OPENAI_CASCADE_MODEL)."""
+    return bool(settings.LLM_CASCADE_MODEL or settings.OPENAI_CASCADE_MODEL)
+
+
+def _wants_confidence() -> bool:
+    """Whether batch replies carry a confidence per place (needed by the cascade and PLACES_DETAILS_TIERED)."""
+    return _cascade_enabled() or settings.PLACES_DETAILS_TIERED
+
+
 def _build_batch_prompt(places: list[dict[str, Any]]) -> str:
-    """Build one prompt for a batch of places; ask for JSON { "1": "Category", "2": "Category", ... }."""
+    """
+    Build one prompt for a batch of places; ask for JSON { "1": "Category", "2": "Category", ... },
+    or { "1": {"category": ..., "confidence": ...}, ... } when confidences are wanted.
+    """
     blocks = [_format_place_block(p, i + 1) for i, p in enumerate(places)]
     places_text = "\n".join(blocks)
+    if _wants_confidence():
+        return f"""Classify each place below into exactly one category.
+
+{places_text}
+
+Categories (use exactly these): {', '.join(CATEGORIES)}.
+
+Reply with a JSON object only. Keys are the place numbers as strings ("1", "2", "3", ...). Values are objects with "category" (the category for that place) and "confidence" (a number from 0 to 1: how sure you are, given only the information above). No other text.
+Example: {{"1": {{"category": "Restaurants", "confidence": 0.95}}, "2": {{"category": "Shopping", "confidence": 0.6}}}}"""
     return f"""Classify each place below into exactly one category.
 
 {places_text}
@@ -131,94 +278,894 @@ Reply with a JSON object only. Keys are the place numbers as strings ("1", "2",
 Example: {{"1": "Restaurants", "2": "Shopping", "3": "Attractions"}}"""
 
 
-def _parse_batch_response(raw: str, places: list[dict[str, Any]]) -> dict[str, str]:
-    """
-    Parse LLM response into {place_name: category}. Validates each value with normalize_category.
-    Uses place number keys ("1", "2", ...) to match response to places by index.
-    """
-    result: dict[str, str] = {}
+def _parse_json_object(raw: str) -> Any | None:
+    """Extract and decode the JSON in an LLM reply (handles markdown code blocks); None if invalid."""
     raw = raw.strip()
-    # Extract JSON (handle markdown code blocks)
     json_str = raw
     if "```" in raw:
         match = re.search(r"```(?:json)?\s*([\s\S]*?)```", raw)
         if match:
             json_str = match.group(1).strip()
     try:
-        parsed = json.loads(json_str)
+        return json.loads(json_str)
     except json.JSONDecodeError as e:
         log.warning("Batch response JSON parse failed: %s. Raw: %s", e, raw[:200])
-        for i, place in enumerate(places):
-            name = place.get("name") or ""
-            result[name] = DEFAULT_CATEGORY
-        return result
+        return None
+
+
+def _parse_confidence(raw: Any) -> float | None:
+    if isinstance(raw, bool) or not isinstance(raw, (int, float, str)):
+        return None
+    try:
+        return min(1.0, max(0.0, float(raw)))
+    except ValueError:
+        return None
+
+
+def _parse_batch_categories(raw: str, count: int) -> dict[int, tuple[str, float | None]]:
+    """
+    Parse an LLM reply for a batch of `count` places into {index: (category, confidence)} (0-based).
+    Values may be a category or {"category": ..., "confidence": ...}; confidence is None when absent.
+    Places whose key is missing or whose value is not a recognizable category are left out.
+    """
+    parsed = _parse_json_object(raw)
     if not isinstance(parsed, dict):
-        for i, place in enumerate(places):
-            name = place.get("name") or ""
-            result[name] = DEFAULT_CATEGORY
-        return result
-    for i, place in enumerate(places):
-        name = place.get("name") or ""
-        key = str(i + 1)
-        raw_cat = parsed.get(key) or parsed.get(str(i)) or parsed.get(i + 1)
-        result[name] = normalize_category(str(raw_cat) if raw_cat is not None else "")
+        return {}
+    # Replies normally number places from "1"; accept 0-based numbering only if the reply uses "0".
+    offset = 0 if "0" in parsed else 1
+    result: dict[int, tuple[str, float | None]] = {}
+    for i in range(count):
+        value = parsed.get(str(i + offset))
+        confidence = None
+        if isinstance(value, dict):
+            confidence = _parse_confidence(value.get("confidence"))
+            value = value.get("category")
+        cat = _match_category(value)
+        if cat is not None:
+            result[i] = (cat, confidence)
     return result
 
 
-def _call_openai(prompt: str) -> str:
-    from openai import OpenAI
+# ---------------------------------------------------------------------------
+# Category cache (place + model + prompt fingerprint → category)
+# ---------------------------------------------------------------------------
+_cache: SqliteCache | None = None
+_cache_lock = threading.Lock()
+
+# Sample place used to fingerprint the per-place prompt block.
+_FINGERPRINT_PLACE = {"name": "N", "types": ["t"], "rating": 1, "user_ratings_count": 1, "reviews": ["r"]}
 
-    client = OpenAI(
-        base_url="https://generativelanguage.googleapis.com/v1beta/openai/",
-        api_key=settings.GEMINI_API_KEY,
-    )
-    response = client.chat.completions.create(
-        model="gemini-2.5-flash",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0,
-        max_tokens=200000,
-    )
+
+def place_key(place: dict[str, Any]) -> str:
+    """Stable identity of a place: its place_id, else normalized name + address."""
+    place_id = place.get("place_id")
+    if place_id:
+        return place_id if place_id.startswith("places/") else f"places/{place_id}"
+    name = " ".join((place.get("name") or "").split()).casefold()
+    address = " ".join((place.get("address") or "").split()).casefold()
+    return f"name:{name}|{address}"
+
+
+def prompt_fingerprint() -> str:
+    """Hash of the prompt template, CATEGORIES and _CATEGORY_ALIASES; changes whenever any of them do."""
+    parts = [
+        _build_batch_prompt([_FINGERPRINT_PLACE]),
+        json.dumps(CATEGORIES),
+        json.dumps(_CATEGORY_ALIASES, sort_keys=True),
+    ]
+    return hashlib.sha256("\n".join(parts).encode("utf-8")).hexdigest()[:16]
+
+
+def get_category_cache() -> SqliteCache | None:
+    """
+    Return the shared category cache, or None when CATEGORY_CACHE_ENABLED is off.
+    Keys include the prompt fingerprint, so entries from another prompt/categories/confidence mode
+    are simply not hit (and stay usable when switching back); TTL and the LRU bound evict them.
+    """
+    global _cache
+    if not settings.CATEGORY_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = SqliteCache(
+                settings.CATEGORY_CACHE_PATH,
+                ttl_seconds=settings.CATEGORY_CACHE_TTL_DAYS * 86400,
+                max_entries=settings.CATEGORY_CACHE_MAX_ENTRIES,
+            )
+        return _cache
+
+
+def _answering_models() -> str:
+    """
+    The models that may answer a batch: every configured provider's model ("fast>strong" with the
+    cascade), sorted, since failover can send any batch to any provider.
+    """
+    cascade = _cascade_enabled()
+    models = {
+        f"{p.fast_model}>{p.model}" if cascade and p.fast_model else p.model
+        for p in get_provider_pool().providers
+    }
+    return "+".join(sorted(models))
+
+
+def category_cache_key(place: dict[str, Any], fingerprint: str) -> str:
+    return f"{_answering_models()}|{fingerprint}|{place_key(place)}"
+
+
+# ---------------------------------------------------------------------------
+# LLM providers, clients and rate limits (shared by all categorization workers)
+# ---------------------------------------------------------------------------
+class LLMProvider:
+    """One API key on one OpenAI-compatible endpoint/model(s), with its own rate limits and health state."""
+
+    def __init__(
+        self,
+        name: str,
+        base_url: str,
+        api_key: str,
+        model: str,
+        requests_per_minute: float,
+        tokens_per_minute: float,
+        fast_model: str | None = None,
+        reasoning_effort: str = "",
+    ) -> None:
+        self.name = name
+        self.base_url = base_url
+        self.api_key = api_key
+        self.model = model
+        # Model for the cascade's fast tier (the main model when none is configured).
+        self.fast_model = fast_model or model
+        # Sent as reasoning_effort when set (e.g. "none" keeps thinking tokens out of the output cap).
+        self.reasoning_effort = reasoning_effort
+        self.request_limiter = TokenBucket(requests_per_minute / 60.0, capacity=max(1, settings.LLM_WORKERS))
+        self.token_limiter = TokenBucket(tokens_per_minute / 60.0, capacity=max(1.0, tokens_per_minute))
+        self.in_flight = 0
+        self.failures = 0
+        self.cooldown_until = 0.0
+        self.last_used = 0.0
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self):
+        """The OpenAI-compatible client for this key, created on first use (retries are left to the pool)."""
+        with self._client_lock:
+            if self._client is None:
+                from openai import OpenAI
+
+                self._client = OpenAI(base_url=self.base_url, api_key=self.api_key, max_retries=0)
+            return self._client
+
+    def __repr__(self) -> str:
+        return f"{self.name} ({self.model}, key {settings.mask_key(self.api_key)})"
+
+
+class ProviderPool:
+    """
+    Spreads LLM calls over several providers: each call goes to the healthy provider with the
+    fewest requests in flight. A throttled (429) provider cools down for its Retry-After (or
+    LLM_PROVIDER_COOLDOWN); after LLM_PROVIDER_MAX_FAILURES consecutive errors a provider is
+    treated as down for LLM_PROVIDER_OUTAGE_COOLDOWN seconds.
+    """
+
+    def __init__(self, providers: list[LLMProvider]) -> None:
+        if not providers:
+            raise ValueError("No LLM API key set (GEMINI_API_KEY / GEMINI_API_KEYS, or OPENAI_API_KEY with LLM_PROVIDERS)")
+        self.providers = providers
+        self._lock = threading.Lock()
+
+    def acquire(self, exclude: set[str] | frozenset[str] = frozenset()) -> LLMProvider:
+        """Reserve the best available provider not in `exclude`, waiting while every candidate cools down."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                candidates = [p for p in self.providers if p.name not in exclude] or self.providers
+                ready = [p for p in candidates if p.cooldown_until <= now]
+                if ready:
+                    provider = min(ready, key=lambda p: (p.in_flight, p.last_used))
+                    provider.in_flight += 1
+                    provider.last_used = now
+                    return provider
+                delay = min(p.cooldown_until for p in candidates) - now
+            log.warning("All LLM providers cooling down; waiting %.1fs", delay)
+            time.sleep(delay)
+
+    def release(self, provider: LLMProvider, ok: bool, throttled: bool = False, retry_after: float | None = None) -> None:
+        """Record the outcome of a call made with `provider`."""
+        with self._lock:
+            provider.in_flight -= 1
+            if ok:
+                provider.failures = 0
+                return
+            provider.failures += 1
+            if throttled:
+                cooldown = retry_after if retry_after is not None else settings.LLM_PROVIDER_COOLDOWN
+            elif provider.failures >= settings.LLM_PROVIDER_MAX_FAILURES:
+                cooldown = settings.LLM_PROVIDER_OUTAGE_COOLDOWN
+                log.warning("LLM provider %s marked down after %d consecutive failures", provider.name, provider.failures)
+            else:
+                cooldown = 0.0
+            provider.cooldown_until = max(provider.cooldown_until, time.monotonic() + cooldown)
+
+    def status(self) -> list[dict[str, Any]]:
+        """Per-provider health snapshot (for logs and reports)."""
+        with self._lock:
+            now = time.monotonic()
+            return [
+                {
+                    "name": p.name,
+                    "model": p.model,
+                    "in_flight": p.in_flight,
+                    "consecutive_failures": p.failures,
+                    "cooling_down_s": round(max(0.0, p.cooldown_until - now), 1),
+                }
+                for p in self.providers
+            ]
+
+
+_pool: ProviderPool | None = None
+_pool_lock = threading.Lock()
+
+
+def _configured_providers() -> list[LLMProvider]:
+    """Build one LLMProvider per configured key, for the providers listed in LLM_PROVIDERS."""
+    providers = []
+    if "gemini" in settings.LLM_PROVIDERS:
+        for i, key in enumerate(settings.GEMINI_API_KEYS):
+            providers.append(
+                LLMProvider(
+                    "gemini" if i == 0 else f"gemini#{i + 1}",
+                    settings.LLM_BASE_URL,
+                    key,
+                    settings.LLM_MODEL,
+                    settings.LLM_REQUESTS_PER_MINUTE,
+                    settings.LLM_TOKENS_PER_MINUTE,
+                    fast_model=settings.LLM_CASCADE_MODEL,
+                    reasoning_effort=settings.LLM_REASONING_EFFORT,
+                )
+            )
+    if "openai" in settings.LLM_PROVIDERS:
+        for i, key in enumerate(settings.OPENAI_API_KEYS):
+            providers.append(
+                LLMProvider(
+                    "openai" if i == 0 else f"openai#{i + 1}",
+                    settings.OPENAI_BASE_URL,
+                    key,
+                    settings.OPENAI_MODEL,
+                    settings.OPENAI_REQUESTS_PER_MINUTE,
+                    settings.OPENAI_TOKENS_PER_MINUTE,
+                    fast_model=settings.OPENAI_CASCADE_MODEL,
+                    reasoning_effort=settings.OPENAI_REASONING_EFFORT,
+                )
+            )
+    return providers
+
+
+def get_provider_pool() -> ProviderPool:
+    """Return the shared provider pool, building it from settings on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProviderPool(_configured_providers())
+            log.info("LLM providers: %s", ", ".join(repr(p) for p in _pool.providers))
+        return _pool
+
+
+def _estimate_tokens(text: str) -> int:
+    """Rough token count for rate limiting (~4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+def _max_output_tokens(batch_len: int) -> int:
+    """Output token cap for a batch, sized from its number of places (doubled per place for confidences)."""
+    per_place = settings.LLM_OUTPUT_TOKENS_PER_PLACE * (2 if _wants_confidence() else 1)
+    return settings.LLM_OUTPUT_TOKENS_BASE + per_place * batch_len
+
+
+def _response_format(count: int) -> dict[str, Any] | None:
+    """Structured output request for a batch of `count` places (per LLM_RESPONSE_FORMAT)."""
+    mode = settings.LLM_RESPONSE_FORMAT
+    if mode == "json_object":
+        return {"type": "json_object"}
+    if mode == "json_schema":
+        keys = [str(i + 1) for i in range(count)]
+        value: dict[str, Any] = {"type": "string", "enum": CATEGORIES}
+        if _wants_confidence():
+            value = {
+                "type": "object",
+                "properties": {"category": value, "confidence": {"type": "number", "minimum": 0, "maximum": 1}},
+                "required": ["category", "confidence"],
+            }
+        return {
+            "type": "json_schema",
+            "json_schema": {
+                "name": "categories",
+                "schema": {
+                    "type": "object",
+                    "properties": {k: value for k in keys},
+                    "required": keys,
+                },
+            },
+        }
+    return None
+
+
+def _call_openai(
+    provider: LLMProvider,
+    prompt: str,
+    max_tokens: int,
+    response_format: dict[str, Any] | None = None,
+    tier: str = "strong",
+) -> str:
+    """One chat completion with the provider's model for `tier` ("fast" = cascade model, "strong" = main model)."""
+    provider.request_limiter.acquire()
+    provider.token_limiter.acquire(_estimate_tokens(prompt))
+    kwargs: dict[str, Any] = {}
+    if response_format is not None:
+        kwargs["response_format"] = response_format
+    if provider.reasoning_effort:
+        kwargs["reasoning_effort"] = provider.reasoning_effort
+    model = provider.fast_model if tier == "fast" else provider.model
+    labels = {"provider": provider.name, "model": model, "tier": tier}
+    started = time.monotonic()
+    try:
+        response = provider.client.chat.completions.create(
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0,
+            max_tokens=max_tokens,
+            **kwargs,
+        )
+    except Exception:
+        metrics.inc("llm_requests_total", outcome="error", **labels)
+        raise
+    finally:
+        metrics.inc("llm_request_seconds_total", time.monotonic() - started, **labels)
+    metrics.inc("llm_requests_total", outcome="ok", **labels)
+    usage = getattr(response, "usage", None)
+    if usage is not None:
+        metrics.inc("llm_prompt_tokens_total", usage.prompt_tokens or 0, **labels)
+        metrics.inc("llm_completion_tokens_total", usage.completion_tokens or 0, **labels)
     raw = (response.choices[0].message.content or "").strip()
     return raw
 
 
-def _call_llm(prompt: str) -> str:
-    """Call the configured LLM (Gemini via OpenAI-compatible endpoint)."""
-    if settings.GEMINI_API_KEY:
-        return _call_openai(prompt)
-    raise ValueError("No LLM API key set (GEMINI_API_KEY)")
+def _classify_llm_error(e: Exception) -> tuple[bool, bool, float | None]:
+    """(retryable on another provider, throttled, Retry-After seconds) for an LLM call error."""
+    import openai
+
+    status = getattr(e, "status_code", None)
+    if status == 429:
+        response = getattr(e, "response", None)
+        retry_after = parse_retry_after(response.headers.get("retry-after")) if response is not None else None
+        return True, True, retry_after
+    if isinstance(e, openai.APIConnectionError) or (status is not None and status >= 500):
+        return True, False, None
+    return False, False, None
+
+
+def _is_fatal_llm_error(e: Exception) -> bool:
+    """
+    Errors no retry or recovery call can fix: the request or key was rejected (4xx other than 408/409/429)
+    or no provider could be set up (missing key or client library).
+    """
+    status = getattr(e, "status_code", None)
+    if status is not None:
+        return 400 <= status < 500 and status not in (408, 409, 429)
+    return isinstance(e, (ValueError, ImportError))
+
 
+def _call_llm(prompt: str, max_tokens: int, response_format: dict[str, Any] | None = None, tier: str = "strong") -> str:
+    """
+    Call the LLM through the provider pool. On 429, 5xx or a connection error the same prompt is
+    sent to the next provider (up to LLM_FAILOVER_MAX_ATTEMPTS attempts), so the batch is not lost.
+    Once every provider has been tried, the next round waits a jittered backoff first.
+    """
+    pool = get_provider_pool()
+    attempts = settings.LLM_FAILOVER_MAX_ATTEMPTS or max(3, 2 * len(pool.providers))
+    tried: set[str] = set()
+    attempt = 0
+    rounds = 0
+    while True:
+        attempt += 1
+        provider = pool.acquire(tried)
+        try:
+            raw = _call_openai(provider, prompt, max_tokens, response_format, tier)
+        except Exception as e:
+            retryable, throttled, retry_after = _classify_llm_error(e)
+            pool.release(provider, ok=False, throttled=throttled, retry_after=retry_after)
+            if not retryable or attempt == attempts:
+                raise
+            metrics.inc("llm_failovers_total", provider=provider.name, reason="throttled" if throttled else "error")
+            log.warning("LLM provider %s failed (%s); failing over (attempt %d/%d)", provider.name, e, attempt, attempts)
+            tried.add(provider.name)
+            if len(tried) >= len(pool.providers):
+                tried.clear()
+                delay = jittered_backoff(rounds, settings.LLM_BACKOFF_BASE, settings.LLM_BACKOFF_MAX)
+                rounds += 1
+                log.warning("Every LLM provider failed; retrying in %.1fs", delay)
+                time.sleep(delay)
+            continue
+        pool.release(provider, ok=True)
+        return raw
 
-def _categorize_batch(places: list[dict[str, Any]]) -> dict[str, str]:
-    """Call LLM once for a batch; return {place_name: category} with validated categories."""
+
+def _ask_batch(places: list[dict[str, Any]], tier: str = "strong") -> dict[int, tuple[str, float | None]]:
+    """One LLM call for a batch; return {index: (category, confidence)} for the places the reply resolved."""
     prompt = _build_batch_prompt(places)
-    raw = _call_llm(prompt)
-    return _parse_batch_response(raw, places)
+    raw = _call_llm(prompt, _max_output_tokens(len(places)), _response_format(len(places)), tier)
+    return _parse_batch_categories(raw, len(places))
 
 
-def categorize_places(places: list[dict[str, Any]]) -> dict[str, str]:
+def _recover(places: list[dict[str, Any]], budget: list[int]) -> dict[int, tuple[str, float | None]]:
     """
-    Categorize places in batches. Returns {place_name: category} with validated categories.
-    Uses CATEGORIZE_BATCH_SIZE places per request; delay between requests per LLM_REQUEST_DELAY.
+    Re-ask `places` until each is resolved or the call budget runs out. Only unresolved places
+    are re-sent; when a call resolves none of them the set is bisected. Returns {index: (category, confidence)}.
     """
-    if not places:
+    if not places or budget[0] <= 0:
         return {}
+    budget[0] -= 1
+    try:
+        got = _ask_batch(places)
+    except Exception as e:
+        if _is_fatal_llm_error(e):
+            raise
+        log.warning("Recovery call for %d places failed: %s", len(places), e)
+        got = {}
+    missing = [i for i in range(len(places)) if i not in got]
+    if not missing:
+        return got
+    if len(missing) < len(places):
+        sub = _recover([places[i] for i in missing], budget)
+        got.update({missing[j]: cat for j, cat in sub.items()})
+        return got
+    if len(places) == 1:
+        return {}
+    mid = len(places) // 2
+    left = _recover(places[:mid], budget)
+    right = _recover(places[mid:], budget)
+    left.update({mid + j: cat for j, cat in right.items()})
+    return left
+
+
+def _run_batch(
+    places: list[dict[str, Any]],
+    tier: str = "strong",
+) -> tuple[dict[int, tuple[str, float | None]], bool]:
+    """
+    Categorize a batch, re-asking only places that were missing or unparseable in the reply, or the
+    whole batch after a transport error that survived failover (at most CATEGORIZE_RECOVERY_MAX_CALLS
+    extra calls; none on the cascade's fast tier, whose missing places go to the strong tier instead).
+    Fatal errors (see _is_fatal_llm_error) are raised instead. Returns ({index: (category, confidence)}
+    for resolved places, whether the first reply covered the whole batch).
+    """
+    try:
+        got = _ask_batch(places, tier)
+    except Exception as e:
+        if _is_fatal_llm_error(e):
+            raise
+        log.warning("Batch call for %d places failed: %s", len(places), e)
+        got = {}
+    missing = [i for i in range(len(places)) if i not in got]
+    if not missing:
+        return got, True
+    if tier == "fast":
+        return got, False
+    log.warning("Batch: %d of %d places missing or unparseable; re-asking those", len(missing), len(places))
+    budget = [settings.CATEGORIZE_RECOVERY_MAX_CALLS]
+    sub = _recover([places[i] for i in missing], budget)
+    got.update({missing[j]: cat for j, cat in sub.items()})
+    unresolved = len(places) - len(got)
+    if unresolved:
+        log.warning("Batch: %d places still unresolved after recovery; using %s", unresolved, DEFAULT_CATEGORY)
+    return got, False
+
+
+def _needs_strong(answer: tuple[str, float | None] | None) -> bool:
+    """Whether a fast-tier answer is escalated: missing, without a confidence, or below LLM_CASCADE_MIN_CONFIDENCE."""
+    return answer is None or answer[1] is None or answer[1] < settings.LLM_CASCADE_MIN_CONFIDENCE
+
+
+def _split_fast_answers(
+    places: list[dict[str, Any]],
+    answers: dict[int, tuple[str, float | None]],
+    fallback: dict[str, tuple[str, float | None]],
+) -> tuple[dict[int, tuple[str, float | None]], list[int]]:
+    """
+    Split a fast-tier reply for `places` into the answers accepted as final and the indexes to re-ask
+    on the strong tier (see _needs_strong). Fast answers of escalated places are kept in `fallback`
+    ({place_key: answer}) for when the strong tier has none. Counted in llm_cascade_places_total.
+    """
+    accepted: dict[int, tuple[str, float | None]] = {}
+    unsure: list[int] = []
+    for i, place in enumerate(places):
+        answer = answers.get(i)
+        if not _needs_strong(answer):
+            accepted[i] = answer
+            continue
+        unsure.append(i)
+        if answer is not None:
+            fallback[place_key(place)] = answer
+    metrics.inc("llm_cascade_places_total", len(accepted), outcome="accepted")
+    metrics.inc("llm_cascade_places_total", len(unsure), outcome="escalated")
+    return accepted, unsure
+
+
+def _strong_or_fallback(
+    place: dict[str, Any],
+    answer: tuple[str, float | None] | None,
+    fallback: dict[str, tuple[str, float | None]],
+) -> tuple[str, float | None] | None:
+    """The strong-tier answer for a place, else its fast-tier answer from `fallback` (if it was escalated)."""
+    fast = fallback.pop(place_key(place), None)
+    return answer if answer is not None else fast
+
+
+def run_cascade(places: list[dict[str, Any]]) -> tuple[dict[int, tuple[str, float | None]], bool]:
+    """
+    _run_batch through the model cascade for one batch: the fast tier first, then one strong-tier
+    batch for the places it was unsure about. Used where batches are latency-bound (service
+    micro-batches); Categorizer pools escalated places across batches instead. Without a cascade
+    model this is _run_batch.
+    """
+    if not _cascade_enabled():
+        return _run_batch(places)
+    got, ok = _run_batch(places, "fast")
+    fallback: dict[str, tuple[str, float | None]] = {}
+    accepted, unsure = _split_fast_answers(places, got, fallback)
+    if not unsure:
+        return accepted, ok
+    strong, strong_ok = _run_batch([places[i] for i in unsure])
+    for j, i in enumerate(unsure):
+        answer = _strong_or_fallback(places[i], strong.get(j), fallback)
+        if answer is not None:
+            accepted[i] = answer
+    return accepted, ok and strong_ok
+
+
+# ---------------------------------------------------------------------------
+# Adaptive batching (token budget + feedback from latency and parse failures)
+# ---------------------------------------------------------------------------
+class AdaptiveBatcher:
+    """
+    Packs places into batches by estimated prompt tokens, up to `token_budget` and `size` places.
+    `size` starts at max_size, halves on a parse failure or error, shrinks when a batch is slower
+    than target_latency and grows again when batches come back fast.
+    """
+
+    def __init__(self, max_size: int, min_size: int, token_budget: int, target_latency: float) -> None:
+        self.max_size = max(1, max_size)
+        self.min_size = max(1, min(min_size, self.max_size))
+        self.size = self.max_size
+        self.token_budget = token_budget
+        self.target_latency = target_latency
+        self._overhead = _estimate_tokens(_build_batch_prompt([]))
+        self._lock = threading.Lock()
+
+    def next_batch(self, queue: deque) -> list[dict[str, Any]]:
+        """Pop the next batch off `queue` (always at least one place)."""
+        with self._lock:
+            size = self.size
+        batch: list[dict[str, Any]] = []
+        tokens = self._overhead
+        while queue and len(batch) < size:
+            cost = _estimate_tokens(_format_place_block(queue[0], len(batch) + 1))
+            if batch and tokens + cost > self.token_budget:
+                break
+            batch.append(queue.popleft())
+            tokens += cost
+        return batch
+
+    def is_full(self, queue: deque) -> bool:
+        """Whether `queue` holds a whole batch (the current size or the token budget)."""
+        with self._lock:
+            size = self.size
+        if len(queue) >= size:
+            return True
+        tokens = self._overhead
+        for i, place in enumerate(queue):
+            tokens += _estimate_tokens(_format_place_block(place, i + 1))
+            if i and tokens > self.token_budget:
+                return True
+        return False
+
+    def record(self, latency: float, ok: bool) -> None:
+        """Adapt the batch size from one finished batch."""
+        with self._lock:
+            old = self.size
+            if not ok:
+                self.size = max(self.min_size, self.size // 2)
+            elif latency > self.target_latency:
+                self.size = max(self.min_size, int(self.size * 0.75))
+            elif latency < self.target_latency / 2:
+                self.size = min(self.max_size, self.size + max(1, self.size // 4))
+            if self.size != old:
+                log.info("Batch size %d → %d (latency %.1fs, ok=%s)", old, self.size, latency, ok)
+
+
+def _timed_batch(batch: list[dict[str, Any]], tier: str = "strong") -> tuple[dict[int, tuple[str, float | None]], bool, float]:
+    started = time.monotonic()
+    result, ok = _run_batch(batch, tier)
+    return result, ok, time.monotonic() - started
+
+
+def resolve_locally(
+    places: list[dict[str, Any]],
+    combined: dict[str, str],
+    cache: SqliteCache | None = None,
+    fingerprint: str = "",
+    counts: dict[str, int] | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Categorize places into `combined` by their Google types (FAST_PATH_ENABLED) or from the category
+    cache; return the places that still need the LLM. `counts` ({"rules": n, "cache": n}) is added to.
+    """
+    pending = []
+    for place in places:
+        match = classify_by_types(place) if settings.FAST_PATH_ENABLED else None
+        if match and match[1] >= settings.FAST_PATH_MIN_CONFIDENCE:
+            combined[place_key(place)] = match[0]
+            source = "rules"
+            log.info("Rules: %s → %s (confidence %.2f)", place.get("name") or "", match[0], match[1])
+        else:
+            if settings.FAST_PATH_ENABLED:
+                metrics.inc("fast_path_places_total", outcome="forwarded")
+            cached = cache.get("categories", category_cache_key(place, fingerprint)) if cache is not None else None
+            if not cached:
+                pending.append(place)
+                continue
+            combined[place_key(place)] = cached
+            source = "cache"
+        metrics.inc("categorized_places_total", source=source)
+        if source == "rules":
+            metrics.inc("fast_path_places_total", outcome="resolved")
+        if counts is not None:
+            counts[source] = counts.get(source, 0) + 1
+    return pending
+
+
+def log_local_resolution(total: int, counts: dict[str, int]) -> None:
+    """Log how many of `total` places the rules and the cache resolved; count the LLM batch calls the rules avoided."""
+    if not total:
+        return
+    by_rules = counts.get("rules", 0)
     batch_size = max(1, getattr(settings, "CATEGORIZE_BATCH_SIZE", 30))
-    delay = max(0.0, settings.LLM_REQUEST_DELAY)
-    combined: dict[str, str] = {}
-    for start in range(0, len(places), batch_size):
-        batch = places[start : start + batch_size]
-        if start > 0 and delay > 0:
-            time.sleep(delay)
+    avoided = -(-total // batch_size) - (-(-(total - by_rules) // batch_size))
+    metrics.inc("llm_batches_avoided_total", avoided, source="rules")
+    if settings.FAST_PATH_ENABLED:
+        log.info("Rule pre-classifier: %d/%d places resolved locally, %d LLM batch calls avoided", by_rules, total, avoided)
+    if settings.CATEGORY_CACHE_ENABLED:
+        log.info("Category cache: %d/%d places cached", counts.get("cache", 0), total - by_rules)
+
+
+class Categorizer:
+    """
+    Long-lived batch categorizer that places are added to as they arrive (the streaming pipeline adds
+    each enriched place; categorize_places adds them all at once). Rule and cache hits resolve in add();
+    the rest are packed by one AdaptiveBatcher per cascade tier, so batch sizes adapt over the whole
+    run, and a batch is sent as soon as a full one is queued and one of `workers` (default LLM_WORKERS)
+    slots is free. close() sends what is left and waits. With a cascade model, batches go to it first
+    and the places it is unsure about are re-batched to the main model.
+    on_categorized(place, category) is called (from a worker thread) for every place an LLM batch
+    resolved; confidences from the reply go to `confidences` ({place_key: confidence}) first.
+    Provisional answers (see is_provisional) are not cached. A fatal LLM error (see
+    _is_fatal_llm_error) stops the run: nothing more is sent and add() / close() raise it.
+    """
+
+    def __init__(
+        self,
+        workers: int | None = None,
+        on_categorized: Callable[[dict[str, Any], str], None] | None = None,
+        confidences: dict[str, float] | None = None,
+    ) -> None:
+        self.workers = max(1, settings.LLM_WORKERS if workers is None else workers)
+        self.on_categorized = on_categorized
+        self.confidences = confidences
+        self.categories: dict[str, str] = {}
+        self._cache = get_category_cache()
+        self._fingerprint = prompt_fingerprint()
+        self._added = 0
+        self._local: dict[str, int] = {}
+        # With a cascade, places start on the fast tier; the ones it is unsure about join the strong queue.
+        self._queues: dict[str, deque] = {"fast": deque(), "strong": deque()} if _cascade_enabled() else {"strong": deque()}
+        self._batchers = {
+            tier: AdaptiveBatcher(
+                max_size=getattr(settings, "CATEGORIZE_BATCH_SIZE", 30),
+                min_size=settings.CATEGORIZE_MIN_BATCH_SIZE,
+                token_budget=settings.CATEGORIZE_INPUT_TOKEN_BUDGET,
+                target_latency=settings.CATEGORIZE_TARGET_LATENCY,
+            )
+            for tier in self._queues
+        }
+        # Fast-tier answers of escalated places, used if the strong tier has no answer.
+        self._fallback: dict[str, tuple[str, float | None]] = {}
+        # Keys waiting in a queue or in flight, so a place added twice is categorized once.
+        self._queued: set[str] = set()
+        self._in_flight: dict[Future, tuple[int, str, list[dict[str, Any]]]] = {}
+        self._reporting = 0
+        self._number = 0
+        self._closing = False
+        self._errors: list[BaseException] = []
+        self._cond = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="categorize")
+
+    def add(self, places: list[dict[str, Any]]) -> dict[str, str]:
+        """
+        Queue `places` (a key added before is skipped). Returns {place_key: category} for the
+        places resolved right away by rules or the cache.
+        """
+        if self._errors:
+            raise self._errors[0]
+        with self._cond:
+            fresh = {}
+            for place in places:
+                key = place_key(place)
+                if key not in self.categories and key not in fresh and key not in self._queued:
+                    fresh[key] = place
+        resolved: dict[str, str] = {}
+        pending = resolve_locally(list(fresh.values()), resolved, self._cache, self._fingerprint, self._local)
+        with self._cond:
+            self._added += len(fresh)
+            self.categories.update(resolved)
+            first = "fast" if "fast" in self._queues else "strong"
+            self._queues[first].extend(pending)
+            self._queued.update(place_key(p) for p in pending)
+            self._dispatch()
+        return resolved
+
+    def close(self) -> dict[str, str]:
+        """Send the queued places (partial batches too), wait for every batch; return {place_key: category}."""
+        with self._cond:
+            self._closing = True
+            self._dispatch()
+            while any(self._queues.values()) or self._in_flight or self._reporting:
+                self._cond.wait()
+        self._executor.shutdown(wait=True)
+        log_local_resolution(self._added, self._local)
+        if self._errors:
+            raise self._errors[0]
+        return dict(self.categories)
+
+    def _next_tier(self) -> str | None:
+        """
+        Only full batches while places are still being added. Fast batches first; escalated places
+        wait for a full strong batch while fast work remains.
+        """
+        fast = self._queues.get("fast")
+        fast_busy = bool(fast) or any(tier == "fast" for _, tier, _ in self._in_flight.values())
+        strong = self._queues["strong"]
+        if strong and (self._batchers["strong"].is_full(strong) or (self._closing and not fast_busy)):
+            return "strong"
+        if fast and (self._closing or self._batchers["fast"].is_full(fast)):
+            return "fast"
+        return None
+
+    def _dispatch(self) -> None:
+        """Send batches while slots are free (called with the lock held)."""
+        while len(self._in_flight) < self.workers:
+            tier = self._next_tier()
+            if tier is None:
+                return
+            # Built only when a slot is free, so each batch uses the latest batch size.
+            batch = self._batchers[tier].next_batch(self._queues[tier])
+            self._number += 1
+            future = self._executor.submit(_timed_batch, batch, tier)
+            self._in_flight[future] = (self._number, tier, batch)
+            future.add_done_callback(self._done)
+
+    def _done(self, future: Future) -> None:
+        with self._cond:
+            batch_number, tier, batch = self._in_flight.pop(future)
+            try:
+                batch_result, ok, latency = future.result()
+            except Exception as e:
+                if _is_fatal_llm_error(e):
+                    log.error("Batch %d (%s) failed: %s; stopping categorization", batch_number, tier, e)
+                    self._errors.append(e)
+                    for queue in self._queues.values():
+                        queue.clear()
+                    self._cond.notify_all()
+                    return
+                log.exception("Batch %d (%s) failed (%d places): %s", batch_number, tier, len(batch), e)
+                self._batchers[tier].record(0.0, ok=False)
+                batch_result = {}
+            else:
+                self._batchers[tier].record(latency, ok)
+            escalated: set[int] = set()
+            if tier == "fast":
+                batch_result, unsure = _split_fast_answers(batch, batch_result, self._fallback)
+                self._queues["strong"].extend(batch[i] for i in unsure)
+                escalated.update(unsure)
+                if unsure:
+                    log.info("Batch %d (fast): %d of %d places escalated", batch_number, len(unsure), len(batch))
+            answered = []
+            for i, place in enumerate(batch):
+                if i in escalated:
+                    continue
+                key = place_key(place)
+                answer = batch_result.get(i)
+                if tier == "strong":
+                    answer = _strong_or_fallback(place, answer, self._fallback)
+                self._queued.discard(key)
+                if answer is None:
+                    self.categories[key] = DEFAULT_CATEGORY
+                    metrics.inc("categorized_places_total", source="default")
+                    continue
+                self.categories[key] = answer[0]
+                if answer[1] is not None and self.confidences is not None:
+                    self.confidences[key] = answer[1]
+                count_llm_answer(place, answer[1])
+                log.info("Batch %d (%s): %s → %s", batch_number, tier, place.get("name") or "", answer[0])
+                answered.append((place, answer))
+            self._reporting += 1
+            self._dispatch()
         try:
-            batch_result = _categorize_batch(batch)
-            combined.update(batch_result)
-            for place in batch:
-                name = place.get("name") or ""
-                cat = batch_result.get(name, DEFAULT_CATEGORY)
-                log.info("Batch %d: %s → %s", (start // batch_size) + 1, name, cat)
-        except Exception as e:
-            log.exception("Batch failed (places %d-%d): %s", start + 1, start + len(batch), e)
-            for place in batch:
-                combined[place.get("name") or ""] = DEFAULT_CATEGORY
-    return combined
+            for place, (category, confidence) in answered:
+                if self._cache is not None and not is_provisional(place, confidence):
+                    self._cache.set("categories", category_cache_key(place, self._fingerprint), category)
+                if self.on_categorized is not None:
+                    self.on_categorized(place, category)
+        except BaseException as e:
+            self._errors.append(e)
+        finally:
+            with self._cond:
+                self._reporting -= 1
+                self._cond.notify_all()
+
+
+def categorize_places(
+    places: list[dict[str, Any]],
+    workers: int | None = None,
+    on_categorized: Callable[[dict[str, Any], str], None] | None = None,
+    confidences: dict[str, float] | None = None,
+) -> dict[str, str]:
+    """
+    Categorize places in batches. Returns {place_key: category} with validated categories; places
+    sharing a key (same place_id, or same name + address) are categorized once. Places with
+    unambiguous Google types (FAST_PATH_ENABLED) and cached places skip the LLM.
+    Batches are packed up to CATEGORIZE_INPUT_TOKEN_BUDGET estimated prompt tokens and at most
+    CATEGORIZE_BATCH_SIZE places, adapting to observed latency and parse failures (see Categorizer).
+    Up to `workers` (default LLM_WORKERS) requests stay in flight, all drawing from the
+    LLM_REQUESTS_PER_MINUTE / LLM_TOKENS_PER_MINUTE limits. Results are merged in input order.
+    on_categorized(place, category) is called as each LLM batch completes, for every place it resolved
+    (rule and cache hits are cheap to redo and are not reported).
+    When the reply carries confidences they are stored in `confidences` ({place_key: confidence})
+    before on_categorized is called.
+    """
+    if not places:
+        return {}
+    categorizer = Categorizer(workers, on_categorized, confidences)
+    categorizer.add(places)
+    categories = categorizer.close()
+    return {key: categories[key] for key in dict.fromkeys(place_key(p) for p in places)}
+
+
+def is_provisional(place: dict[str, Any], confidence: float | None) -> bool:
+    """
+    Whether an answer is provisional under PLACES_DETAILS_TIERED: the place was categorized from
+    lean details (no "reviews" field) with confidence below PLACES_REVIEWS_MIN_CONFIDENCE, so its
+    reviews are fetched and it is categorized again.
+    """
+    return (
+        settings.PLACES_DETAILS_TIERED
+        and "reviews" not in place
+        and confidence is not None
+        and confidence < settings.PLACES_REVIEWS_MIN_CONFIDENCE
+    )
+
+
+def count_llm_answer(place: dict[str, Any], confidence: float | None) -> None:
+    """
+    Count an LLM answer once: final answers in categorized_places_total{source="llm"}, provisional ones
+    in provisional_categories_total (escalate_reviews counts them as categorized once they are final).
+    """
+    if is_provisional(place, confidence):
+        metrics.inc("provisional_categories_total")
+    else:
+        metrics.inc("categorized_places_total", source="llm")
+
+
+def apply_categories(places: list[dict[str, Any]], categories: dict[str, str]) -> None:
+    """Set place['category'] from a categorize_places result, for every row sharing a key."""
+    for place in places:
+        place["category"] = categories.get(place_key(place), DEFAULT_CATEGORY)
@@ -0,0 +1,132 @@
+"""
+Columnar step files (STEP_FORMAT=arrow or parquet) for large datasets.
+Known place fields are stored as typed columns; any other field goes into a JSON "_extra" column,
+so records round-trip without a fixed schema. Arrow IPC files are memory-mapped on read.
+Needs pyarrow (imported on first use).
+"""
+import json
+import logging
+from itertools import islice
+from pathlib import Path
+from typing import Any, Iterable, Iterator
+
+log = logging.getLogger(__name__)
+
+FORMAT_SUFFIXES = {"arrow": ".arrow", "parquet": ".parquet"}
+EXTRA_COLUMN = "_extra"
+# Rows converted to Arrow (and written as one record batch / row group) at a time.
+WRITE_BATCH_ROWS = 10_000
+
+
+def _pyarrow():
+    try:
+        import pyarrow as pa
+    except ImportError as e:
+        raise ImportError("STEP_FORMAT=arrow/parquet requires pyarrow (pip install pyarrow)") from e
+    return pa
+
+
+def step_columns() -> dict[str, Any]:
+    """Typed columns for the fields the pipeline writes, in output order."""
+    pa = _pyarrow()
+    return {
+        "name": pa.string(),
+        "address": pa.string(),
+        "place_id": pa.string(),
+        "latitude": pa.float64(),
+        "longitude": pa.float64(),
+        "rating": pa.float64(),
+        "user_ratings_count": pa.int64(),
+        "reviews": pa.list_(pa.string()),
+        "types": pa.list_(pa.string()),
+        "category": pa.string(),
+        "quality_color": pa.string(),
+        "icon": pa.string(),
+    }
+
+
+def _schema_for(rows: list[dict[str, Any]]):
+    """Known columns present in `rows` (at least "name"), plus the JSON extra column."""
+    pa = _pyarrow()
+    columns = step_columns()
+    present = {key for row in rows for key in row}
+    fields = [pa.field(name, typ) for name, typ in columns.items() if name in present or name == "name"]
+    return pa.schema(fields + [pa.field(EXTRA_COLUMN, pa.string())])
+
+
+def rows_to_table(rows: list[dict[str, Any]], schema=None):
+    """Convert place dicts to a table; fields outside `schema` are JSON-encoded into the extra column."""
+    pa = _pyarrow()
+    if schema is None:
+        schema = _schema_for(rows)
+    names = [name for name in schema.names if name != EXTRA_COLUMN]
+    known = set(names)
+    arrays = [pa.array([row.get(name) for row in rows], type=schema.field(name).type) for name in names]
+    extras = []
+    for row in rows:
+        extra = {k: v for k, v in row.items() if k not in known}
+        extras.append(json.dumps(extra, ensure_ascii=False) if extra else None)
+    arrays.append(pa.array(extras, type=pa.string()))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def table_to_rows(table) -> Iterator[dict[str, Any]]:
+    """Yield place dicts from a table, one record batch at a time (null fields are omitted)."""
+    for batch in table.to_batches():
+        for record in batch.to_pylist():
+            extra = record.pop(EXTRA_COLUMN, None)
+            row = {k: v for k, v in record.items() if v is not None}
+            if extra:
+                row.update(json.loads(extra))
+            yield row
+
+
+def write_rows(rows: Iterable[dict[str, Any]], path: Path, fmt: str) -> int:
+    """
+    Stream place dicts into an Arrow IPC / Parquet file in batches of WRITE_BATCH_ROWS.
+    The schema comes from the first batch; later fields outside it land in the extra column.
+    Returns the number of rows written.
+    """
+    rows = iter(rows)
+    first = list(islice(rows, WRITE_BATCH_ROWS))
+    schema = _schema_for(first)
+    count = 0
+    with _open_writer(path, fmt, schema) as writer:
+        batch = first
+        while batch:
+            writer.write_table(rows_to_table(batch, schema))
+            count += len(batch)
+            batch = list(islice(rows, WRITE_BATCH_ROWS))
+    return count
+
+
+def write_table(table, path: Path, fmt: str) -> None:
+    with _open_writer(path, fmt, table.schema) as writer:
+        writer.write_table(table)
+
+
+def _open_writer(path: Path, fmt: str, schema):
+    pa = _pyarrow()
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        return pq.ParquetWriter(path, schema)
+    return pa.ipc.new_file(str(path), schema)
+
+
+def read_table(path: Path, fmt: str):
+    """Read a step file as a table. Arrow IPC is memory-mapped (zero-copy); Parquet uses memory_map=True."""
+    pa = _pyarrow()
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        return pq.read_table(path, memory_map=True)
+    return pa.ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+
+
+def set_column(table, name: str, values):
+    """Return `table` with column `name` replaced (or added before the extra column)."""
+    if name in table.column_names:
+        return table.set_column(table.column_names.index(name), name, values)
+    index = table.column_names.index(EXTRA_COLUMN) if EXTRA_COLUMN in table.column_names else table.num_columns
+    return table.add_column(index, name, values)
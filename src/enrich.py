@@ -0,0 +1,211 @@
+"""
+Enrichment shared by the pipeline and the service: Places lookups coalesced per key, per-row
+resolution against a search region, and review escalation for places enriched with lean details.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from config import settings
+from src.categorize import is_provisional, place_key
+from src.geo import Region, SpatialGrid, derive_region
+from src.google_places import build_query, fetch_place_details, get_place_details, search_cache_key, search_place
+from src.metrics import metrics
+from src.singleflight import SingleFlight
+
+log = logging.getLogger(__name__)
+
+
+# ---------------------------------------------------------------------------
+# Lookups
+# ---------------------------------------------------------------------------
+class FetchMemo:
+    """
+    Places lookups (searches, details) by key, each made once per memo: concurrent callers for the
+    same key share one call, later callers get the stored result. One memo per run, or one shared by
+    every file of a batch job. With remember=False only in-flight calls are shared (long-running
+    service; the Places cache still applies).
+    """
+
+    def __init__(self, remember: bool = True) -> None:
+        self.remember = remember
+        self._values: dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+
+    @property
+    def coalesced(self) -> int:
+        """Calls that shared another caller's in-flight lookup."""
+        return self._flight.coalesced
+
+    def get(self, key: str, fetch: Callable[[], Any]) -> Any:
+        with self._lock:
+            if key in self._values:
+                return self._values[key]
+        value = self._flight.do(key, fetch)
+        if self.remember:
+            with self._lock:
+                self._values[key] = value
+        return value
+
+
+class PlaceResolver:
+    """
+    Enrichment for one run: search each row, then fetch details once per place_id even when
+    several rows (or concurrent workers) resolve to the same place.
+    Searches are biased toward `region` (or, with PLACES_DERIVE_REGION, a region derived from the
+    places resolved so far). Before details are fetched, each search result is checked against the
+    region and against a grid of already resolved coordinates: out-of-region results are skipped
+    (PLACES_OUT_OF_REGION=skip, configured regions only) or flagged, and near-duplicates are flagged.
+    """
+
+    def __init__(self, region: Region | None = None, fetches: FetchMemo | None = None) -> None:
+        self.region = region
+        self._derived: Region | None = None
+        self._points: list[tuple[float, float]] = []
+        self._indexed: set[str] = set()
+        self._grid = SpatialGrid(settings.PLACES_DUPLICATE_RADIUS_M or 50.0)
+        self._fetches = fetches if fetches is not None else FetchMemo()
+        self._lock = threading.Lock()
+        if region is not None:
+            log.info("Biasing Places searches toward %s", region)
+
+    def _active_region(self) -> Region | None:
+        with self._lock:
+            return self.region or self._derived
+
+    def _observe(self, place_id: str, location: tuple[float, float]) -> None:
+        """Index a resolved place and derive a search region once enough places are known."""
+        with self._lock:
+            if place_id in self._indexed:
+                return
+            self._indexed.add(place_id)
+            self._points.append(location)
+            derive = (
+                settings.PLACES_DERIVE_REGION
+                and self.region is None
+                and self._derived is None
+                and len(self._points) >= settings.PLACES_DERIVE_REGION_MIN_PLACES
+            )
+            if derive:
+                self._derived = derive_region(self._points)
+                log.info("Biasing further Places searches toward %s", self._derived)
+        self._grid.add(location[0], location[1], place_id)
+
+    def _check(self, name: str, place_id: str, location: tuple[float, float]) -> dict[str, Any] | None:
+        """Flags for a search result; None when the result should be skipped (no details fetch)."""
+        flags: dict[str, Any] = {}
+        region = self._active_region()
+        if region is not None and not region.contains(*location, margin_m=settings.PLACES_REGION_MARGIN_M):
+            metrics.inc("places_flagged_total", flag="out_of_region")
+            if region is self.region and settings.PLACES_OUT_OF_REGION == "skip":
+                log.warning("Skipping %s: result %s at %s is outside %s", name, place_id, location, region)
+                return None
+            log.warning("Flagged %s: result %s at %s is outside %s", name, place_id, location, region)
+            flags["out_of_region"] = True
+        if settings.PLACES_DUPLICATE_RADIUS_M > 0:
+            near = [(key, d) for key, d in self._grid.nearby(*location, settings.PLACES_DUPLICATE_RADIUS_M) if key != place_id]
+            if near:
+                metrics.inc("places_flagged_total", flag="near_duplicate")
+                log.warning("Flagged %s: %s is %.0fm from already resolved %s", name, place_id, near[0][1], near[0][0])
+                flags["near_duplicate_of"] = near[0][0]
+        self._observe(place_id, location)
+        return flags
+
+    def enrich(self, place: dict[str, Any]) -> dict[str, Any] | None:
+        name = place.get("name") or ""
+        address = place.get("address")
+        region = self._active_region()
+        bias = region.location_bias() if region is not None else None
+        # A derived region depends on which places resolved first, so it stays out of the cache keys.
+        cache_bias = region is self.region
+        query = search_cache_key(build_query(name, address), bias if cache_bias else None)
+        if settings.PLACES_SINGLE_REQUEST:
+            detail = self._fetches.get(
+                f"search_details:{query}", lambda: fetch_place_details(name, address, bias, cache_bias)
+            )
+            if not detail or detail.get("latitude") is None or detail.get("longitude") is None:
+                return detail
+            flags = self._check(name, detail.get("place_id") or "", (detail["latitude"], detail["longitude"]))
+        else:
+            place_id, location = self._fetches.get(f"search:{query}", lambda: search_place(name, address, bias, cache_bias))
+            if not place_id:
+                return None
+            flags = self._check(name, place_id, location) if location is not None else {}
+            if flags is not None:
+                detail = self._fetches.get(f"details:{place_id}", lambda: get_place_details(place_id))
+            else:
+                detail = None
+        if flags is None:
+            return None
+        return {**detail, **flags} if detail and flags else detail
+
+
+# ---------------------------------------------------------------------------
+# Review escalation (PLACES_DETAILS_TIERED)
+# ---------------------------------------------------------------------------
+def _full_details(place: dict[str, Any]) -> dict[str, Any] | None:
+    return get_place_details(place["place_id"], lean=False)
+
+
+def fetch_reviews(
+    places: list[dict[str, Any]],
+    fetch: Callable[[dict[str, Any]], dict[str, Any] | None] = _full_details,
+    workers: int | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Fetch full details for lean `places` (with `fetch`, `workers` at a time, default PLACES_WORKERS)
+    and add their reviews in place. Returns the places that got them.
+    """
+    workers = max(1, min(workers or settings.PLACES_WORKERS, len(places)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="reviews") as executor:
+        details = list(executor.map(fetch, places))
+    fetched = []
+    for place, detail in zip(places, details):
+        if detail is None or "reviews" not in detail:
+            metrics.inc("places_review_fetches_total", outcome="failed")
+            continue
+        place["reviews"] = detail["reviews"]
+        fetched.append(place)
+    return fetched
+
+
+def escalate_reviews(
+    places: list[dict[str, Any]],
+    confidences: dict[str, float],
+    categorize: Callable[[list[dict[str, Any]]], dict[str, str]],
+    fetch: Callable[[dict[str, Any]], dict[str, Any] | None] = _full_details,
+    workers: int | None = None,
+) -> dict[str, str]:
+    """
+    Review escalation with PLACES_DETAILS_TIERED, after `places` were categorized with their
+    confidences in `confidences` ({place_key: confidence}): places enriched with lean details (no
+    reviews) whose answer was provisional get their reviews fetched (see fetch_reviews; every row
+    sharing the place key is updated) and are categorized again with `categorize`. Returns their new
+    categories. Review fetches avoided and made are counted in places_review_fetches_total;
+    provisional answers that stay final are counted in categorized_places_total here.
+    """
+    if not settings.PLACES_DETAILS_TIERED:
+        return {}
+    rows: dict[str, list[dict[str, Any]]] = {}
+    for place in places:
+        rows.setdefault(place_key(place), []).append(place)
+    lean = [group[0] for group in rows.values() if "reviews" not in group[0]]
+    provisional = [p for p in lean if is_provisional(p, confidences.get(place_key(p)))]
+    unsure = [p for p in provisional if p.get("place_id")]
+    metrics.inc("places_review_fetches_total", len(lean) - len(unsure), outcome="avoided")
+    escalated = []
+    if unsure:
+        log.info("Tiered details: fetching reviews for %d of %d lean places (low confidence)", len(unsure), len(lean))
+        escalated = fetch_reviews(unsure, fetch, workers)
+        metrics.inc("places_review_fetches_total", len(escalated), outcome="escalated")
+    # Provisional answers that stay final are counted here; escalated places are counted by `categorize`.
+    if len(provisional) > len(escalated):
+        metrics.inc("categorized_places_total", len(provisional) - len(escalated), source="llm")
+    if not escalated:
+        return {}
+    for place in escalated:
+        for row in rows[place_key(place)][1:]:
+            row["reviews"] = place["reviews"]
+    return categorize(escalated)
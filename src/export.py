@@ -0,0 +1,174 @@
+"""
+Step 5: Export categorized places for Google My Maps import.
+Streams records into CSV and/or KML files, one shard per category (or icon) and a new
+part whenever a shard reaches the My Maps per-layer row limit, so each file imports as one layer.
+"""
+import csv
+import logging
+import re
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterable, TextIO
+from xml.sax.saxutils import escape
+
+from config import settings
+
+log = logging.getLogger(__name__)
+
+CSV_COLUMNS = ["Name", "Latitude", "Longitude", "Category", "Icon", "Icon_Color", "Address", "Rating"]
+
+_KML_HEADER = """<?xml version="1.0" encoding="UTF-8"?>
+<kml xmlns="http://www.opengis.net/kml/2.2">
+<Document>
+<name>{name}</name>
+"""
+_KML_FOOTER = "</Document>\n</kml>\n"
+
+
+def _slug(value: str) -> str:
+    return re.sub(r"[^0-9A-Za-z]+", "_", value).strip("_").lower() or "other"
+
+
+class _Shard:
+    """Open CSV/KML files for one layer part."""
+
+    def __init__(self, base: Path, layer: str, formats: tuple[str, ...]) -> None:
+        self.rows = 0
+        self.paths: list[Path] = []
+        self._csv_file: TextIO | None = None
+        self._csv: Any = None
+        self._kml: TextIO | None = None
+        if "csv" in formats:
+            path = base.with_suffix(".csv")
+            self._csv_file = open(path, "w", encoding="utf-8", newline="")
+            self._csv = csv.writer(self._csv_file)
+            self._csv.writerow(CSV_COLUMNS)
+            self.paths.append(path)
+        if "kml" in formats:
+            path = base.with_suffix(".kml")
+            self._kml = open(path, "w", encoding="utf-8")
+            self._kml.write(_KML_HEADER.format(name=escape(layer)))
+            self.paths.append(path)
+
+    def write(self, row: list[Any]) -> None:
+        name, lat, lng, category, icon, color, address, rating = row
+        if self._csv is not None:
+            self._csv.writerow(row)
+        if self._kml is not None:
+            data = "".join(
+                f'<Data name="{key}"><value>{escape(str(value))}</value></Data>'
+                for key, value in (("Category", category), ("Icon", icon), ("Icon_Color", color), ("Rating", rating))
+                if value not in (None, "")
+            )
+            self._kml.write(
+                f"<Placemark><name>{escape(name)}</name>"
+                f"<address>{escape(address)}</address>"
+                f"<ExtendedData>{data}</ExtendedData>"
+                f"<Point><coordinates>{lng},{lat}</coordinates></Point></Placemark>\n"
+            )
+        self.rows += 1
+
+    def close(self) -> None:
+        if self._csv_file is not None:
+            self._csv_file.close()
+        if self._kml is not None:
+            self._kml.write(_KML_FOOTER)
+            self._kml.close()
+
+
+class MyMapsExporter:
+    """
+    Incremental My Maps exporter. Call write() as records arrive (or write_many() with any iterable),
+    then close() to finish the files. Output goes to data/output/mymaps_export_YYYYMMDD_HHMM[_<layer>][_partN].csv/.kml.
+    `shard_by` is "category", "icon" or "" (single layer); each shard rolls over to a new part after
+    `max_rows` rows.
+    """
+
+    def __init__(
+        self,
+        out_dir: Path | None = None,
+        formats: Iterable[str] | None = None,
+        shard_by: str | None = None,
+        max_rows: int | None = None,
+        stamp: str | None = None,
+    ) -> None:
+        self.out_dir = Path(out_dir) if out_dir is not None else settings.OUTPUT_DIR
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.formats = tuple(f.strip().lower() for f in (formats or settings.EXPORT_FORMATS) if f.strip())
+        self.shard_by = settings.EXPORT_SHARD_BY if shard_by is None else shard_by
+        self.max_rows = max(1, max_rows or settings.MYMAPS_MAX_ROWS_PER_LAYER)
+        self.prefix = f"mymaps_export_{stamp or datetime.now().strftime('%Y%m%d_%H%M')}"
+        self.written = 0
+        self.skipped = 0
+        self._shards: dict[str, _Shard] = {}
+        self._parts: dict[str, int] = {}
+        self._paths: list[Path] = []
+
+    def _shard_for(self, layer: str) -> _Shard:
+        shard = self._shards.get(layer)
+        if shard is not None and shard.rows < self.max_rows:
+            return shard
+        if shard is not None:
+            shard.close()
+        part = self._parts.get(layer, 0) + 1
+        self._parts[layer] = part
+        name = self.prefix
+        if layer:
+            name += f"_{_slug(layer)}"
+        if part > 1:
+            name += f"_part{part}"
+        shard = _Shard(self.out_dir / name, layer or self.prefix, self.formats)
+        self._shards[layer] = shard
+        self._paths.extend(shard.paths)
+        return shard
+
+    def write(self, place: dict[str, Any]) -> None:
+        lat = place.get("latitude")
+        lng = place.get("longitude")
+        if lat is None or lng is None:
+            self.skipped += 1
+            return
+        layer = str(place.get(self.shard_by) or "") if self.shard_by else ""
+        row = [
+            place.get("name") or "",
+            lat,
+            lng,
+            place.get("category") or "",
+            place.get("icon") or "",
+            place.get("quality_color") or "",
+            place.get("address") or "",
+            place.get("rating") if place.get("rating") is not None else "",
+        ]
+        self._shard_for(layer).write(row)
+        self.written += 1
+
+    def write_many(self, places: Iterable[dict[str, Any]]) -> None:
+        for place in places:
+            self.write(place)
+
+    def close(self) -> list[Path]:
+        """Finish every open file; return all paths written."""
+        for shard in self._shards.values():
+            shard.close()
+        self._shards.clear()
+        log.info(
+            "Exported %d places to %d files in %s (%d skipped without coordinates)",
+            self.written, len(self._paths), self.out_dir, self.skipped,
+        )
+        return list(self._paths)
+
+    def __enter__(self) -> "MyMapsExporter":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def export_places(places: Iterable[dict[str, Any]], **kwargs: Any) -> list[Path]:
+    """Export places (any iterable) in one go; returns the files written."""
+    exporter = MyMapsExporter(**kwargs)
+    try:
+        exporter.write_many(places)
+    finally:
+        paths = exporter.close()
+    return paths
@@ -0,0 +1,159 @@
+"""
+Geography helpers for enrichment: a search region (circle or bounding box) used as the Places
+`locationBias` and to spot out-of-region results, a region derived from already-resolved places,
+and a grid index over resolved coordinates to spot near-duplicates before details are fetched.
+"""
+import json
+import logging
+import math
+import statistics
+import threading
+from pathlib import Path
+from typing import Any
+
+from config import settings
+
+log = logging.getLogger(__name__)
+
+EARTH_RADIUS_M = 6_371_000.0
+# Places API limit for a locationBias circle radius.
+MAX_BIAS_RADIUS_M = 50_000.0
+_METERS_PER_DEGREE = 111_320.0
+
+
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Great-circle distance in meters."""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp = p2 - p1
+    dl = math.radians(lng2 - lng1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+class Region:
+    """A circle (center + radius in meters) or a bounding box (south, west, north, east)."""
+
+    def __init__(
+        self,
+        center: tuple[float, float] | None = None,
+        radius_m: float | None = None,
+        bbox: tuple[float, float, float, float] | None = None,
+        source: str = "",
+    ) -> None:
+        if bbox is None and (center is None or radius_m is None):
+            raise ValueError("Region needs center + radius_m or bbox")
+        self.center = center
+        self.radius_m = radius_m
+        self.bbox = bbox
+        self.source = source
+
+    @classmethod
+    def parse(cls, spec: str, source: str = "") -> "Region":
+        """Parse "lat,lng,radius_m" (circle) or "south,west,north,east" (bounding box)."""
+        values = [float(v) for v in spec.split(",")]
+        if len(values) == 3:
+            return cls(center=(values[0], values[1]), radius_m=values[2], source=source)
+        if len(values) == 4:
+            return cls(bbox=(values[0], values[1], values[2], values[3]), source=source)
+        raise ValueError(f"Region must be lat,lng,radius_m or south,west,north,east: {spec!r}")
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any], source: str = "") -> "Region":
+        """{"center": [lat, lng], "radius_m": 30000} or {"bbox": [south, west, north, east]}."""
+        if "bbox" in data:
+            return cls(bbox=tuple(float(v) for v in data["bbox"]), source=source)
+        return cls(center=tuple(float(v) for v in data["center"]), radius_m=float(data["radius_m"]), source=source)
+
+    def contains(self, lat: float, lng: float, margin_m: float = 0.0) -> bool:
+        if self.bbox is not None:
+            south, west, north, east = self.bbox
+            margin_lat = margin_m / _METERS_PER_DEGREE
+            margin_lng = margin_m / (_METERS_PER_DEGREE * max(0.01, math.cos(math.radians(lat))))
+            return south - margin_lat <= lat <= north + margin_lat and west - margin_lng <= lng <= east + margin_lng
+        return haversine_m(self.center[0], self.center[1], lat, lng) <= self.radius_m + margin_m
+
+    def location_bias(self) -> dict[str, Any]:
+        """The searchText `locationBias` for this region."""
+        if self.bbox is not None:
+            south, west, north, east = self.bbox
+            return {
+                "rectangle": {
+                    "low": {"latitude": south, "longitude": west},
+                    "high": {"latitude": north, "longitude": east},
+                }
+            }
+        return {
+            "circle": {
+                "center": {"latitude": self.center[0], "longitude": self.center[1]},
+                "radius": min(self.radius_m, MAX_BIAS_RADIUS_M),
+            }
+        }
+
+    def __repr__(self) -> str:
+        shape = f"bbox={self.bbox}" if self.bbox is not None else f"center={self.center}, radius={self.radius_m:.0f}m"
+        return f"Region({shape}{', ' + self.source if self.source else ''})"
+
+
+def region_sidecar(input_path: str | Path) -> Path:
+    """Per-file region: <input file>.region.json next to the input (e.g. places.csv.region.json)."""
+    path = Path(input_path)
+    return path.with_name(path.name + ".region.json")
+
+
+def load_region(input_path: str | Path | None = None) -> Region | None:
+    """Region for an input file: its .region.json sidecar, else PLACES_REGION, else None."""
+    if input_path is not None:
+        sidecar = region_sidecar(input_path)
+        if sidecar.exists():
+            with open(sidecar, encoding="utf-8") as f:
+                return Region.from_dict(json.load(f), source=sidecar.name)
+    if settings.PLACES_REGION:
+        return Region.parse(settings.PLACES_REGION, source="PLACES_REGION")
+    return None
+
+
+def derive_region(points: list[tuple[float, float]]) -> Region:
+    """
+    Circle around the median of `points`, wide enough for 90% of them (with 50% slack),
+    clamped to PLACES_DERIVED_RADIUS_MIN_M and the locationBias limit.
+    """
+    lat = statistics.median(p[0] for p in points)
+    lng = statistics.median(p[1] for p in points)
+    distances = sorted(haversine_m(lat, lng, p[0], p[1]) for p in points)
+    p90 = distances[min(len(distances) - 1, int(len(distances) * 0.9))]
+    radius = min(MAX_BIAS_RADIUS_M, max(settings.PLACES_DERIVED_RADIUS_MIN_M, p90 * 1.5))
+    return Region(center=(lat, lng), radius_m=radius, source=f"derived from {len(points)} places")
+
+
+class SpatialGrid:
+    """
+    Grid index over resolved coordinates (cells of about `cell_m` meters) for radius lookups.
+    Safe to share across threads.
+    """
+
+    def __init__(self, cell_m: float) -> None:
+        self.cell_deg = max(cell_m, 1.0) / _METERS_PER_DEGREE
+        self._cells: dict[tuple[int, int], list[tuple[float, float, str]]] = {}
+        self._lock = threading.Lock()
+
+    def _cell(self, lat: float, lng: float) -> tuple[int, int]:
+        return math.floor(lat / self.cell_deg), math.floor(lng / self.cell_deg)
+
+    def add(self, lat: float, lng: float, key: str) -> None:
+        with self._lock:
+            self._cells.setdefault(self._cell(lat, lng), []).append((lat, lng, key))
+
+    def nearby(self, lat: float, lng: float, radius_m: float) -> list[tuple[str, float]]:
+        """(key, distance in meters) of indexed points within radius_m, nearest first."""
+        row, col = self._cell(lat, lng)
+        reach_lat = math.ceil(radius_m / (self.cell_deg * _METERS_PER_DEGREE))
+        reach_lng = math.ceil(reach_lat / max(0.01, math.cos(math.radians(lat))))
+        found = []
+        with self._lock:
+            for r in range(row - reach_lat, row + reach_lat + 1):
+                for c in range(col - reach_lng, col + reach_lng + 1):
+                    for p_lat, p_lng, key in self._cells.get((r, c), ()):
+                        distance = haversine_m(lat, lng, p_lat, p_lng)
+                        if distance <= radius_m:
+                            found.append((key, distance))
+        return sorted(found, key=lambda kv: kv[1])
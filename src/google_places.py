@@ -1,75 +1,272 @@
+import json
 import logging
-import time
+import threading
 from typing import Any
 
 import requests
 
 from config import settings
+from src.cache import SqliteCache
+from src.http_transport import HttpTransport
+from src.metrics import metrics
+from src.rate_limit import TokenBucket
 
 log = logging.getLogger(__name__)
 
-BASE = "https://places.googleapis.com/v1"
-SEARCH_FIELDS = "places.id,places.displayName"
+BASE = settings.PLACES_BASE_URL
+# location is in the same SKU as displayName; it lets callers check a result before paying for details.
+SEARCH_FIELDS = "places.id,places.displayName,places.location"
 DETAILS_FIELDS = "id,displayName,location,formattedAddress,rating,userRatingCount,reviews,types"
+# Single-round-trip mode: ask searchText for the details fields directly.
+SEARCH_DETAILS_FIELDS = ",".join(f"places.{f}" for f in DETAILS_FIELDS.split(","))
+# Tiered details (PLACES_DETAILS_TIERED): the same without reviews, the most expensive field.
+DETAILS_LEAN_FIELDS = ",".join(f for f in DETAILS_FIELDS.split(",") if f != "reviews")
+SEARCH_DETAILS_LEAN_FIELDS = ",".join(f"places.{f}" for f in DETAILS_LEAN_FIELDS.split(","))
+# Metric SKU label per searchText field mask.
+_SEARCH_SKUS = {
+    SEARCH_FIELDS: "search",
+    SEARCH_DETAILS_FIELDS: "search_details",
+    SEARCH_DETAILS_LEAN_FIELDS: "search_details_lean",
+}
 
+# One pooled transport (and rate limiter) for every Places request, shared by all enrichment workers.
+_limiter = TokenBucket(settings.PLACES_REQUESTS_PER_SECOND)
+_transport = HttpTransport(
+    _limiter,
+    max_retries=settings.PLACES_MAX_RETRIES,
+    backoff_base=settings.PLACES_BACKOFF_BASE,
+    backoff_max=settings.PLACES_BACKOFF_MAX,
+    breaker_threshold=settings.PLACES_BREAKER_THRESHOLD,
+    breaker_cooldown=settings.PLACES_BREAKER_COOLDOWN,
+    pool_size=settings.PLACES_POOL_SIZE,
+    name="places",
+)
 
-def fetch_place_details(place_query: str, address: str | None = None) -> dict[str, Any] | None:
-    query = place_query if not address else f"{place_query} {address}"
-    place_id = _search_place(query)
+# Persistent cache under search and details (opened on first use).
+_cache: SqliteCache | None = None
+_cache_lock = threading.Lock()
+
+
+def get_places_cache() -> SqliteCache | None:
+    """Return the shared Places cache, or None when PLACES_CACHE_ENABLED is off."""
+    global _cache
+    if not settings.PLACES_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = SqliteCache(
+                settings.PLACES_CACHE_PATH,
+                ttl_seconds=settings.PLACES_CACHE_TTL_DAYS * 86400,
+                max_entries=settings.PLACES_CACHE_MAX_ENTRIES,
+            )
+        return _cache
+
+
+def normalize_query(text: str) -> str:
+    """Cache key for a search query: case-folded, whitespace collapsed."""
+    return " ".join(text.split()).casefold()
+
+
+def search_cache_key(text: str, location_bias: dict[str, Any] | None = None) -> str:
+    """Search cache key: the normalized query, plus the locationBias when one is sent."""
+    key = normalize_query(text)
+    if location_bias:
+        key += "|bias=" + json.dumps(location_bias, sort_keys=True, separators=(",", ":"))
+    return key
+
+
+def fetch_place_details(
+    place_query: str,
+    address: str | None = None,
+    location_bias: dict[str, Any] | None = None,
+    cache_bias: bool = True,
+) -> dict[str, Any] | None:
+    query = build_query(place_query, address)
+    lean = settings.PLACES_DETAILS_TIERED
+    if settings.PLACES_SINGLE_REQUEST:
+        detail, place_id = _search_place_details(query, location_bias, lean, cache_bias)
+        if detail:
+            return detail
+        if not place_id:
+            return None
+        log.info("Single-request result incomplete for %s; falling back to details call", query)
+        return _place_details(place_id, lean)
+    place_id, _ = _search_place(query, location_bias, cache_bias)
     if not place_id:
         return None
-    time.sleep(settings.PLACES_REQUEST_DELAY)
-    return _place_details(place_id)
+    return _place_details(place_id, lean)
+
+
+def build_query(place_query: str, address: str | None = None) -> str:
+    return place_query if not address else f"{place_query} {address}"
+
+
+def search_place(
+    place_query: str,
+    address: str | None = None,
+    location_bias: dict[str, Any] | None = None,
+    cache_bias: bool = True,
+) -> tuple[str | None, tuple[float, float] | None]:
+    """
+    Resolve a name (+ address) to a "places/<id>" resource name (search only, no details) and the
+    result's (latitude, longitude) when known, so the caller can check it before fetching details.
+    With cache_bias=False the bias is sent but left out of the search cache key.
+    """
+    return _search_place(build_query(place_query, address), location_bias, cache_bias)
+
 
+def get_place_details(place_id: str, lean: bool | None = None) -> dict[str, Any] | None:
+    """
+    Fetch normalized details for a place id. Lean details (default with PLACES_DETAILS_TIERED) have
+    no "reviews" field; a cached full record is returned instead when there is one.
+    """
+    return _place_details(place_id, settings.PLACES_DETAILS_TIERED if lean is None else lean)
 
-def _search_place(text: str) -> str | None:
+
+def _search_place(
+    text: str,
+    location_bias: dict[str, Any] | None = None,
+    cache_bias: bool = True,
+) -> tuple[str | None, tuple[float, float] | None]:
+    cache = get_places_cache()
+    key = search_cache_key(text, location_bias if cache_bias else None)
+    if cache is not None:
+        cached = cache.get("search", key)
+        if cached:
+            location = cache.get("location", cached)
+            return cached, tuple(location) if location else None
+    place_id, location = _search_place_remote(text, location_bias)
+    if place_id and cache is not None:
+        cache.set("search", key, place_id)
+        if location:
+            cache.set("location", place_id, list(location))
+    return place_id, location
+
+
+def _search_place_details(
+    text: str,
+    location_bias: dict[str, Any] | None = None,
+    lean: bool = False,
+    cache_bias: bool = True,
+) -> tuple[dict[str, Any] | None, str | None]:
+    """
+    Search with the expanded field mask (lean: without reviews) and normalize the first result
+    (one request instead of two). Returns (detail, place_id); detail is None when the result lacks
+    a location, so the caller can fall back to a details call for place_id.
+    """
+    cache = get_places_cache()
+    key = search_cache_key(text, location_bias if cache_bias else None)
+    if cache is not None:
+        place_id = cache.get("search", key)
+        if place_id:
+            cached = _cached_details(cache, place_id, lean)
+            if cached:
+                return cached, place_id
+    places = _post_search(text, SEARCH_DETAILS_LEAN_FIELDS if lean else SEARCH_DETAILS_FIELDS, location_bias)
+    if not places:
+        return None, None
+    place = places[0]
+    place_id = _resource_name(place)
+    if not place_id or not place.get("location"):
+        return None, place_id
+    detail = _normalize_place(place, lean)
+    if cache is not None:
+        cache.set("search", key, place_id)
+        cache.set("details_lean" if lean else "details", place_id, detail)
+    return detail, place_id
+
+
+def _search_place_remote(
+    text: str,
+    location_bias: dict[str, Any] | None = None,
+) -> tuple[str | None, tuple[float, float] | None]:
+    places = _post_search(text, SEARCH_FIELDS, location_bias)
+    if not places:
+        return None, None
+    loc = places[0].get("location") or {}
+    location = (loc["latitude"], loc["longitude"]) if "latitude" in loc and "longitude" in loc else None
+    return _resource_name(places[0]), location
+
+
+def _post_search(
+    text: str,
+    field_mask: str,
+    location_bias: dict[str, Any] | None = None,
+) -> list[dict[str, Any]] | None:
+    """POST places:searchText with the given field mask (and optional locationBias); return the result list or None."""
     url = f"{BASE}/places:searchText"
     headers = {
         "Content-Type": "application/json",
         "X-Goog-Api-Key": settings.GOOGLE_MAPS_API_KEY,
-        "X-Goog-FieldMask": SEARCH_FIELDS,
+        "X-Goog-FieldMask": field_mask,
     }
-    payload = {"textQuery": text}
+    payload: dict[str, Any] = {"textQuery": text}
+    if location_bias:
+        payload["locationBias"] = location_bias
     try:
-        r = requests.post(url, json=payload, headers=headers, timeout=15)
+        r = _transport.request("POST", url, json=payload, headers=headers)
         r.raise_for_status()
+        metrics.inc("places_requests_total", sku=_SEARCH_SKUS.get(field_mask, "search"))
         data = r.json()
         places = data.get("places") or []
         if not places:
             log.warning("No results for query: %s", text)
             return None
-        place = places[0]
-        pid = place.get("id")
-        name = place.get("name")
-        if pid:
-            return pid if pid.startswith("places/") else f"places/{pid}"
-        if name and isinstance(name, str) and name.startswith("places/"):
-            return name
-        return None
+        return places
     except requests.RequestException as e:
         log.exception("Places search failed for %s: %s", text, e)
         return None
 
 
-def _place_details(place_id: str) -> dict[str, Any] | None:
+def _resource_name(place: dict[str, Any]) -> str | None:
+    """Return the "places/<id>" resource name of a search result."""
+    pid = place.get("id")
+    name = place.get("name")
+    if pid:
+        return pid if pid.startswith("places/") else f"places/{pid}"
+    if name and isinstance(name, str) and name.startswith("places/"):
+        return name
+    return None
+
+
+def _cached_details(cache: SqliteCache, place_id: str, lean: bool) -> dict[str, Any] | None:
+    """Cached full details, else (when lean details will do) cached lean details."""
+    return cache.get("details", place_id) or (cache.get("details_lean", place_id) if lean else None)
+
+
+def _place_details(place_id: str, lean: bool = False) -> dict[str, Any] | None:
     if not place_id.startswith("places/"):
         place_id = f"places/{place_id}"
+    cache = get_places_cache()
+    if cache is not None:
+        cached = _cached_details(cache, place_id, lean)
+        if cached:
+            return cached
+    detail = _place_details_remote(place_id, lean)
+    if detail and cache is not None:
+        cache.set("details_lean" if lean else "details", place_id, detail)
+    return detail
+
+
+def _place_details_remote(place_id: str, lean: bool = False) -> dict[str, Any] | None:
     url = f"{BASE}/{place_id}"
     headers = {
         "X-Goog-Api-Key": settings.GOOGLE_MAPS_API_KEY,
-        "X-Goog-FieldMask": DETAILS_FIELDS,
+        "X-Goog-FieldMask": DETAILS_LEAN_FIELDS if lean else DETAILS_FIELDS,
     }
     try:
-        r = requests.get(url, headers=headers, timeout=15)
+        r = _transport.request("GET", url, headers=headers)
         r.raise_for_status()
+        metrics.inc("places_requests_total", sku="details_lean" if lean else "details")
         p = r.json()
-        return _normalize_place(p)
+        return _normalize_place(p, lean)
     except requests.RequestException as e:
         log.exception("Place details failed for %s: %s", place_id, e)
         return None
 
 
-def _normalize_place(p: dict) -> dict[str, Any]:
+def _normalize_place(p: dict, lean: bool = False) -> dict[str, Any]:
+    """Normalize a Places API place; lean records (no reviews requested) have no "reviews" field."""
     name = _get_text(p.get("displayName")) or ""
     loc = p.get("location") or {}
     lat = loc.get("latitude")
@@ -78,7 +275,7 @@ def _normalize_place(p: dict) -> dict[str, Any]:
     reviews = [_get_text(r.get("text")) or _get_text(r.get("originalText")) for r in reviews_raw[:5]]
     reviews = [t for t in reviews if t]
     types_list = p.get("types") or []
-    return {
+    detail = {
         "name": name,
         "latitude": lat,
         "longitude": lng,
@@ -89,6 +286,9 @@ def _normalize_place(p: dict) -> dict[str, Any]:
         "address": _get_text(p.get("formattedAddress")) or "",
         "place_id": p.get("id") or "",
     }
+    if lean:
+        del detail["reviews"]
+    return detail
 
 
 def _get_text(obj: Any) -> str | None:
@@ -0,0 +1,167 @@
+"""
+Shared HTTP transport: keep-alive connection pool, rate limiting, bounded retries
+with jittered exponential backoff (honoring Retry-After) and a circuit breaker
+that pauses every worker while the API is throttling.
+"""
+import email.utils
+import logging
+import random
+import threading
+import time
+from typing import Any
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.metrics import metrics
+from src.rate_limit import TokenBucket
+
+log = logging.getLogger(__name__)
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Return seconds to wait from a Retry-After header (delta-seconds or HTTP date), or None."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def jittered_backoff(attempt: int, base: float, cap: float) -> float:
+    """Full-jitter exponential backoff for the given retry attempt (0-based)."""
+    return random.uniform(0, min(cap, base * (2**attempt)))
+
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` consecutive throttled/failed responses and stays open for `cooldown` seconds.
+    While open (or while a Retry-After pause is pending) every caller of wait() blocks.
+    """
+
+    def __init__(self, threshold: int, cooldown: float) -> None:
+        self.threshold = max(1, threshold)
+        self.cooldown = cooldown
+        self._failures = 0
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> float:
+        """Block while the breaker is open. Returns seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                remaining = self._paused_until - time.monotonic()
+            if remaining <= 0:
+                return waited
+            time.sleep(remaining)
+            waited += remaining
+
+    def pause(self, seconds: float) -> None:
+        """Pause all callers for at least `seconds` (e.g. from Retry-After)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.threshold:
+                log.warning("Circuit breaker open: %d consecutive failures, pausing %.1fs", self._failures, self.cooldown)
+                self._paused_until = max(self._paused_until, time.monotonic() + self.cooldown)
+                self._failures = 0
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+
+
+class HttpTransport:
+    """One pooled requests.Session plus retry/backoff/breaker policy, shared by all threads."""
+
+    def __init__(
+        self,
+        limiter: TokenBucket,
+        max_retries: int = 4,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0,
+        breaker_threshold: int = 5,
+        breaker_cooldown: float = 30.0,
+        pool_size: int = 10,
+        timeout: float = 15,
+        name: str = "http",
+    ) -> None:
+        self.name = name
+        self.limiter = limiter
+        self.max_retries = max(0, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_cooldown)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _backoff(self, attempt: int) -> float:
+        return jittered_backoff(attempt, self.backoff_base, self.backoff_max)
+
+    def _record(self, response: requests.Response) -> None:
+        """Count one HTTP exchange (status and bytes) under this transport's name."""
+        metrics.inc("http_requests_total", service=self.name, status=response.status_code)
+        body = response.request.body if response.request is not None else None
+        metrics.inc("http_bytes_sent_total", len(body or b""), service=self.name)
+        metrics.inc("http_bytes_received_total", len(response.content), service=self.name)
+
+    def request(self, method: str, url: str, **kwargs: Any) -> requests.Response:
+        """
+        Send a request, retrying 429/5xx responses and connection errors up to max_retries times.
+        Returns the last response (callers still call raise_for_status); re-raises the last
+        connection error if every attempt failed without a response.
+        Every attempt is counted in the run metrics (requests by status, retries, bytes).
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        attempt = 0
+        while True:
+            self.breaker.wait()
+            self.limiter.acquire()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                metrics.inc("http_connection_errors_total", service=self.name)
+                self.breaker.record_failure()
+                if attempt >= self.max_retries:
+                    raise
+                delay = self._backoff(attempt)
+                log.warning("%s %s failed (%s); retry %d/%d in %.1fs", method, url, e, attempt + 1, self.max_retries, delay)
+            else:
+                self._record(response)
+                if response.status_code not in RETRY_STATUSES:
+                    self.breaker.record_success()
+                    return response
+                self.breaker.record_failure()
+                if attempt >= self.max_retries:
+                    return response
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                if retry_after is not None:
+                    delay = min(retry_after, self.backoff_max)
+                    # Throttling applies to the whole key, not just this worker.
+                    self.breaker.pause(delay)
+                else:
+                    delay = self._backoff(attempt)
+                log.warning(
+                    "%s %s returned %d; retry %d/%d in %.1fs",
+                    method, url, response.status_code, attempt + 1, self.max_retries, delay,
+                )
+                response.close()
+            metrics.inc("http_retries_total", service=self.name)
+            time.sleep(delay)
+            attempt += 1
@@ -0,0 +1,82 @@
+"""
+Append-only JSONL journal for a pipeline step, so a crashed or interrupted run can resume.
+Each completed item is appended (and flushed) as soon as it is done; at the end of the step
+the journal is compacted into the normal step JSON file and removed.
+"""
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Any
+
+log = logging.getLogger(__name__)
+
+
+class StepJournal:
+    """One JSONL file of completed items; safe to append from several threads."""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._file = None
+
+    def load(self) -> list[dict[str, Any]]:
+        """Return every journaled record. A truncated last line (crash mid-write) is ignored."""
+        if not self.path.exists():
+            return []
+        records = []
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    log.warning("Skipping unreadable journal line in %s", self.path)
+        log.info("Loaded journal: %s (%d items)", self.path, len(records))
+        return records
+
+    def append(self, record: dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._drop_partial_line()
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(line)
+            self._file.flush()
+
+    def _drop_partial_line(self) -> None:
+        """Cut a line left unterminated by a crash mid-write, so the next record starts on its own line."""
+        if not self.path.exists():
+            return
+        with open(self.path, "rb+") as f:
+            end = f.seek(0, 2)
+            if end == 0:
+                return
+            pos = end
+            while pos > 0:
+                start = max(0, pos - 4096)
+                f.seek(start)
+                chunk = f.read(pos - start)
+                if pos == end and chunk.endswith(b"\n"):
+                    return
+                newline = chunk.rfind(b"\n")
+                if newline >= 0:
+                    pos = start + newline + 1
+                    break
+                pos = start
+            log.warning("Dropping a partial last line from %s", self.path)
+            f.truncate(pos)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def remove(self) -> None:
+        """Close and delete the journal (after it has been compacted into the step file)."""
+        self.close()
+        self.path.unlink(missing_ok=True)
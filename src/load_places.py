@@ -1,15 +1,127 @@
 import csv
+import gzip
+import hashlib
+import logging
 from pathlib import Path
+from typing import IO, Iterable, Iterator
 import json
 
-def load_places(input_path: str | Path) -> list[dict]:
+log = logging.getLogger(__name__)
+
+# Header names (lower-case) recognized as the name / address column; first match wins.
+NAME_COLUMNS = ("name", "place", "title", "place_name", "poi_name")
+ADDRESS_COLUMNS = ("address", "formatted_address", "addr", "full_address")
+# Rows per record batch read from Parquet files.
+PARQUET_BATCH_ROWS = 10_000
+# Input formats (after looking through a trailing .gz) picked up from a directory of inputs.
+INPUT_FORMATS = (".csv", ".txt", ".parquet", ".pq")
+
+
+def load_places(input_path: str | Path, dedupe: bool = True) -> list[dict]:
+    return list(iter_places(input_path, dedupe=dedupe))
+
+
+def iter_places(input_path: str | Path, dedupe: bool = True) -> Iterator[dict]:
+    """
+    Yield place dicts one row at a time, whitespace-normalized and (by default) deduplicated.
+    Supports CSV, .txt (one place per line), their gzip-compressed variants (.csv.gz, .txt.gz)
+    and Parquet (.parquet, needs pyarrow). Memory use does not grow with file size, except for
+    the set of keys kept for deduplication.
+    """
     path = Path(input_path)
     if not path.exists():
         raise FileNotFoundError(str(path))
 
-    if path.suffix.lower() == ".txt":
-        return _load_txt(path)
-    return _load_csv(path)
+    fmt = _input_format(path)
+    if fmt == ".txt":
+        rows = _iter_txt(path)
+    elif fmt in (".parquet", ".pq"):
+        rows = _iter_parquet(path)
+    else:
+        rows = _iter_csv(path)
+    rows = _normalize_rows(rows)
+    return dedupe_places(rows) if dedupe else rows
+
+
+def find_inputs(spec: str, base_dir: str | Path) -> list[Path]:
+    """
+    Input files for a batch job, sorted: every supported file in a directory, or the files
+    matching a glob under base_dir (e.g. "trips/*.csv", "**/*.txt.gz"). Relative directory and file
+    specs resolve against base_dir; a glob must be relative and stay inside base_dir.
+    """
+    base = Path(base_dir)
+    path = Path(spec) if spec else base
+    if not path.is_absolute():
+        path = base / path
+    if path.is_dir():
+        candidates = path.iterdir()
+    elif path.is_file():
+        candidates = [path]
+    else:
+        pattern = Path(spec)
+        if pattern.is_absolute() or ".." in pattern.parts:
+            raise ValueError(f"Input glob must be relative to {base} and stay inside it: {spec!r}")
+        candidates = base.glob(spec)
+    return sorted(p for p in candidates if p.is_file() and _input_format(p) in INPUT_FORMATS)
+
+
+def _input_format(path: Path) -> str:
+    """File format suffix, looking through a trailing .gz (e.g. "places.csv.gz" → ".csv")."""
+    suffixes = [s.lower() for s in path.suffixes]
+    if suffixes and suffixes[-1] == ".gz":
+        suffixes = suffixes[:-1]
+    return suffixes[-1] if suffixes else ""
+
+
+def _open_text(path: Path, newline: str | None = None) -> IO[str]:
+    if path.suffix.lower() == ".gz":
+        return gzip.open(path, "rt", encoding="utf-8", newline=newline)
+    return open(path, encoding="utf-8", newline=newline)
+
+
+def _pick_columns(header: list[str]) -> tuple[str, str | None]:
+    """Choose the name and address columns from a header row."""
+    lowered = {h.strip().lower(): h for h in header}
+    name_col = next((lowered[c] for c in NAME_COLUMNS if c in lowered), header[0])
+    addr_col = next((lowered[c] for c in ADDRESS_COLUMNS if c in lowered), None)
+    return name_col, addr_col
+
+
+def query_key(place: dict) -> str:
+    """Case- and whitespace-insensitive identity of an input row (name + address)."""
+    name = " ".join((place.get("name") or "").split()).casefold()
+    address = " ".join((place.get("address") or "").split()).casefold()
+    return f"{name}|{address}"
+
+
+def row_hash(place: dict) -> str:
+    """Content hash of an input row (all loaded fields), used to diff input files between runs."""
+    data = json.dumps(place, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+def dedupe_places(places: Iterable[dict]) -> Iterator[dict]:
+    """Yield places, skipping rows whose query_key was already seen."""
+    seen: set[str] = set()
+    skipped = 0
+    for place in places:
+        key = query_key(place)
+        if key in seen:
+            skipped += 1
+            continue
+        seen.add(key)
+        yield place
+    if skipped:
+        log.info("Skipped %d duplicate input rows", skipped)
+
+
+def _normalize_rows(places: Iterable[dict]) -> Iterator[dict]:
+    """Collapse runs of whitespace in name and address."""
+    for place in places:
+        place["name"] = " ".join(place["name"].split())
+        if place.get("address"):
+            place["address"] = " ".join(place["address"].split())
+        yield place
 
 
 def load_enriched(input_path: str | Path) -> list[dict]:
@@ -20,34 +132,52 @@ def load_enriched(input_path: str | Path) -> list[dict]:
         return json.load(f)
 
 
-def _load_txt(path: Path) -> list[dict]:
-    places = []
-    with open(path, encoding="utf-8") as f:
+def _iter_txt(path: Path) -> Iterator[dict]:
+    with _open_text(path) as f:
         for line in f:
             name = line.strip()
             if name:
-                places.append({"name": name})
-    return places
+                yield {"name": name}
 
 
-def _load_csv(path: Path) -> list[dict]:
-    with open(path, encoding="utf-8", newline="") as f:
+def _iter_csv(path: Path) -> Iterator[dict]:
+    with _open_text(path, newline="") as f:
         reader = csv.DictReader(f)
-        rows = list(reader)
-    if not rows:
-        return []
-
-    header = list(rows[0].keys())
-    name_col = next((h for h in header if h.strip().lower() in ("name", "place", "title")), header[0])
-    addr_col = next((h for h in header if h.strip().lower() == "address"), None)
-
-    places = []
-    for row in rows:
-        name = (row.get(name_col) or "").strip()
-        if not name:
-            continue
-        item = {"name": name}
-        if addr_col and row.get(addr_col):
-            item["address"] = row[addr_col].strip()
-        places.append(item)
-    return places
+        header = reader.fieldnames
+        if not header:
+            return
+        name_col, addr_col = _pick_columns(list(header))
+
+        for row in reader:
+            name = (row.get(name_col) or "").strip()
+            if not name:
+                continue
+            item = {"name": name}
+            if addr_col and row.get(addr_col):
+                item["address"] = row[addr_col].strip()
+            yield item
+
+
+def _iter_parquet(path: Path) -> Iterator[dict]:
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("Reading Parquet input requires pyarrow (pip install pyarrow)") from e
+
+    parquet = pq.ParquetFile(path)
+    header = list(parquet.schema_arrow.names)
+    if not header:
+        return
+    name_col, addr_col = _pick_columns(header)
+    columns = [name_col] + ([addr_col] if addr_col else [])
+    for batch in parquet.iter_batches(batch_size=PARQUET_BATCH_ROWS, columns=columns):
+        names = batch.column(0).to_pylist()
+        addresses = batch.column(1).to_pylist() if addr_col else [None] * len(names)
+        for raw_name, raw_addr in zip(names, addresses):
+            name = str(raw_name).strip() if raw_name is not None else ""
+            if not name:
+                continue
+            item = {"name": name}
+            if raw_addr:
+                item["address"] = str(raw_addr).strip()
+            yield item
@@ -1,65 +1,238 @@
 import json
 import logging
 import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime
 from pathlib import Path
-from typing import Any
+from typing import Any, Callable, Iterable, Iterator
 
 from config import settings
 
-from src.assign_icons import assign_icons
-from src.categorize import DEFAULT_CATEGORY, assign_quality_colors, categorize_places
-from src.google_places import fetch_place_details
-from src.load_places import load_places, load_enriched
+from src import columnar
+from src.assign_icons import assign_icons, icon_column
+from src.categorize import (
+    Categorizer,
+    apply_categories,
+    assign_quality_colors,
+    categorize_places,
+    is_provisional,
+    place_key,
+    quality_color_column,
+)
+from src.export import MyMapsExporter, export_places
+from src.enrich import FetchMemo, PlaceResolver, escalate_reviews
+from src.geo import Region, load_region
+from src.google_places import get_places_cache
+from src.journal import StepJournal
+from src.load_places import find_inputs, iter_places, load_places, load_enriched, row_hash
+from src.metrics import metrics
 
 log = logging.getLogger(__name__)
 
 # ---------------------------------------------------------------------------
 # Step output paths (for running pipeline step-by-step)
 # ---------------------------------------------------------------------------
+# Per-input step and export directories while a batch job works on one of its files (see _job_scope).
+_job_steps_dir: ContextVar[Path | None] = ContextVar("job_steps_dir", default=None)
+_job_output_dir: ContextVar[Path | None] = ContextVar("job_output_dir", default=None)
+
+
 def _step_path(filename: str) -> Path:
-    return settings.STEPS_OUTPUT_DIR / filename
+    return (_job_steps_dir.get() or settings.STEPS_OUTPUT_DIR) / filename
+
+
+def _columnar_format() -> str | None:
+    """"arrow" or "parquet" when STEP_FORMAT selects columnar step files, else None (JSON)."""
+    fmt = settings.STEP_FORMAT
+    return fmt if fmt in columnar.FORMAT_SUFFIXES else None
+
 
+def _step_file(filename: str) -> Path:
+    """Path of a step file in the configured STEP_FORMAT (e.g. enriched.json → enriched.arrow)."""
+    fmt = _columnar_format()
+    if fmt is None:
+        return _step_path(filename)
+    return _step_path(Path(filename).stem + columnar.FORMAT_SUFFIXES[fmt])
 
-def save_step_output(data: list[dict[str, Any]], filename: str) -> Path:
-    """Save step output to data/steps/output/<filename>."""
-    path = _step_path(filename)
+
+def save_step_output(data: Iterable[dict[str, Any]], filename: str) -> Path:
+    """
+    Save step output to data/steps/output/<filename> as a JSON array (or an Arrow/Parquet file
+    with STEP_FORMAT=arrow/parquet). Items are written one batch at a time, so `data` may be a
+    generator of any length.
+    """
+    path = _step_file(filename)
     path.parent.mkdir(parents=True, exist_ok=True)
+    fmt = _columnar_format()
+    if fmt is not None:
+        count = columnar.write_rows(data, path, fmt)
+        log.info("Saved step output: %s (%d items)", path, count)
+        metrics.inc("step_items_total", count, step=Path(filename).stem)
+        return path
+    count = 0
     with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, ensure_ascii=False, indent=2)
-    log.info("Saved step output: %s (%d items)", path, len(data))
+        f.write("[")
+        for item in data:
+            f.write(",\n  " if count else "\n  ")
+            f.write(json.dumps(item, ensure_ascii=False, indent=2).replace("\n", "\n  "))
+            count += 1
+        f.write("\n]" if count else "]")
+    log.info("Saved step output: %s (%d items)", path, count)
+    metrics.inc("step_items_total", count, step=Path(filename).stem)
     return path
 
 
 def load_step_output(filename: str) -> list[dict[str, Any]]:
-    """Load step output from data/steps/output/<filename>."""
-    path = _step_path(filename)
+    """Load step output from data/steps/output/<filename> (in the configured STEP_FORMAT)."""
+    path = _step_file(filename)
     if not path.exists():
         raise FileNotFoundError(f"Step output not found: {path}. Run the previous step first.")
-    with open(path, encoding="utf-8") as f:
-        data = json.load(f)
+    fmt = _columnar_format()
+    if fmt is not None:
+        data = list(columnar.table_to_rows(columnar.read_table(path, fmt)))
+    else:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
     log.info("Loaded step output: %s (%d items)", path, len(data))
     return data
 
 
+def load_step_table(filename: str) -> Any:
+    """Load a columnar step file as a pyarrow Table (memory-mapped); requires STEP_FORMAT=arrow/parquet."""
+    fmt = _columnar_format()
+    if fmt is None:
+        raise ValueError("load_step_table needs STEP_FORMAT=arrow or parquet")
+    path = _step_file(filename)
+    if not path.exists():
+        raise FileNotFoundError(f"Step output not found: {path}. Run the previous step first.")
+    table = columnar.read_table(path, fmt)
+    log.info("Loaded step output: %s (%d items)", path, table.num_rows)
+    return table
+
+
+def save_step_table(table: Any, filename: str) -> Path:
+    """Save a pyarrow Table as a columnar step file; requires STEP_FORMAT=arrow/parquet."""
+    fmt = _columnar_format()
+    if fmt is None:
+        raise ValueError("save_step_table needs STEP_FORMAT=arrow or parquet")
+    path = _step_file(filename)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    columnar.write_table(table, path, fmt)
+    log.info("Saved step output: %s (%d items)", path, table.num_rows)
+    metrics.inc("step_items_total", table.num_rows, step=Path(filename).stem)
+    return path
+
+
+def _column_or_nulls(table: Any, name: str) -> Any:
+    import pyarrow as pa
+
+    return table.column(name) if name in table.column_names else pa.nulls(table.num_rows)
+
+
+def _step_journal(filename: str, resume: bool | None) -> StepJournal:
+    """Journal for a step file (data/steps/output/<stem>.journal.jsonl); discarded unless resuming."""
+    if resume is None:
+        resume = settings.RESUME
+    journal = StepJournal(_step_path(f"{Path(filename).stem}.journal.jsonl"))
+    if not resume:
+        journal.remove()
+    return journal
+
+
 # ---------------------------------------------------------------------------
 # Enrich (Google Places)
 # ---------------------------------------------------------------------------
-def enrich_places_from_list(places: list[dict[str, Any]]) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
-    """Enrich a list of place dicts (name, optional address) via Google Places API."""
+def _collapse_by_place_id(enriched: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """Keep the first record per place_id (rows that resolved to the same place)."""
+    seen: set[str] = set()
+    unique = []
+    for detail in enriched:
+        key = place_key(detail)
+        if key in seen:
+            continue
+        seen.add(key)
+        unique.append(detail)
+    if len(unique) < len(enriched):
+        log.info("Collapsed %d rows that resolved to an already enriched place", len(enriched) - len(unique))
+    return unique
+
+
+def _row_key(place: dict[str, Any]) -> str:
+    """Identity of an input row (used to match journal records to rows on resume)."""
+    return f"{place.get('name') or ''}|{place.get('address') or ''}"
+
+
+def enrich_places_from_list(
+    places: list[dict[str, Any]],
+    workers: int | None = None,
+    journal: StepJournal | None = None,
+    region: Region | None = None,
+    on_enriched: Callable[[dict[str, Any], dict[str, Any] | None], None] | None = None,
+    fetches: FetchMemo | None = None,
+) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    """
+    Enrich a list of place dicts (name, optional address) via Google Places API.
+    Uses `workers` threads (default PLACES_WORKERS); all of them share the Places rate limiter.
+    Rows resolving to the same place_id share one details call and one enriched record.
+    Searches are biased toward `region` when given (see PlaceResolver).
+    With a journal, rows already journaled are skipped and each resolved row is journaled as it completes
+    (rows that did not resolve are not, so a resumed run retries them).
+    Enriched and failed lists keep the input order. on_enriched(row, detail or None) is called for
+    every row, in input order, before rows are collapsed by place_id.
+    Pass `fetches` to share Places lookups with other concurrent enrichments (batch jobs).
+    """
+    resolver = PlaceResolver(region, fetches)
+    done: dict[int, dict[str, Any]] = {}
+    if journal is not None:
+        for record in journal.load():
+            i = record.get("i")
+            # Failed lookups are retried (journals from older runs may still hold them).
+            if isinstance(i, int) and i < len(places) and record.get("row") == _row_key(places[i]) and record.get("detail"):
+                done[i] = record
+        if done:
+            log.info("Resuming enrich: %d/%d places already journaled", len(done), len(places))
+
+    def work(item: tuple[int, dict[str, Any]]) -> dict[str, Any] | None:
+        i, place = item
+        detail = resolver.enrich(place)
+        if journal is not None and detail:
+            journal.append({"i": i, "row": _row_key(place), "detail": detail})
+        return detail
+
+    todo = [(i, place) for i, place in enumerate(places) if i not in done]
+    if workers is None:
+        workers = settings.PLACES_WORKERS
+    workers = max(1, min(workers, len(todo) or 1))
+    if workers == 1:
+        results = map(work, todo)
+        executor = None
+    else:
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="enrich")
+        results = executor.map(work, todo)
+    details: dict[int, dict[str, Any] | None] = {i: record.get("detail") for i, record in done.items()}
+    try:
+        for (i, place), detail in zip(todo, results):
+            log.info("Enriched %d/%d: %s", i + 1, len(places), place.get("name") or "")
+            details[i] = detail
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
     enriched: list[dict[str, Any]] = []
     failed: list[dict[str, Any]] = []
     for i, place in enumerate(places):
-        name = place.get("name") or ""
-        address = place.get("address")
-        log.info("Enriched %d/%d: %s", i + 1, len(places), name)
-        detail = fetch_place_details(name, address)
+        detail = details.get(i)
+        if on_enriched is not None:
+            on_enriched(place, detail or None)
         if detail:
             enriched.append(detail)
         else:
             failed.append(place)
-            log.warning("No details for: %s", name)
-    return enriched, failed
+            log.warning("No details for: %s", place.get("name") or "")
+    return _collapse_by_place_id(enriched), failed
 
 
 def enrich_places(input_path: str | Path) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
@@ -77,47 +250,152 @@ def save_enriched_debug(enriched: list[dict[str, Any]], out_path: Path | None =
     return out_path
 
 
+# ---------------------------------------------------------------------------
+# Categorize (with tiered review fetches)
+# ---------------------------------------------------------------------------
+def categorize_enriched(
+    places: list[dict[str, Any]],
+    workers: int | None = None,
+    on_categorized: Callable[[dict[str, Any], str], None] | None = None,
+) -> dict[str, str]:
+    """
+    categorize_places, plus review escalation with PLACES_DETAILS_TIERED (see escalate_reviews).
+    on_categorized only sees final answers.
+    """
+    if not settings.PLACES_DETAILS_TIERED:
+        return categorize_places(places, workers=workers, on_categorized=on_categorized)
+    confidences: dict[str, float] = {}
+
+    def report(place: dict[str, Any], category: str) -> None:
+        if not is_provisional(place, confidences.get(place_key(place))):
+            on_categorized(place, category)
+
+    categories = categorize_places(
+        places,
+        workers=workers,
+        on_categorized=report if on_categorized is not None else None,
+        confidences=confidences,
+    )
+    categories.update(
+        escalate_reviews(
+            places,
+            confidences,
+            lambda escalated: categorize_places(escalated, workers=workers, on_categorized=on_categorized),
+        )
+    )
+    return categories
+
+
 # ---------------------------------------------------------------------------
 # Step runners (read/write step files so you can run one step at a time)
 # ---------------------------------------------------------------------------
-def run_step_load(input_path: str | Path) -> list[dict[str, Any]]:
-    """Step 1: Load places from CSV/txt and save to data/steps/output/places_loaded.json."""
-    places = load_places(input_path)
-    save_step_output(places, settings.STEP_PLACES_LOADED)
-    return places
+@metrics.stage("load")
+def run_step_load(input_path: str | Path) -> int:
+    """
+    Step 1: Stream places from CSV/txt/Parquet (optionally gzipped) into data/steps/output/places_loaded.json.
+    Returns the number of places saved.
+    """
+    count = 0
+
+    def counted(rows: Iterable[dict[str, Any]]) -> Iterable[dict[str, Any]]:
+        nonlocal count
+        for row in rows:
+            count += 1
+            yield row
+
+    save_step_output(counted(iter_places(input_path)), settings.STEP_PLACES_LOADED)
+    return count
 
 
-def run_step_enrich(input_path: str | Path | None = None) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
-    """Step 2: Enrich places (from previous step file or input_path) and save to data/steps/output/enriched.json."""
+@metrics.stage("enrich")
+def run_step_enrich(
+    input_path: str | Path | None = None,
+    resume: bool | None = None,
+    region: Region | None = None,
+    fetches: FetchMemo | None = None,
+) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    """
+    Step 2: Enrich places (from previous step file or input_path) and save to data/steps/output/enriched.json.
+    Every resolved row is journaled to enriched.journal.jsonl as it completes; with resume (default RESUME)
+    journaled places are skipped. The journal is compacted into enriched.json at the end.
+    The search region defaults to input_path's .region.json sidecar, else PLACES_REGION.
+    """
     if input_path is None:
         places = load_step_output(settings.STEP_PLACES_LOADED)
     else:
         places = load_places(input_path)
-    enriched, failed = enrich_places_from_list(places)
+    if region is None:
+        region = load_region(input_path)
+    journal = _step_journal(settings.STEP_ENRICHED, resume)
+    enriched, failed = enrich_places_from_list(places, journal=journal, region=region, fetches=fetches)
+    cache = get_places_cache()
+    if cache is not None:
+        log.info("Places cache: %s", cache.stats())
     if enriched:
         save_step_output(enriched, settings.STEP_ENRICHED)
+    journal.remove()
     return enriched, failed
 
 
-def run_step_categorize() -> list[dict[str, Any]]:
-    """Step 3: Load enriched from data/steps/output/enriched.json, categorize, assign quality_color, save to categorized.json."""
+@metrics.stage("categorize")
+def run_step_categorize(resume: bool | None = None) -> list[dict[str, Any]]:
+    """
+    Step 3: Load enriched from data/steps/output/enriched.json, categorize, assign quality_color, save to categorized.json.
+    Categories are journaled to categorized.journal.jsonl as each batch completes; with resume (default RESUME)
+    journaled places are not sent again. The journal is compacted into categorized.json at the end.
+    """
     enriched = load_step_output(settings.STEP_ENRICHED)
-    name_to_category = categorize_places(enriched)
-    for place in enriched:
-        place["category"] = name_to_category.get(place.get("name") or "", DEFAULT_CATEGORY)
-    assign_quality_colors(enriched)
-    save_step_output(enriched, settings.STEP_CATEGORIZED)
+    journal = _step_journal(settings.STEP_CATEGORIZED, resume)
+    journaled = {r["key"]: r["category"] for r in journal.load() if "key" in r and "category" in r}
+    pending = [p for p in enriched if place_key(p) not in journaled]
+    if journaled:
+        log.info("Resuming categorize: %d/%d places already journaled", len(enriched) - len(pending), len(enriched))
+    categories = categorize_enriched(
+        pending,
+        on_categorized=lambda place, cat: journal.append({"key": place_key(place), "category": cat}),
+    )
+    apply_categories(enriched, {**journaled, **categories})
+    if _columnar_format() is not None:
+        table = columnar.rows_to_table(enriched)
+        colors = quality_color_column(_column_or_nulls(table, "rating"), _column_or_nulls(table, "user_ratings_count"))
+        for place, color in zip(enriched, colors.to_pylist()):
+            place["quality_color"] = color
+        save_step_table(columnar.set_column(table, "quality_color", colors), settings.STEP_CATEGORIZED)
+    else:
+        assign_quality_colors(enriched)
+        save_step_output(enriched, settings.STEP_CATEGORIZED)
+    journal.remove()
     return enriched
 
 
+@metrics.stage("assign_icons")
 def run_step_assign_icons() -> list[dict[str, Any]]:
-    """Step 4: Load categorized.json from data/steps/output/, add icon per category, save to categorized_with_icons.json."""
+    """
+    Step 4: Load categorized.json from data/steps/output/, add icon per category, save to categorized_with_icons.json.
+    With a columnar STEP_FORMAT the icon column is computed on the memory-mapped table.
+    """
+    if _columnar_format() is not None:
+        table = load_step_table(settings.STEP_CATEGORIZED)
+        table = columnar.set_column(table, "icon", icon_column(_column_or_nulls(table, "category")))
+        save_step_table(table, settings.STEP_CATEGORIZED_WITH_ICONS)
+        return list(columnar.table_to_rows(table))
     places = load_step_output(settings.STEP_CATEGORIZED)
     assign_icons(places)
     save_step_output(places, settings.STEP_CATEGORIZED_WITH_ICONS)
     return places
 
 
+@metrics.stage("export")
+def run_step_export(places: Iterable[dict[str, Any]] | None = None) -> list[Path]:
+    """
+    Step 5: Export places (default: categorized_with_icons.json) to My Maps CSV/KML files in data/output/,
+    sharded per EXPORT_SHARD_BY and MYMAPS_MAX_ROWS_PER_LAYER. Returns the files written.
+    """
+    if places is None:
+        places = load_step_output(settings.STEP_CATEGORIZED_WITH_ICONS)
+    return export_places(places, out_dir=_job_output_dir.get())
+
+
 # ---------------------------------------------------------------------------
 # Full pipeline (legacy / all-in-one)
 # ---------------------------------------------------------------------------
@@ -125,9 +403,7 @@ def run_enrich(input_path: str | Path, save_debug: bool = True) -> list[dict[str
     """Load already-enriched JSON from input_path, categorize, and optionally save debug JSON."""
     enriched = load_enriched(input_path)
     if enriched:
-        name_to_category = categorize_places(enriched)
-        for place in enriched:
-            place["category"] = name_to_category.get(place.get("name") or "", DEFAULT_CATEGORY)
+        apply_categories(enriched, categorize_enriched(enriched))
         assign_quality_colors(enriched)
         if save_debug:
             save_enriched_debug(enriched)
@@ -136,10 +412,303 @@ def run_enrich(input_path: str | Path, save_debug: bool = True) -> list[dict[str
 
 def run_full_pipeline(input_path: str | Path) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
     """Run all steps in order, saving each step output. Returns (categorized with icons, failed from enrich)."""
+    if settings.PIPELINE_DELTA:
+        return run_delta_pipeline(input_path)
+    if settings.PIPELINE_STREAMING:
+        return run_streaming_pipeline(input_path)
     run_step_load(input_path)
-    enriched, failed = run_step_enrich(input_path=None)
+    enriched, failed = run_step_enrich(input_path=None, region=load_region(input_path))
     if not enriched:
         return [], failed
     run_step_categorize()
     with_icons = run_step_assign_icons()
+    if settings.EXPORT_ENABLED:
+        run_step_export(with_icons)
+    return with_icons, failed
+
+
+# ---------------------------------------------------------------------------
+# Delta pipeline (only new or changed input rows)
+# ---------------------------------------------------------------------------
+def _load_delta_state() -> tuple[dict[str, str | None], dict[str, dict[str, Any]]]:
+    """Previous run: ({row hash: place_key or None if it failed}, {place_key: record with icon})."""
+    path = _step_path(settings.STEP_DELTA_MANIFEST)
+    manifest: dict[str, str | None] = {}
+    if path.exists():
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    try:
+        records = load_step_output(settings.STEP_CATEGORIZED_WITH_ICONS)
+    except FileNotFoundError:
+        records = []
+    by_key: dict[str, dict[str, Any]] = {}
+    for record in records:
+        by_key.setdefault(place_key(record), record)
+    return manifest, by_key
+
+
+@metrics.stage("delta")
+def run_delta_pipeline(input_path: str | Path) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    """
+    Update the previous run's output for a changed input file. Every input row is content-hashed
+    and compared with data/steps/output/delta_manifest.json (row hash → place of the last run).
+    Only added or modified rows (and rows that failed last time) are enriched; a place that is
+    already in categorized_with_icons.json keeps its category, and only new places are categorized.
+    Rows gone from the input drop out. All step files and the manifest are rewritten in input order.
+    Returns (categorized with icons, failed from enrich).
+    """
+    rows = load_places(input_path)
+    manifest, previous = _load_delta_state()
+    hashes = [row_hash(row) for row in rows]
+    kept = {h: manifest[h] for h in hashes if manifest.get(h) in previous}
+    todo = [row for row, h in zip(rows, hashes) if h not in kept]
+    removed = len(set(manifest) - set(hashes))
+    log.info(
+        "Delta: %d rows unchanged, %d added or changed, %d removed since the last run",
+        len(kept), len(todo), removed,
+    )
+
+    new_keys: dict[str, str | None] = {}
+
+    def link(row: dict[str, Any], detail: dict[str, Any] | None) -> None:
+        new_keys[row_hash(row)] = place_key(detail) if detail else None
+
+    enriched, failed = enrich_places_from_list(todo, region=load_region(input_path), on_enriched=link)
+    fresh = [detail for detail in enriched if place_key(detail) not in previous]
+    if fresh:
+        apply_categories(fresh, categorize_enriched(fresh))
+        assign_quality_colors(fresh)
+        assign_icons(fresh)
+    records = {**previous, **{place_key(detail): detail for detail in fresh}}
+
+    manifest = {**kept, **new_keys}
+    with_icons: list[dict[str, Any]] = []
+    seen: set[str] = set()
+    for h in hashes:
+        key = manifest.get(h)
+        if key is None or key in seen or key not in records:
+            continue
+        seen.add(key)
+        with_icons.append(records[key])
+    log.info("Delta: %d places reused, %d newly categorized", len(with_icons) - len(fresh), len(fresh))
+
+    save_step_output(rows, settings.STEP_PLACES_LOADED)
+    save_step_output(
+        ({k: v for k, v in p.items() if k not in ("category", "quality_color", "icon")} for p in with_icons),
+        settings.STEP_ENRICHED,
+    )
+    save_step_output(({k: v for k, v in p.items() if k != "icon"} for p in with_icons), settings.STEP_CATEGORIZED)
+    save_step_output(with_icons, settings.STEP_CATEGORIZED_WITH_ICONS)
+    path = _step_path(settings.STEP_DELTA_MANIFEST)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({h: manifest[h] for h in hashes if h in manifest}, f, ensure_ascii=False, indent=2)
+    if settings.EXPORT_ENABLED:
+        run_step_export(with_icons)
     return with_icons, failed
+
+
+# ---------------------------------------------------------------------------
+# Batch job (many input files, shared limiters and caches)
+# ---------------------------------------------------------------------------
+def _job_names(inputs: list[Path]) -> list[str]:
+    """Output namespace per input: the file name without format suffixes, made unique."""
+    names: list[str] = []
+    for path in inputs:
+        base = path.name.split(".")[0] or path.name
+        name, n = base, 1
+        while name in names:
+            n += 1
+            name = f"{base}-{n}"
+        names.append(name)
+    return names
+
+
+@contextmanager
+def _job_scope(name: str) -> Iterator[None]:
+    """Route step files to data/steps/output/jobs/<name>/ and exports to data/output/<name>/ in this context."""
+    steps_dir = settings.STEPS_OUTPUT_DIR / "jobs" / name
+    steps_dir.mkdir(parents=True, exist_ok=True)
+    steps_token = _job_steps_dir.set(steps_dir)
+    output_token = _job_output_dir.set(settings.OUTPUT_DIR / name)
+    try:
+        yield
+    finally:
+        _job_steps_dir.reset(steps_token)
+        _job_output_dir.reset(output_token)
+
+
+@metrics.stage("batch")
+def run_batch_job(
+    spec: str | None = None,
+) -> dict[str, tuple[list[dict[str, Any]], list[dict[str, Any]]]]:
+    """
+    Run the pipeline for every input file matching `spec` (a directory or glob under data/steps/input/,
+    default INPUT_GLOB) in one process, with each file's step files and exports in its own directory.
+    Files are loaded and enriched JOB_FILE_WORKERS at a time through one Places rate limiter, cache
+    and lookup memo, so a place that appears in several files is searched and fetched once. The
+    enriched places of all files are then categorized together (each distinct place once, in full
+    LLM batches) before every file gets its categories, icons and export.
+    Returns {job name: (categorized with icons, failed from enrich)}; a file that fails is logged
+    and left out.
+    """
+    inputs = find_inputs(settings.INPUT_GLOB if spec is None else spec, settings.INPUT_DIR)
+    if not inputs:
+        raise FileNotFoundError(f"No input files match {spec or settings.INPUT_GLOB or settings.INPUT_DIR}")
+    names = _job_names(inputs)
+    log.info("Batch job: %d input files", len(inputs))
+    fetches = FetchMemo()
+
+    def enrich_file(name: str, path: Path) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+        with _job_scope(name):
+            run_step_load(path)
+            return run_step_enrich(input_path=None, region=load_region(path), fetches=fetches)
+
+    enriched: dict[str, tuple[list[dict[str, Any]], list[dict[str, Any]]]] = {}
+    with ThreadPoolExecutor(max_workers=max(1, settings.JOB_FILE_WORKERS), thread_name_prefix="job") as executor:
+        futures = {name: executor.submit(enrich_file, name, path) for name, path in zip(names, inputs)}
+        for name, path in zip(names, inputs):
+            try:
+                enriched[name] = futures[name].result()
+            except Exception as e:
+                log.exception("Batch job: %s failed: %s", path, e)
+                metrics.inc("batch_files_total", outcome="failed")
+
+    every = [p for places, _ in enriched.values() for p in places]
+    log.info("Batch job: categorizing %d distinct places (%d across all files)", len({place_key(p) for p in every}), len(every))
+    categories = categorize_enriched(every) if every else {}
+
+    results: dict[str, tuple[list[dict[str, Any]], list[dict[str, Any]]]] = {}
+    for name, (places, failed) in enriched.items():
+        with _job_scope(name):
+            with_icons: list[dict[str, Any]] = []
+            if places:
+                apply_categories(places, categories)
+                assign_quality_colors(places)
+                save_step_output(places, settings.STEP_CATEGORIZED)
+                with_icons = run_step_assign_icons()
+                if settings.EXPORT_ENABLED:
+                    run_step_export(with_icons)
+        results[name] = (with_icons, failed)
+        metrics.inc("batch_files_total", outcome="done")
+        log.info("Batch job: %s → %d categorized, %d failed at enrich", name, len(with_icons), len(failed))
+    return results
+
+
+# ---------------------------------------------------------------------------
+# Streaming pipeline (enrichment and categorization overlap)
+# ---------------------------------------------------------------------------
+@metrics.stage("stream")
+def run_streaming_pipeline(input_path: str | Path) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+    """
+    Load → enrich → categorize → icons with the stages overlapping: rows are read lazily, enrichment
+    workers (PLACES_WORKERS) feed a bounded queue (PIPELINE_QUEUE_SIZE), and each enriched place goes
+    to one Categorizer for the whole run. Rule and cache hits are finished at once; the rest are sent
+    to the LLM (LLM_WORKERS in flight) as soon as a full batch has built up. Step files are written at
+    the end, in input order. With EXPORT_ENABLED, each place is exported to My Maps files as soon as it
+    is categorized (provisional answers under PLACES_DETAILS_TIERED once their reviews are in).
+    Returns (categorized with icons, failed from enrich).
+    """
+    rows = iter_places(input_path)
+    exporter = MyMapsExporter() if settings.EXPORT_ENABLED else None
+    export_lock = threading.Lock()
+    exported: set[str] = set()
+
+    def finish(places: list[dict[str, Any]]) -> None:
+        assign_quality_colors(places)
+        assign_icons(places)
+        with export_lock:
+            if exporter is not None:
+                exporter.write_many(places)
+            exported.update(place_key(p) for p in places)
+
+    confidences: dict[str, float] = {}
+
+    def categorized(place: dict[str, Any], category: str) -> None:
+        if is_provisional(place, confidences.get(place_key(place))):
+            return
+        place["category"] = category
+        finish([place])
+
+    results: queue.Queue = queue.Queue()
+    slots = threading.Semaphore(max(1, settings.PIPELINE_QUEUE_SIZE))
+    loaded: list[dict[str, Any]] = []
+    producer_error: list[BaseException] = []
+    resolver = PlaceResolver(load_region(input_path))
+
+    def produce() -> None:
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, settings.PLACES_WORKERS), thread_name_prefix="enrich") as executor:
+                for index, place in enumerate(rows):
+                    loaded.append(place)
+                    # Backpressure: stop reading rows while the queue is full.
+                    slots.acquire()
+                    future = executor.submit(resolver.enrich, place)
+                    future.add_done_callback(lambda f, i=index, p=place: results.put((i, p, f)))
+        except BaseException as e:
+            producer_error.append(e)
+        finally:
+            results.put(None)
+
+    producer = threading.Thread(target=produce, name="enrich-producer", daemon=True)
+    producer.start()
+
+    enriched: list[tuple[int, dict[str, Any]]] = []
+    failed: list[tuple[int, dict[str, Any]]] = []
+    categorizing: list[tuple[int, dict[str, Any]]] = []
+    seen: set[str] = set()
+    categorizer = Categorizer(on_categorized=categorized, confidences=confidences)
+    try:
+        while True:
+            item = results.get()
+            if item is None:
+                break
+            slots.release()
+            index, place, future = item
+            try:
+                detail = future.result()
+            except Exception as e:
+                log.exception("Enrich failed for %s: %s", place.get("name") or "", e)
+                detail = None
+            if not detail:
+                failed.append((index, place))
+                log.warning("No details for: %s", place.get("name") or "")
+                continue
+            if place_key(detail) in seen:
+                log.info("Collapsed %s: resolved to an already enriched place", place.get("name") or "")
+                continue
+            seen.add(place_key(detail))
+            log.info("Enriched %d: %s", len(enriched) + 1, place.get("name") or "")
+            enriched.append((index, detail))
+            # Categorize a copy so enriched.json keeps the pre-categorization record.
+            copy = dict(detail)
+            categorizing.append((index, copy))
+            resolved = categorizer.add([copy])
+            if resolved:
+                copy["category"] = resolved[place_key(copy)]
+                finish([copy])
+    finally:
+        categories = categorizer.close()
+    producer.join()
+    if producer_error:
+        raise producer_error[0]
+
+    places = [p for _, p in categorizing]
+    categories.update(escalate_reviews(places, confidences, categorize_places))
+    apply_categories(places, categories)
+    # Places that fell back to the default category or waited for their reviews.
+    finish([p for p in places if place_key(p) not in exported])
+    if exporter is not None:
+        exporter.close()
+
+    enriched.sort(key=lambda e: e[0])
+    failed.sort(key=lambda e: e[0])
+    categorizing.sort(key=lambda e: e[0])
+    enriched_places = [p for _, p in enriched]
+    with_icons = [p for _, p in categorizing]
+    save_step_output(loaded, settings.STEP_PLACES_LOADED)
+    if enriched_places:
+        save_step_output(enriched_places, settings.STEP_ENRICHED)
+        categorized_only = [{k: v for k, v in p.items() if k != "icon"} for p in with_icons]
+        save_step_output(categorized_only, settings.STEP_CATEGORIZED)
+        save_step_output(with_icons, settings.STEP_CATEGORIZED_WITH_ICONS)
+    return with_icons, [p for _, p in failed]
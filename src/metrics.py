@@ -0,0 +1,207 @@
+"""
+Run metrics: per-stage wall time, request/retry/byte counters, LLM token usage, cache hit rates
+and an estimated cost, written as a JSON run report (and optionally a Prometheus textfile).
+"""
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Iterator
+
+from config import settings
+
+log = logging.getLogger(__name__)
+
+RUN_REPORT_FILE = "run_report.json"
+_PROMETHEUS_PREFIX = "map_categorizer_"
+
+
+class Metrics:
+    """Thread-safe labelled counters plus accumulated wall time per stage."""
+
+    def __init__(self) -> None:
+        self._counters: dict[tuple[str, tuple[tuple[str, str], ...]], float] = {}
+        self._stages: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        key = (name, tuple(sorted((k, str(v)) for k, v in labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def total(self, name: str, **labels: Any) -> float:
+        """Sum of a counter over every label set matching `labels`."""
+        wanted = {(k, str(v)) for k, v in labels.items()}
+        with self._lock:
+            return sum(v for (n, lbls), v in self._counters.items() if n == name and wanted <= set(lbls))
+
+    def series(self, name: str) -> list[tuple[dict[str, str], float]]:
+        """Every (labels, value) pair recorded for a counter."""
+        with self._lock:
+            return [(dict(lbls), v) for (n, lbls), v in self._counters.items() if n == name]
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Accumulate the wall time of the enclosed block under `name`."""
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self._stages[name] = self._stages.get(name, 0.0) + elapsed
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            counters: dict[str, dict[str, float]] = {}
+            for (name, labels), value in sorted(self._counters.items()):
+                label_str = ",".join(f"{k}={v}" for k, v in labels) or "total"
+                counters.setdefault(name, {})[label_str] = value
+            return {"stages_seconds": {k: round(v, 3) for k, v in self._stages.items()}, "counters": counters}
+
+    def prometheus(self) -> str:
+        """Render counters and stage times in the Prometheus text exposition format."""
+        lines = []
+        with self._lock:
+            names = sorted({name for name, _ in self._counters})
+            for name in names:
+                metric = _PROMETHEUS_PREFIX + name
+                lines.append(f"# TYPE {metric} counter")
+                for (n, labels), value in sorted(self._counters.items()):
+                    if n != name:
+                        continue
+                    label_str = ",".join(f'{k}="{v}"' for k, v in labels)
+                    lines.append(f"{metric}{{{label_str}}} {value}" if label_str else f"{metric} {value}")
+            if self._stages:
+                metric = _PROMETHEUS_PREFIX + "stage_seconds"
+                lines.append(f"# TYPE {metric} gauge")
+                for stage, seconds in sorted(self._stages.items()):
+                    lines.append(f'{metric}{{stage="{stage}"}} {seconds:.3f}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._stages.clear()
+
+
+# Process-wide registry used by the Places client, the categorizer and the step runners.
+metrics = Metrics()
+
+
+def estimate_cost(m: Metrics = metrics) -> dict[str, float]:
+    """Estimated USD cost of the recorded Places requests (per SKU) and LLM tokens (per cascade tier)."""
+    prices = {
+        "search": settings.PLACES_PRICE_SEARCH_PER_1000,
+        "search_details": settings.PLACES_PRICE_SEARCH_DETAILS_PER_1000,
+        "search_details_lean": settings.PLACES_PRICE_SEARCH_DETAILS_LEAN_PER_1000,
+        "details": settings.PLACES_PRICE_DETAILS_PER_1000,
+        "details_lean": settings.PLACES_PRICE_DETAILS_LEAN_PER_1000,
+    }
+    places = sum(m.total("places_requests_total", sku=sku) * price for sku, price in prices.items()) / 1000
+    fast_prompt = m.total("llm_prompt_tokens_total", tier="fast")
+    fast_completion = m.total("llm_completion_tokens_total", tier="fast")
+    llm = (
+        (m.total("llm_prompt_tokens_total") - fast_prompt) * settings.LLM_PRICE_INPUT_PER_MTOK
+        + (m.total("llm_completion_tokens_total") - fast_completion) * settings.LLM_PRICE_OUTPUT_PER_MTOK
+        + fast_prompt * settings.LLM_CASCADE_PRICE_INPUT_PER_MTOK
+        + fast_completion * settings.LLM_CASCADE_PRICE_OUTPUT_PER_MTOK
+    ) / 1_000_000
+    return {"places": round(places, 4), "llm": round(llm, 4), "total": round(places + llm, 4)}
+
+
+def cache_hit_rates(m: Metrics = metrics) -> dict[str, dict[str, float]]:
+    """{"<cache>/<namespace>": {"hits", "misses", "hit_rate"}} from the cache_lookups_total counter."""
+    summary: dict[str, dict[str, float]] = {}
+    for labels, value in m.series("cache_lookups_total"):
+        entry = summary.setdefault(f"{labels['cache']}/{labels['namespace']}", {"hits": 0, "misses": 0})
+        entry["hits" if labels["result"] == "hit" else "misses"] += value
+    for entry in summary.values():
+        lookups = entry["hits"] + entry["misses"]
+        entry["hit_rate"] = round(entry["hits"] / lookups, 3) if lookups else 0.0
+    return summary
+
+
+def fast_path_stats(m: Metrics = metrics) -> dict[str, float]:
+    """Places the rule pre-classifier resolved or forwarded to the LLM, and LLM batch calls it avoided."""
+    resolved = m.total("fast_path_places_total", outcome="resolved")
+    forwarded = m.total("fast_path_places_total", outcome="forwarded")
+    return {
+        "resolved": resolved,
+        "forwarded": forwarded,
+        "resolved_rate": round(resolved / (resolved + forwarded), 3) if resolved + forwarded else 0.0,
+        "llm_calls_avoided": m.total("llm_batches_avoided_total", source="rules"),
+    }
+
+
+def cascade_stats(m: Metrics = metrics) -> dict[str, Any]:
+    """
+    Per-tier LLM requests, latency, tokens and cost, plus the share of places the fast tier escalated
+    (for tuning LLM_CASCADE_MIN_CONFIDENCE). Empty when the cascade's fast tier was not used.
+    """
+    counters = {
+        "requests": "llm_requests_total",
+        "seconds": "llm_request_seconds_total",
+        "prompt_tokens": "llm_prompt_tokens_total",
+        "completion_tokens": "llm_completion_tokens_total",
+    }
+    tiers: dict[str, dict[str, float]] = {}
+    for field, name in counters.items():
+        for labels, value in m.series(name):
+            if "tier" in labels:
+                entry = tiers.setdefault(labels["tier"], dict.fromkeys(counters, 0))
+                entry[field] += value
+    if "fast" not in tiers:
+        return {}
+    prices = {
+        "fast": (settings.LLM_CASCADE_PRICE_INPUT_PER_MTOK, settings.LLM_CASCADE_PRICE_OUTPUT_PER_MTOK),
+        "strong": (settings.LLM_PRICE_INPUT_PER_MTOK, settings.LLM_PRICE_OUTPUT_PER_MTOK),
+    }
+    for tier, entry in tiers.items():
+        price_in, price_out = prices.get(tier, prices["strong"])
+        entry["seconds"] = round(entry["seconds"], 3)
+        entry["avg_latency_s"] = round(entry["seconds"] / entry["requests"], 3) if entry["requests"] else 0.0
+        entry["cost_usd"] = round((entry["prompt_tokens"] * price_in + entry["completion_tokens"] * price_out) / 1_000_000, 4)
+    accepted = m.total("llm_cascade_places_total", outcome="accepted")
+    escalated = m.total("llm_cascade_places_total", outcome="escalated")
+    places = accepted + escalated
+    return {
+        "tiers": tiers,
+        "places": places,
+        "escalated": escalated,
+        "escalation_rate": round(escalated / places, 3) if places else 0.0,
+        "min_confidence": settings.LLM_CASCADE_MIN_CONFIDENCE,
+    }
+
+
+def write_run_report(m: Metrics = metrics) -> Path:
+    """
+    Write data/steps/output/run_report.json (stages, counters, cache hit rates, rule pre-classifier,
+    cascade tiers, estimated cost).
+    Also writes the Prometheus textfile when METRICS_PROMETHEUS_FILE is set.
+    """
+    report = {
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        **m.snapshot(),
+        "caches": cache_hit_rates(m),
+        "fast_path": fast_path_stats(m),
+        "estimated_cost_usd": estimate_cost(m),
+    }
+    cascade = cascade_stats(m)
+    if cascade:
+        report["cascade"] = cascade
+    path = settings.STEPS_OUTPUT_DIR / RUN_REPORT_FILE
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    log.info("Saved run report: %s (estimated cost $%.4f)", path, report["estimated_cost_usd"]["total"])
+    if settings.METRICS_PROMETHEUS_FILE:
+        prom_path = Path(settings.METRICS_PROMETHEUS_FILE)
+        prom_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = prom_path.with_suffix(prom_path.suffix + ".tmp")
+        tmp.write_text(m.prometheus(), encoding="utf-8")
+        tmp.replace(prom_path)
+    return path
@@ -0,0 +1,213 @@
+"""
+Dry-run planner (RUN_STEP=plan): estimate Places calls, LLM batches, tokens, wall time and cost
+for an input file without calling any API. Existing caches are read (never written) so only the
+work a real run would still do is counted.
+"""
+import json
+import logging
+import math
+from collections import deque
+from pathlib import Path
+from typing import Any
+
+from config import settings
+from src.cache import SqliteCache
+from src.categorize import (
+    AdaptiveBatcher,
+    _build_batch_prompt,
+    _configured_providers,
+    _estimate_tokens,
+    _format_place_block,
+    category_cache_key,
+    classify_by_types,
+    place_key,
+    prompt_fingerprint,
+)
+from src.geo import load_region
+from src.google_places import build_query, get_places_cache, search_cache_key
+from src.load_places import iter_places
+from src.metrics import Metrics, estimate_cost
+
+log = logging.getLogger(__name__)
+
+RUN_PLAN_FILE = "run_plan.json"
+# Prompt tokens assumed per place that is not enriched yet (name, types, rating and a review snippet).
+_DEFAULT_PLACE_TOKENS = 120
+
+
+def _open_category_cache() -> SqliteCache | None:
+    """The category cache if it exists; None otherwise."""
+    path = Path(settings.CATEGORY_CACHE_PATH)
+    if not settings.CATEGORY_CACHE_ENABLED or not path.exists():
+        return None
+    return SqliteCache(path, ttl_seconds=settings.CATEGORY_CACHE_TTL_DAYS * 86400, max_entries=settings.CATEGORY_CACHE_MAX_ENTRIES)
+
+
+def _plan_places(input_path: str | Path) -> tuple[dict[str, Any], list[dict[str, Any]]]:
+    """
+    Count input rows and the Places calls still needed. Returns (counts, places already in the details cache).
+    With PLACES_DETAILS_TIERED details are counted as lean (review fetches depend on LLM confidence
+    and are not projected).
+    """
+    cache = get_places_cache() if Path(settings.PLACES_CACHE_PATH).exists() else None
+    region = load_region(input_path)
+    bias = region.location_bias() if region is not None else None
+    skip_outside = region is not None and settings.PLACES_OUT_OF_REGION == "skip"
+    tiered = settings.PLACES_DETAILS_TIERED
+    rows = 0
+    uncached = 0
+    details_calls = 0
+    out_of_region = 0
+    seen_ids: set[str] = set()
+    known: list[dict[str, Any]] = []
+    for place in iter_places(input_path):
+        rows += 1
+        query = search_cache_key(build_query(place.get("name") or "", place.get("address")), bias)
+        place_id = cache.peek("search", query) if cache is not None else None
+        if not place_id:
+            uncached += 1
+            continue
+        if place_id in seen_ids:
+            continue
+        seen_ids.add(place_id)
+        location = cache.peek("location", place_id) if skip_outside else None
+        if location and not region.contains(*location, margin_m=settings.PLACES_REGION_MARGIN_M):
+            out_of_region += 1
+            continue
+        detail = cache.peek("details", place_id) or (cache.peek("details_lean", place_id) if tiered else None)
+        if detail:
+            known.append(detail)
+        else:
+            details_calls += 1
+    lean = "_lean" if tiered else ""
+    calls = {"search": 0, f"search_details{lean}": 0, f"details{lean}": details_calls}
+    if settings.PLACES_SINGLE_REQUEST:
+        calls[f"search_details{lean}"] = uncached
+    else:
+        calls["search"] = uncached
+        calls[f"details{lean}"] += uncached
+    counts = {
+        "input_rows": rows,
+        "search_cached": rows - uncached,
+        "details_cached": len(known),
+        "out_of_region": out_of_region,
+        "calls": calls,
+        "to_enrich": uncached + details_calls,
+    }
+    return counts, known
+
+
+def _plan_llm(known: list[dict[str, Any]], to_enrich: int) -> dict[str, Any]:
+    """
+    Count LLM batches and prompt tokens. Places already enriched (from the details cache) go through
+    the rule pre-classifier, the category cache and the real batch packer; places still to enrich
+    are assumed to resolve by rules at the same rate and to cost the average prompt size.
+    """
+    unique = list({place_key(p): p for p in known}.values())
+    by_rules = 0
+    pending = []
+    for place in unique:
+        match = classify_by_types(place) if settings.FAST_PATH_ENABLED else None
+        if match and match[1] >= settings.FAST_PATH_MIN_CONFIDENCE:
+            by_rules += 1
+        else:
+            pending.append(place)
+    cache = _open_category_cache()
+    fingerprint = prompt_fingerprint()
+    cached = 0
+    if cache is not None:
+        uncached = [p for p in pending if not cache.peek("categories", category_cache_key(p, fingerprint))]
+        cached = len(pending) - len(uncached)
+        pending = uncached
+        cache.close()
+
+    batcher = AdaptiveBatcher(
+        max_size=settings.CATEGORIZE_BATCH_SIZE,
+        min_size=settings.CATEGORIZE_MIN_BATCH_SIZE,
+        token_budget=settings.CATEGORIZE_INPUT_TOKEN_BUDGET,
+        target_latency=settings.CATEGORIZE_TARGET_LATENCY,
+    )
+    queue = deque(pending)
+    batches = 0
+    prompt_tokens = 0
+    while queue:
+        batch = batcher.next_batch(queue)
+        batches += 1
+        prompt_tokens += _estimate_tokens(_build_batch_prompt(batch))
+
+    rule_rate = by_rules / len(unique) if unique else 0.0
+    new_llm_places = round(to_enrich * (1 - rule_rate))
+    if pending:
+        place_tokens = sum(_estimate_tokens(_format_place_block(p, 1)) for p in pending) / len(pending)
+    else:
+        place_tokens = _DEFAULT_PLACE_TOKENS
+    overhead = _estimate_tokens(_build_batch_prompt([]))
+    per_batch = max(1, min(settings.CATEGORIZE_BATCH_SIZE, int((settings.CATEGORIZE_INPUT_TOKEN_BUDGET - overhead) // place_tokens)))
+    new_batches = math.ceil(new_llm_places / per_batch)
+    batches += new_batches
+    prompt_tokens += new_batches * overhead + round(new_llm_places * place_tokens)
+    llm_places = len(pending) + new_llm_places
+    return {
+        "places_by_rules": by_rules + (to_enrich - new_llm_places),
+        "places_from_cache": cached,
+        "places_to_llm": llm_places,
+        "batches": batches,
+        "prompt_tokens": prompt_tokens,
+        # Lower bound: the answers themselves; reasoning models may spend more (capped per batch).
+        "completion_tokens": llm_places * settings.LLM_OUTPUT_TOKENS_PER_PLACE,
+    }
+
+
+def _wall_time(places_calls: int, llm: dict[str, Any]) -> dict[str, float]:
+    """Projected seconds for enrichment and categorization under the configured limits and workers."""
+    places_s = places_calls * settings.PLAN_PLACES_LATENCY / max(1, settings.PLACES_WORKERS)
+    if settings.PLACES_REQUESTS_PER_SECOND > 0:
+        places_s = max(places_s, places_calls / settings.PLACES_REQUESTS_PER_SECOND)
+    providers = max(1, len(_configured_providers()))
+    llm_s = llm["batches"] * settings.PLAN_LLM_BATCH_LATENCY / max(1, settings.LLM_WORKERS)
+    if settings.LLM_REQUESTS_PER_MINUTE > 0:
+        llm_s = max(llm_s, llm["batches"] * 60.0 / (settings.LLM_REQUESTS_PER_MINUTE * providers))
+    if settings.LLM_TOKENS_PER_MINUTE > 0:
+        llm_s = max(llm_s, llm["prompt_tokens"] * 60.0 / (settings.LLM_TOKENS_PER_MINUTE * providers))
+    total = max(places_s, llm_s) if settings.PIPELINE_STREAMING else places_s + llm_s
+    return {"enrich": round(places_s, 1), "categorize": round(llm_s, 1), "total": round(total, 1)}
+
+
+def plan_run(input_path: str | Path) -> dict[str, Any]:
+    """Build the plan for `input_path` and save it to data/steps/output/run_plan.json."""
+    places, known = _plan_places(input_path)
+    llm = _plan_llm(known, places["to_enrich"])
+    projected = Metrics()
+    for sku, count in places["calls"].items():
+        projected.inc("places_requests_total", count, sku=sku)
+    projected.inc("llm_prompt_tokens_total", llm["prompt_tokens"])
+    projected.inc("llm_completion_tokens_total", llm["completion_tokens"])
+    plan = {
+        "input": str(input_path),
+        "places": places,
+        "llm": llm,
+        "wall_time_seconds": _wall_time(sum(places["calls"].values()), llm),
+        "estimated_cost_usd": estimate_cost(projected),
+    }
+    path = settings.STEPS_OUTPUT_DIR / RUN_PLAN_FILE
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(plan, f, ensure_ascii=False, indent=2)
+    log.info("Saved run plan: %s", path)
+    return plan
+
+
+def format_plan(plan: dict[str, Any]) -> str:
+    places, llm, wall, cost = plan["places"], plan["llm"], plan["wall_time_seconds"], plan["estimated_cost_usd"]
+    calls = ", ".join(f"{sku}={n}" for sku, n in places["calls"].items() if n)
+    return "\n".join(
+        [
+            f"Plan for {plan['input']}",
+            f"  Input rows:     {places['input_rows']} ({places['search_cached']} searches and {places['details_cached']} details cached, "
+            f"{places['out_of_region']} known out of region)",
+            f"  Places calls:   {sum(places['calls'].values())} ({calls or 'none'})",
+            f"  Categorize:     {llm['places_by_rules']} by rules, {llm['places_from_cache']} cached, {llm['places_to_llm']} to the LLM",
+            f"  LLM batches:    {llm['batches']} (~{llm['prompt_tokens']} prompt tokens, ≥{llm['completion_tokens']} completion tokens)",
+            f"  Wall time:      ~{wall['total']:.0f}s (enrich {wall['enrich']:.0f}s, categorize {wall['categorize']:.0f}s)",
+            f"  Estimated cost: ${cost['total']:.2f} (Places ${cost['places']:.2f}, LLM ${cost['llm']:.2f})",
+        ]
+    )
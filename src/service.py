@@ -0,0 +1,371 @@
+"""
+Service mode (RUN_STEP=serve): a local HTTP endpoint for one-off lookups from other tools.
+The Places session, LLM clients and caches stay warm between requests. Identical lookups in
+flight (same query or place_id) share one upstream call, and places that need the LLM are
+micro-batched across concurrent requests into shared batch calls.
+
+    POST /categorize   {"name": ..., "address": ...} or {"place_id": ...} → one record
+                       [place, ...] or {"places": [...], "region": "lat,lng,radius_m"} → {"places": [...], "failed": [...]}
+    GET  /health       providers, caches and coalescing counters
+    GET  /metrics      Prometheus text format of the run metrics
+"""
+import json
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+from config import settings
+from src.assign_icons import assign_icons
+from src.categorize import (
+    DEFAULT_CATEGORY,
+    apply_categories,
+    assign_quality_colors,
+    category_cache_key,
+    count_llm_answer,
+    get_category_cache,
+    get_provider_pool,
+    is_provisional,
+    log_local_resolution,
+    place_key,
+    prompt_fingerprint,
+    resolve_locally,
+    run_cascade,
+)
+from src.enrich import FetchMemo, PlaceResolver, escalate_reviews
+from src.geo import Region, load_region
+from src.google_places import get_place_details, get_places_cache
+from src.metrics import metrics
+
+log = logging.getLogger(__name__)
+
+
+# ---------------------------------------------------------------------------
+# Micro-batching of LLM categorization across requests
+# ---------------------------------------------------------------------------
+class MicroBatcher:
+    """
+    Collects places from concurrent callers and categorizes them together: a batch is sent once
+    `max_size` places are waiting or `window` seconds after the first one arrived. Up to `workers`
+    batches run at once; while all of them are busy, places keep collecting into the next batch.
+    A place whose key is already waiting or in flight shares that place's result.
+    """
+
+    def __init__(self, window: float, max_size: int, workers: int) -> None:
+        self.window = max(0.0, window)
+        self.max_size = max(1, max_size)
+        self._waiting: dict[str, tuple[dict[str, Any], Future]] = {}
+        self._in_flight: dict[str, Future] = {}
+        self._cond = threading.Condition()
+        self._slots = threading.Semaphore(max(1, workers))
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="service-llm")
+        self._closed = False
+        self._thread = threading.Thread(target=self._loop, name="service-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, place: dict[str, Any]) -> Future:
+        """Future for the (category, confidence or None) of `place`."""
+        key = self._key(place)
+        with self._cond:
+            future = self._in_flight.get(key)
+            if future is None and key in self._waiting:
+                future = self._waiting[key][1]
+            if future is not None and not future.done():
+                metrics.inc("service_coalesced_total", kind="category")
+                return future
+            future = Future()
+            self._waiting[key] = (place, future)
+            self._cond.notify()
+            return future
+
+    @staticmethod
+    def _key(place: dict[str, Any]) -> str:
+        """Coalescing key: a place with reviews (review escalation) never shares a lean place's answer."""
+        key = place_key(place)
+        return key + "|full" if "reviews" in place else key
+
+    def close(self) -> None:
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+        self._executor.shutdown(wait=True)
+
+    def _loop(self) -> None:
+        while True:
+            # Cut the next batch only when a worker is free, so it holds everything that arrived meanwhile.
+            self._slots.acquire()
+            with self._cond:
+                while not self._waiting and not self._closed:
+                    self._cond.wait()
+                deadline = time.monotonic() + self.window
+                while len(self._waiting) < self.max_size and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if not self._waiting:
+                    self._slots.release()
+                    return
+                keys = list(self._waiting)[: self.max_size]
+                batch = [self._waiting.pop(key) for key in keys]
+                for key, (_, future) in zip(keys, batch):
+                    self._in_flight[key] = future
+            self._executor.submit(self._run, batch)
+
+    def _run(self, batch: list[tuple[dict[str, Any], Future]]) -> None:
+        """Categorize one batch and resolve its futures; whatever fails, no caller is left waiting."""
+        places = [place for place, _ in batch]
+        metrics.inc("service_batches_total")
+        metrics.inc("service_batched_places_total", len(places))
+        error: BaseException | None = None
+        results: list[tuple[str, float | None]] = []
+        try:
+            try:
+                got, _ = run_cascade(places)
+            finally:
+                self._slots.release()
+            cache = get_category_cache()
+            fingerprint = prompt_fingerprint()
+            for i, place in enumerate(places):
+                if i not in got:
+                    metrics.inc("categorized_places_total", source="default")
+                    results.append((DEFAULT_CATEGORY, None))
+                    continue
+                category, confidence = got[i]
+                count_llm_answer(place, confidence)
+                if cache is not None and not is_provisional(place, confidence):
+                    cache.set("categories", category_cache_key(place, fingerprint), category)
+                results.append((category, confidence))
+        except Exception as e:
+            log.exception("Service batch failed (%d places): %s", len(places), e)
+            error = e
+        finally:
+            # Forget the batch before resolving it, so a resubmit never joins a finished future.
+            with self._cond:
+                for place, future in batch:
+                    if self._in_flight.get(self._key(place)) is future:
+                        del self._in_flight[self._key(place)]
+            for i, (_, future) in enumerate(batch):
+                if error is None and i < len(results):
+                    future.set_result(results[i])
+                else:
+                    future.set_exception(error or RuntimeError("service batch did not complete"))
+
+
+# ---------------------------------------------------------------------------
+# Lookups
+# ---------------------------------------------------------------------------
+class CategorizeService:
+    """Enrich and categorize places on demand, sharing upstream calls between concurrent requests."""
+
+    def __init__(self) -> None:
+        self.fetches = FetchMemo(remember=False)
+        self.batcher = MicroBatcher(
+            window=settings.SERVICE_BATCH_WINDOW_MS / 1000.0,
+            max_size=settings.CATEGORIZE_BATCH_SIZE,
+            workers=settings.LLM_WORKERS,
+        )
+        self._enrich_pool = ThreadPoolExecutor(max_workers=max(1, settings.SERVICE_WORKERS), thread_name_prefix="service-enrich")
+
+    def warm_up(self) -> None:
+        """Open the caches and create the LLM clients before the first request."""
+        get_places_cache()
+        get_category_cache()
+        for provider in get_provider_pool().providers:
+            provider.client
+
+    def close(self) -> None:
+        self.batcher.close()
+        self._enrich_pool.shutdown(wait=True)
+
+    def _enrich(self, resolver: PlaceResolver, item: dict[str, Any]) -> dict[str, Any] | None:
+        if item.get("place_id") and not item.get("name"):
+            place_id = item["place_id"]
+            return self.fetches.get(f"details:{place_id}", lambda: get_place_details(place_id))
+        return resolver.enrich(item)
+
+    def _full_details(self, place: dict[str, Any]) -> dict[str, Any] | None:
+        place_id = place["place_id"]
+        return self.fetches.get(f"details_full:{place_id}", lambda: get_place_details(place_id, lean=False))
+
+    def _categorize_batched(
+        self,
+        places: list[dict[str, Any]],
+        confidences: dict[str, float] | None = None,
+    ) -> dict[str, str]:
+        """{place_key: category} for `places` through the micro-batcher (all submitted before waiting)."""
+        futures = [self.batcher.submit(place) for place in places]
+        categories = {}
+        for place, future in zip(places, futures):
+            category, confidence = future.result()
+            categories[place_key(place)] = category
+            if confidence is not None and confidences is not None:
+                confidences[place_key(place)] = confidence
+        return categories
+
+    def categorize(self, places: list[dict[str, Any]]) -> dict[str, str]:
+        """
+        {place_key: category}: rules and the category cache first, the rest through the micro-batcher.
+        With PLACES_DETAILS_TIERED, provisional answers get the place's reviews and a second pass
+        (see escalate_reviews).
+        """
+        combined: dict[str, str] = {}
+        unique = list({place_key(p): p for p in places}.values())
+        counts: dict[str, int] = {}
+        pending = resolve_locally(unique, combined, get_category_cache(), prompt_fingerprint(), counts)
+        log_local_resolution(len(unique), counts)
+        confidences: dict[str, float] = {}
+        combined.update(self._categorize_batched(pending, confidences))
+        combined.update(
+            escalate_reviews(places, confidences, self._categorize_batched, self._full_details, settings.SERVICE_WORKERS)
+        )
+        return combined
+
+    def lookup(
+        self,
+        items: list[dict[str, Any]],
+        region: Region | None = None,
+    ) -> tuple[list[dict[str, Any]], list[dict[str, Any]]]:
+        """
+        Enrich and categorize `items` ({"name", "address"} or {"place_id"}). Returns
+        (records with category, quality_color and icon, in input order; items that did not resolve).
+        """
+        resolver = PlaceResolver(region if region is not None else load_region(), self.fetches)
+        futures = [self._enrich_pool.submit(self._enrich, resolver, item) for item in items]
+        records: list[dict[str, Any]] = []
+        failed: list[dict[str, Any]] = []
+        for item, future in zip(items, futures):
+            try:
+                detail = future.result()
+            except Exception as e:
+                log.exception("Enrich failed for %s: %s", item.get("name") or item.get("place_id"), e)
+                detail = None
+            if detail:
+                records.append(dict(detail))
+            else:
+                failed.append(item)
+        apply_categories(records, self.categorize(records))
+        assign_quality_colors(records)
+        assign_icons(records)
+        return records, failed
+
+    def health(self) -> dict[str, Any]:
+        places_cache = get_places_cache()
+        category_cache = get_category_cache()
+        return {
+            "status": "ok",
+            "providers": get_provider_pool().status(),
+            "places_cache": places_cache.stats() if places_cache is not None else None,
+            "category_cache": category_cache.stats() if category_cache is not None else None,
+            "coalesced_lookups": self.fetches.coalesced,
+            "coalesced_categories": int(metrics.total("service_coalesced_total", kind="category")),
+        }
+
+
+# ---------------------------------------------------------------------------
+# HTTP
+# ---------------------------------------------------------------------------
+class _BadRequest(ValueError):
+    def __init__(self, message: str, status: int = 400) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+def _parse_items(body: Any) -> tuple[list[dict[str, Any]], bool, Region | None]:
+    """(items, single, region) from a request body."""
+    region = None
+    if isinstance(body, dict) and "places" in body:
+        if body.get("region"):
+            try:
+                region = Region.parse(str(body["region"]), source="request")
+            except ValueError as e:
+                raise _BadRequest(str(e)) from e
+        body = body["places"]
+    single = isinstance(body, dict)
+    items = [body] if single else body
+    if not isinstance(items, list) or not all(isinstance(i, dict) and (i.get("name") or i.get("place_id")) for i in items):
+        raise _BadRequest('Expected a place {"name", "address"} or {"place_id"}, a list of them, or {"places": [...]}')
+    if len(items) > settings.SERVICE_MAX_PLACES_PER_REQUEST:
+        raise _BadRequest(f"At most {settings.SERVICE_MAX_PLACES_PER_REQUEST} places per request", status=413)
+    return items, single, region
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "_ServiceServer"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        log.debug("%s - %s", self.address_string(), format % args)
+
+    def _send(self, status: int, body: Any, content_type: str = "application/json") -> None:
+        data = body.encode("utf-8") if isinstance(body, str) else json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        if self.path == "/health":
+            self._send(200, self.server.service.health())
+        elif self.path == "/metrics":
+            self._send(200, metrics.prometheus(), content_type="text/plain; version=0.0.4")
+        else:
+            self._send(404, {"error": "not found"})
+
+    def do_POST(self) -> None:
+        if self.path != "/categorize":
+            self._send(404, {"error": "not found"})
+            return
+        started = time.monotonic()
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                body = json.loads(self.rfile.read(length) or b"null")
+            except json.JSONDecodeError as e:
+                raise _BadRequest(f"Invalid JSON: {e}") from e
+            items, single, region = _parse_items(body)
+            records, failed = self.server.service.lookup(items, region)
+        except _BadRequest as e:
+            metrics.inc("service_requests_total", outcome="bad_request")
+            self._send(e.status, {"error": str(e)})
+            return
+        except Exception as e:
+            log.exception("Service request failed: %s", e)
+            metrics.inc("service_requests_total", outcome="error")
+            self._send(500, {"error": str(e)})
+            return
+        metrics.inc("service_requests_total", outcome="ok")
+        metrics.inc("service_request_seconds_total", time.monotonic() - started)
+        if single and records:
+            self._send(200, records[0])
+        elif single:
+            self._send(404, {"error": "no matching place", "place": items[0]})
+        else:
+            self._send(200, {"places": records, "failed": failed})
+
+
+class _ServiceServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], service: CategorizeService) -> None:
+        super().__init__(address, _Handler)
+        self.service = service
+
+
+def serve(host: str | None = None, port: int | None = None) -> None:
+    """Run the service until interrupted (Ctrl+C)."""
+    service = CategorizeService()
+    service.warm_up()
+    server = _ServiceServer((host or settings.SERVICE_HOST, port if port is not None else settings.SERVICE_PORT), service)
+    log.info("Serving on http://%s:%d (POST /categorize, GET /health, GET /metrics)", *server.server_address[:2])
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        log.info("Shutting down")
+    finally:
+        server.server_close()
+        service.close()
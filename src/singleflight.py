@@ -0,0 +1,37 @@
+"""
+Coalesce concurrent calls for the same key: the first caller runs the function,
+everyone else asking for that key while it is in flight waits for and shares its result.
+"""
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable
+
+
+class SingleFlight:
+    """Per-key in-flight call deduplication. Safe to share across threads."""
+
+    def __init__(self) -> None:
+        self._calls: dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Return fn(), or the result of an identical call already in flight for `key`."""
+        with self._lock:
+            future = self._calls.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._calls[key] = future
+            else:
+                self.coalesced += 1
+        if not owner:
+            return future.result()
+        try:
+            future.set_result(fn())
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return future.result()
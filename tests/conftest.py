@@ -0,0 +1,65 @@
+"""
+Shared fixtures: the benchmark stub servers stand in for Google Places and the LLM, and every test
+gets its own step, output and cache directories. The environment is set before config.settings is
+imported, since settings are read once at import.
+"""
+import os
+import tempfile
+from pathlib import Path
+
+import pytest
+
+from benchmarks.stub_servers import StubBehavior, start_llm_stub, start_places_stub
+
+_places_stub = start_places_stub(StubBehavior(latency_min=0.0, latency_max=0.0))
+_llm_stub = start_llm_stub(StubBehavior(latency_min=0.0, latency_max=0.0))
+_data_dir = Path(tempfile.mkdtemp(prefix="map_tests_"))
+
+os.environ.update(
+    GOOGLE_MAPS_API_KEY="test-key",
+    GEMINI_API_KEY="test-key",
+    PLACES_BASE_URL=_places_stub.url,
+    LLM_BASE_URL=_llm_stub.url + "/v1/",
+    STEPS_DIR=str(_data_dir / "steps"),
+    OUTPUT_DIR=str(_data_dir / "output"),
+    PLACES_CACHE_PATH=str(_data_dir / "places.sqlite"),
+    CATEGORY_CACHE_PATH=str(_data_dir / "categories.sqlite"),
+    PLACES_REQUESTS_PER_SECOND="0",
+    LLM_REQUESTS_PER_MINUTE="0",
+    LLM_BACKOFF_BASE="0",
+    EXPORT_ENABLED="false",
+)
+
+from config import settings  # noqa: E402
+from src import categorize, google_places  # noqa: E402
+from src.metrics import metrics  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def isolated_run(tmp_path, monkeypatch):
+    """Fresh step/output dirs, caches, provider pool, metrics and stub counters for every test."""
+    steps = tmp_path / "steps"
+    steps.mkdir()
+    monkeypatch.setattr(settings, "STEPS_OUTPUT_DIR", steps)
+    monkeypatch.setattr(settings, "OUTPUT_DIR", tmp_path / "output")
+    monkeypatch.setattr(settings, "PLACES_CACHE_PATH", tmp_path / "places.sqlite")
+    monkeypatch.setattr(settings, "CATEGORY_CACHE_PATH", tmp_path / "categories.sqlite")
+    monkeypatch.setattr(categorize, "_cache", None)
+    monkeypatch.setattr(categorize, "_pool", None)
+    monkeypatch.setattr(google_places, "_cache", None)
+    metrics.reset()
+    _places_stub.stats.take()
+    _llm_stub.stats.take()
+    yield tmp_path
+
+
+@pytest.fixture
+def places_stub():
+    return _places_stub
+
+
+@pytest.fixture
+def llm_stub(monkeypatch):
+    """The LLM stand-in; tests may swap its `behavior` (restored afterwards)."""
+    monkeypatch.setattr(_llm_stub, "behavior", _llm_stub.behavior)
+    return _llm_stub
@@ -0,0 +1,103 @@
+"""Cache keys: category entries follow the models and prompt, search entries only configured regions."""
+import pytest
+
+from config import settings
+from src import categorize
+from src.categorize import categorize_places, category_cache_key, prompt_fingerprint
+from src.enrich import PlaceResolver
+from src.geo import Region
+
+PLACE = {"name": "Ramen Ichiban", "place_id": "places/ramen", "types": ["point_of_interest"]}
+
+
+def _rebuild_pool(monkeypatch, **overrides):
+    for name, value in overrides.items():
+        monkeypatch.setattr(settings, name, value)
+    monkeypatch.setattr(categorize, "_pool", None)
+
+
+def test_category_key_is_stable_for_the_same_setup():
+    assert category_cache_key(PLACE, "fp") == category_cache_key(dict(PLACE), "fp")
+    assert category_cache_key(PLACE, "fp") != category_cache_key(PLACE, "other")
+
+
+@pytest.mark.parametrize(
+    "overrides",
+    [
+        {"LLM_MODEL": "gemini-2.5-pro"},
+        {"LLM_CASCADE_MODEL": "gemini-2.5-flash-lite"},
+        {"LLM_PROVIDERS": ["gemini", "openai"], "OPENAI_API_KEYS": ["test-key"]},
+    ],
+)
+def test_category_key_changes_with_the_answering_models(monkeypatch, overrides):
+    before = category_cache_key(PLACE, "fp")
+    _rebuild_pool(monkeypatch, **overrides)
+
+    assert category_cache_key(PLACE, "fp") != before
+
+
+def test_failover_providers_share_one_key_whatever_their_order(monkeypatch):
+    _rebuild_pool(monkeypatch, LLM_PROVIDERS=["gemini", "openai"], OPENAI_API_KEYS=["test-key"])
+    key = category_cache_key(PLACE, "fp")
+    _rebuild_pool(monkeypatch, LLM_PROVIDERS=["openai", "gemini"])
+
+    assert category_cache_key(PLACE, "fp") == key
+
+
+def test_fingerprint_follows_categories_and_confidence_mode(monkeypatch):
+    fingerprint = prompt_fingerprint()
+    monkeypatch.setattr(settings, "PLACES_DETAILS_TIERED", True)
+    assert prompt_fingerprint() != fingerprint
+    monkeypatch.setattr(settings, "PLACES_DETAILS_TIERED", False)
+    monkeypatch.setattr(categorize, "CATEGORIES", [*categorize.CATEGORIES, "Onsen"])
+    assert prompt_fingerprint() != fingerprint
+
+
+def test_model_switch_misses_the_cache_and_switching_back_hits_it(monkeypatch, llm_stub):
+    monkeypatch.setattr(settings, "FAST_PATH_ENABLED", False)
+    places = [{**PLACE, "place_id": f"places/p{i}", "name": f"Place {i}"} for i in range(4)]
+
+    first = categorize_places(places)
+    assert llm_stub.stats.take()["chat"] == 1
+    assert categorize_places(places) == first
+    assert llm_stub.stats.take().get("chat", 0) == 0
+
+    _rebuild_pool(monkeypatch, LLM_MODEL="gemini-2.5-pro")
+    categorize_places(places)
+    assert llm_stub.stats.take()["chat"] == 1
+
+    _rebuild_pool(monkeypatch, LLM_MODEL="gemini-2.5-flash")
+    assert categorize_places(places) == first
+    assert llm_stub.stats.take().get("chat", 0) == 0
+
+
+def _search_all(resolver, rows):
+    for row in rows:
+        resolver.enrich(row)
+
+
+ROWS = [{"name": f"Place {i}", "address": f"{i} Main St"} for i in range(30)]
+
+
+def test_derived_region_stays_out_of_the_search_key(monkeypatch, places_stub):
+    monkeypatch.setattr(settings, "PLACES_DERIVE_REGION", True)
+    monkeypatch.setattr(settings, "PLACES_DERIVE_REGION_MIN_PLACES", 5)
+    resolver = PlaceResolver()
+    _search_all(resolver, ROWS)
+    assert resolver._derived is not None
+    assert places_stub.stats.take()["search"] == 30
+
+    # A rerun derives its region from other places first; every search still hits the cache.
+    _search_all(PlaceResolver(), list(reversed(ROWS)))
+    assert places_stub.stats.take().get("search", 0) == 0
+
+
+def test_configured_region_is_part_of_the_search_key(places_stub):
+    _search_all(PlaceResolver(Region(center=(35.5, 139.5), radius_m=30_000)), ROWS[:5])
+    assert places_stub.stats.take()["search"] == 5
+
+    _search_all(PlaceResolver(Region(center=(35.5, 139.5), radius_m=30_000)), ROWS[:5])
+    assert places_stub.stats.take().get("search", 0) == 0
+
+    _search_all(PlaceResolver(Region(center=(34.7, 135.5), radius_m=30_000)), ROWS[:5])
+    assert places_stub.stats.take()["search"] == 5
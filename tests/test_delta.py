@@ -0,0 +1,77 @@
+"""Delta pipeline: only added or changed input rows reach Places and the LLM."""
+import json
+
+import pytest
+
+from config import settings
+from src.main import run_delta_pipeline
+
+
+def _write_input(path, rows):
+    path.write_text("name,address\n" + "".join(f"{name},{address}\n" for name, address in rows), encoding="utf-8")
+
+
+@pytest.fixture
+def no_caches(monkeypatch):
+    """Count real upstream calls: no Places or category cache, no rule pre-classifier."""
+    monkeypatch.setattr(settings, "PLACES_CACHE_ENABLED", False)
+    monkeypatch.setattr(settings, "CATEGORY_CACHE_ENABLED", False)
+    monkeypatch.setattr(settings, "FAST_PATH_ENABLED", False)
+
+
+ROWS = [(f"Place {i}", f"{i} Main St") for i in range(6)]
+
+
+def test_first_run_processes_every_row(tmp_path, no_caches, places_stub, llm_stub):
+    source = tmp_path / "places.csv"
+    _write_input(source, ROWS)
+
+    records, failed = run_delta_pipeline(source)
+
+    assert not failed
+    assert len({r["place_id"] for r in records}) == 6
+    assert all(r.get("category") and r.get("icon") for r in records)
+    assert places_stub.stats.take()["search"] == 6
+    assert llm_stub.stats.take()["chat"] >= 1
+    manifest = json.loads((settings.STEPS_OUTPUT_DIR / settings.STEP_DELTA_MANIFEST).read_text(encoding="utf-8"))
+    assert len(manifest) == 6
+
+
+def test_unchanged_input_makes_no_calls(tmp_path, no_caches, places_stub, llm_stub):
+    source = tmp_path / "places.csv"
+    _write_input(source, ROWS)
+    first, _ = run_delta_pipeline(source)
+    places_stub.stats.take()
+    llm_stub.stats.take()
+
+    again, failed = run_delta_pipeline(source)
+
+    assert not failed
+    assert again == first
+    assert places_stub.stats.take() == {"429": 0, "5xx": 0}
+    assert llm_stub.stats.take() == {"429": 0, "5xx": 0}
+
+
+def test_only_added_and_changed_rows_are_processed(tmp_path, no_caches, places_stub, llm_stub):
+    source = tmp_path / "places.csv"
+    _write_input(source, ROWS)
+    first, _ = run_delta_pipeline(source)
+    places_stub.stats.take()
+    llm_stub.stats.take()
+
+    # Row 1 removed, row 3 changed, one row added; the rest keep their records.
+    rows = [ROWS[0], ROWS[2], ("Place 3", "99 Other St"), ROWS[4], ROWS[5], ("Place 9", "9 Main St")]
+    _write_input(source, rows)
+    records, failed = run_delta_pipeline(source)
+
+    assert not failed
+    assert places_stub.stats.take()["search"] == 2
+    assert llm_stub.stats.take()["chat"] == 1
+    # Records follow the new input order; unchanged rows keep their previous records.
+    assert [records[0], records[1], records[3], records[4]] == [first[0], first[2], first[4], first[5]]
+    previous_ids = {r["place_id"] for r in first}
+    assert records[2]["place_id"] not in previous_ids
+    assert records[5]["place_id"] not in previous_ids
+    assert first[1]["place_id"] not in {r["place_id"] for r in records}
+    manifest = json.loads((settings.STEPS_OUTPUT_DIR / settings.STEP_DELTA_MANIFEST).read_text(encoding="utf-8"))
+    assert len(manifest) == 6
@@ -0,0 +1,95 @@
+"""StepJournal appends, partial-line repair and enrichment resume."""
+import json
+import threading
+
+import pytest
+
+from config import settings
+from src.journal import StepJournal
+from src.main import enrich_places_from_list
+
+
+def _lines(path):
+    return path.read_text(encoding="utf-8").splitlines()
+
+
+def test_append_and_load_round_trip(tmp_path):
+    journal = StepJournal(tmp_path / "step.journal.jsonl")
+    journal.append({"i": 0, "name": "Café"})
+    journal.append({"i": 1, "name": "Bar"})
+    journal.close()
+
+    assert StepJournal(journal.path).load() == [{"i": 0, "name": "Café"}, {"i": 1, "name": "Bar"}]
+
+
+def test_concurrent_appends_keep_one_record_per_line(tmp_path):
+    journal = StepJournal(tmp_path / "step.journal.jsonl")
+    threads = [
+        threading.Thread(target=lambda t=t: [journal.append({"t": t, "n": n}) for n in range(50)]) for t in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    journal.close()
+
+    records = journal.load()
+    assert len(records) == 400
+    assert {(r["t"], r["n"]) for r in records} == {(t, n) for t in range(8) for n in range(50)}
+
+
+@pytest.mark.parametrize("partial", ['{"i": 2, "na', "x" * 10_000])
+def test_partial_last_line_is_cut_before_appending(tmp_path, partial):
+    path = tmp_path / "step.journal.jsonl"
+    path.write_text('{"i": 0}\n{"i": 1}\n' + partial, encoding="utf-8")
+    journal = StepJournal(path)
+    assert journal.load() == [{"i": 0}, {"i": 1}]
+
+    journal.append({"i": 2})
+    journal.close()
+
+    assert _lines(path) == ['{"i": 0}', '{"i": 1}', '{"i": 2}']
+
+
+def test_journal_that_is_only_a_partial_line_starts_over(tmp_path):
+    path = tmp_path / "step.journal.jsonl"
+    path.write_text('{"i": 0, "na', encoding="utf-8")
+    journal = StepJournal(path)
+    journal.append({"i": 0})
+    journal.close()
+
+    assert _lines(path) == ['{"i": 0}']
+
+
+@pytest.mark.parametrize("content", ["", '{"i": 0}\n'])
+def test_complete_journal_is_left_alone(tmp_path, content):
+    path = tmp_path / "step.journal.jsonl"
+    path.write_text(content, encoding="utf-8")
+    journal = StepJournal(path)
+    journal.append({"i": 1})
+    journal.close()
+
+    assert path.read_text(encoding="utf-8") == content + '{"i": 1}\n'
+
+
+def test_enrich_resumes_from_journal_after_a_crash(tmp_path, places_stub, monkeypatch):
+    monkeypatch.setattr(settings, "PLACES_CACHE_ENABLED", False)
+    monkeypatch.setattr(settings, "PLACES_WORKERS", 4)
+    places = [{"name": f"Place {i}", "address": f"{i} Main St"} for i in range(12)]
+    path = tmp_path / "enriched.journal.jsonl"
+
+    first, failed = enrich_places_from_list(places, journal=StepJournal(path))
+    assert not failed
+    assert places_stub.stats.take()["search"] == 12
+
+    # A crash after 5 rows, in the middle of writing the sixth.
+    lines = _lines(path)
+    path.write_text("\n".join(lines[:5]) + "\n" + lines[5][:20], encoding="utf-8")
+    journal = StepJournal(path)
+    resumed, failed = enrich_places_from_list(places, journal=journal)
+    journal.close()
+
+    assert not failed
+    assert places_stub.stats.take()["search"] == 7
+    assert resumed == first
+    assert len([json.loads(line) for line in _lines(path)]) == 12
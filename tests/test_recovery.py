@@ -0,0 +1,131 @@
+"""Partial-failure recovery in step 3: _run_batch / _recover against the LLM stub and scripted replies."""
+import pytest
+
+from benchmarks.stub_servers import StubBehavior
+from config import settings
+from src import categorize
+
+
+class _Rejected(Exception):
+    """Stand-in for an API error the provider answered with a 4xx status."""
+
+    def __init__(self, status_code: int) -> None:
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def _places(*names):
+    return [{"name": name, "place_id": f"places/{name}", "types": ["point_of_interest"]} for name in names]
+
+
+def _scripted(monkeypatch, answer):
+    """Replace _ask_batch with answer(names) -> names resolved; returns the list of batches asked."""
+    asked = []
+
+    def ask(places, tier="strong"):
+        names = [p["name"] for p in places]
+        asked.append(names)
+        resolved = answer(names)
+        return {i: ("Restaurants", None) for i, name in enumerate(names) if name in resolved}
+
+    monkeypatch.setattr(categorize, "_ask_batch", ask)
+    return asked
+
+
+def test_run_batch_resolves_whole_batch_in_one_call(llm_stub):
+    got, ok = categorize._run_batch(_places("a", "b", "c", "d"))
+
+    assert ok
+    assert sorted(got) == [0, 1, 2, 3]
+    assert all(category in categorize.CATEGORIES for category, _ in got.values())
+    assert llm_stub.stats.take()["chat"] == 1
+
+
+def test_recovery_reasks_only_missing_places(monkeypatch):
+    seen = set()
+
+    def answer(names):
+        # "b" and "d" are left out of their first reply.
+        resolved = {n for n in names if n not in ("b", "d") or n in seen}
+        seen.update(names)
+        return resolved
+
+    asked = _scripted(monkeypatch, answer)
+    got, ok = categorize._run_batch(_places("a", "b", "c", "d"))
+
+    assert not ok
+    assert sorted(got) == [0, 1, 2, 3]
+    assert asked == [["a", "b", "c", "d"], ["b", "d"]]
+
+
+def test_recovery_bisects_until_the_bad_place_is_isolated(monkeypatch):
+    # Any batch holding "bad" comes back unparseable as a whole.
+    asked = _scripted(monkeypatch, lambda names: set() if "bad" in names else set(names))
+    got, ok = categorize._run_batch(_places("a", "b", "bad", "c"))
+
+    assert not ok
+    assert sorted(got) == [0, 1, 3]
+    assert asked[1:] == [["a", "b", "bad", "c"], ["a", "b"], ["bad", "c"], ["bad"], ["c"]]
+
+
+def test_recovery_stops_at_the_call_budget(monkeypatch):
+    monkeypatch.setattr(settings, "CATEGORIZE_RECOVERY_MAX_CALLS", 2)
+    asked = _scripted(monkeypatch, lambda names: set())
+    got, ok = categorize._run_batch(_places("a", "b", "c", "d"))
+
+    assert got == {}
+    assert not ok
+    assert len(asked) == 1 + 2
+
+
+def test_transport_errors_are_recovered(llm_stub, monkeypatch):
+    monkeypatch.setattr(settings, "LLM_FAILOVER_MAX_ATTEMPTS", 1)
+    monkeypatch.setattr(settings, "CATEGORIZE_RECOVERY_MAX_CALLS", 2)
+    llm_stub.behavior = StubBehavior(latency_min=0.0, latency_max=0.0, error_rate=1.0)
+    got, ok = categorize._run_batch(_places("a", "b", "c", "d"))
+
+    assert got == {}
+    assert not ok
+    stats = llm_stub.stats.take()
+    assert stats["chat"] == stats["5xx"] == 3
+
+
+@pytest.mark.parametrize("status", [400, 401, 403, 404])
+def test_rejected_request_is_raised_without_recovery(monkeypatch, status):
+    calls = []
+
+    def ask(places, tier="strong"):
+        calls.append(len(places))
+        raise _Rejected(status)
+
+    monkeypatch.setattr(categorize, "_ask_batch", ask)
+    with pytest.raises(_Rejected):
+        categorize._run_batch(_places("a", "b"))
+    assert calls == [2]
+
+
+def test_rejected_recovery_call_is_raised(monkeypatch):
+    calls = []
+
+    def ask(places, tier="strong"):
+        calls.append(len(places))
+        if len(calls) == 1:
+            return {0: ("Restaurants", None)}
+        raise _Rejected(401)
+
+    monkeypatch.setattr(categorize, "_ask_batch", ask)
+    with pytest.raises(_Rejected):
+        categorize._run_batch(_places("a", "b", "c"))
+    assert calls == [3, 2]
+
+
+def test_categorize_places_fails_the_step_on_a_rejected_key(monkeypatch):
+    monkeypatch.setattr(settings, "FAST_PATH_ENABLED", False)
+    monkeypatch.setattr(settings, "CATEGORY_CACHE_ENABLED", False)
+
+    def ask(places, tier="strong"):
+        raise _Rejected(401)
+
+    monkeypatch.setattr(categorize, "_ask_batch", ask)
+    with pytest.raises(_Rejected):
+        categorize.categorize_places(_places("a", "b", "c"))
@@ -0,0 +1,103 @@
+"""Service micro-batcher: batching, coalescing and future resolution."""
+import time
+
+import pytest
+
+from benchmarks.stub_servers import StubBehavior
+from src import service
+from src.categorize import CATEGORIES
+from src.metrics import metrics
+
+
+def _place(name, **extra):
+    return {"name": name, "place_id": f"places/{name}", "types": ["point_of_interest"], **extra}
+
+
+@pytest.fixture
+def batcher():
+    b = service.MicroBatcher(window=0.05, max_size=10, workers=2)
+    yield b
+    b.close()
+
+
+def _wait_in_flight(batcher, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not batcher._in_flight:
+        assert time.monotonic() < deadline, "batch never went in flight"
+        time.sleep(0.005)
+
+
+def test_places_submitted_within_the_window_share_one_batch(batcher, llm_stub):
+    futures = [batcher.submit(_place(f"p{i}")) for i in range(5)]
+    answers = [f.result(timeout=5) for f in futures]
+
+    assert all(category in CATEGORIES for category, _ in answers)
+    assert llm_stub.stats.take()["chat"] == 1
+    assert metrics.total("service_batches_total") == 1
+    assert batcher._in_flight == {} and batcher._waiting == {}
+
+
+def test_batches_are_cut_at_max_size(batcher, llm_stub):
+    futures = [batcher.submit(_place(f"p{i}")) for i in range(25)]
+    for f in futures:
+        f.result(timeout=5)
+
+    assert metrics.total("service_batches_total") == 3
+    assert metrics.total("service_batched_places_total") == 25
+
+
+def test_waiting_and_in_flight_duplicates_share_a_future(batcher, llm_stub):
+    llm_stub.behavior = StubBehavior(latency_min=0.2, latency_max=0.2)
+    first = batcher.submit(_place("a"))
+    assert batcher.submit(_place("a")) is first
+    _wait_in_flight(batcher)
+    assert batcher.submit(_place("a")) is first
+
+    first.result(timeout=5)
+    assert metrics.total("service_coalesced_total") == 2
+    assert llm_stub.stats.take()["chat"] == 1
+
+
+def test_resubmit_after_resolution_gets_a_new_answer(batcher, llm_stub):
+    first = batcher.submit(_place("a"))
+    first.result(timeout=5)
+
+    again = batcher.submit(_place("a"))
+    assert again is not first
+    assert again.result(timeout=5) == first.result()
+    assert llm_stub.stats.take()["chat"] == 2
+
+
+def test_place_with_reviews_does_not_join_its_lean_future(batcher, llm_stub):
+    llm_stub.behavior = StubBehavior(latency_min=0.2, latency_max=0.2)
+    lean = batcher.submit(_place("a"))
+    _wait_in_flight(batcher)
+    full = batcher.submit(_place("a", reviews=["Lovely ramen, long queue."]))
+
+    assert full is not lean
+    lean.result(timeout=5)
+    full.result(timeout=5)
+    assert metrics.total("service_coalesced_total") == 0
+
+
+def test_a_failed_batch_fails_every_future(batcher, monkeypatch):
+    def boom(places):
+        raise RuntimeError("LLM down")
+
+    monkeypatch.setattr(service, "run_cascade", boom)
+    futures = [batcher.submit(_place(f"p{i}")) for i in range(3)]
+
+    for f in futures:
+        with pytest.raises(RuntimeError, match="LLM down"):
+            f.result(timeout=5)
+    assert batcher._in_flight == {} and batcher._waiting == {}
+
+
+def test_unanswered_places_get_the_default_category(batcher, monkeypatch):
+    monkeypatch.setattr(service, "run_cascade", lambda places: ({0: ("Hotel", 0.9)}, False))
+    hotel = batcher.submit(_place("a"))
+    unknown = batcher.submit(_place("b"))
+
+    assert hotel.result(timeout=5) == ("Hotel", 0.9)
+    assert unknown.result(timeout=5) == (service.DEFAULT_CATEGORY, None)
+    assert metrics.total("categorized_places_total", source="default") == 1